@@ -0,0 +1,351 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import dataset_inventory
+import voc_parser
+
+# --- [Configuration Section] ---
+# trans_coco가 파싱한 어노테이션(파일, 클래스 폴더, 이미지 크기, 객체별 클래스/박스/difficult)을 SQLite에 저장합니다.
+# 분석할 때마다 label/의 XML을 모두 다시 파싱하지 않고 인덱스가 있는 DB에 질의합니다.
+# 파일의 크기/수정 시간이 바뀐 XML만 다시 파싱하여 갱신합니다. (trans_coco 변환 중에도 같은 파싱 결과로 갱신)
+#
+#   python annotation_db.py update                       : label/ 의 바뀐 XML만 다시 읽어 DB 갱신
+#   python annotation_db.py counts [--split train]       : 클래스별 파일/객체 수
+#   python annotation_db.py files 과자A [--split valid]   : 클래스의 XML 파일 목록
+#   python annotation_db.py boxes --min-width 32 --min-height 32 [--class 과자A]
+#   python annotation_db.py yolo                         : XML을 읽지 않고 DB에서 label_coco/ YOLO TXT 생성
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. DB 파일 경로
+ANNOTATION_DB_PATH = os.path.join(CURRENT_DIR, 'annotation_db.sqlite3')
+
+# 2. trans_coco 변환 중 파싱한 어노테이션을 DB에도 기록할지 여부
+USE_ANNOTATION_DB = True
+
+# 3. update 명령에서 XML을 파싱할 워커 프로세스 수와 묶음 크기
+UPDATE_WORKERS = os.cpu_count() or 1
+UPDATE_CHUNK_SIZE = 500
+
+# 4. 다른 프로세스(로컬 샤드 실행 등)가 쓰는 중일 때 기다릴 최대 시간 (초)
+BUSY_TIMEOUT_SEC = 60
+
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    xml_path TEXT NOT NULL UNIQUE,
+    root_dir TEXT NOT NULL,
+    class_folder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    folder TEXT,
+    path TEXT,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS objects (
+    file_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    class_name TEXT NOT NULL,
+    xmin REAL NOT NULL,
+    xmax REAL NOT NULL,
+    ymin REAL NOT NULL,
+    ymax REAL NOT NULL,
+    box_width REAL NOT NULL,
+    box_height REAL NOT NULL,
+    difficult INTEGER NOT NULL,
+    PRIMARY KEY (file_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_files_root_class ON files(root_dir, class_folder);
+CREATE INDEX IF NOT EXISTS idx_objects_class ON objects(class_name, file_id);
+CREATE INDEX IF NOT EXISTS idx_objects_box ON objects(box_width, box_height);
+'''
+
+def db_root(root_dir):
+    """DB에 저장하는 루트 폴더 키 (실행 위치와 관계없이 같도록 절대 경로)"""
+    return os.path.normpath(os.path.abspath(root_dir))
+
+def _parse_chunk(xml_paths):
+    """워커 프로세스에서 XML 묶음을 파싱합니다. [(경로, VocAnnotation 또는 None, 오류 메시지 또는 None)]"""
+    results = []
+    for xml_path in xml_paths:
+        try:
+            results.append((xml_path, voc_parser.load_annotation(xml_path), None))
+        except Exception as e:
+            results.append((xml_path, None, str(e)))
+    return results
+
+class AnnotationDB:
+    """
+    어노테이션 DB 연결. with 문으로 사용하면 끝날 때 닫습니다.
+
+    예:
+        with AnnotationDB() as db:
+            db.update('./Training/label')
+            for class_name, file_count, object_count in db.class_counts('./Training/label'):
+                ...
+    """
+
+    def __init__(self, path=None):
+        # 기본값은 호출 시점의 ANNOTATION_DB_PATH (벤치마크/테스트가 경로를 바꿀 수 있도록)
+        path = path or ANNOTATION_DB_PATH
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SEC)
+        # 읽기와 쓰기가 서로 막지 않도록 WAL 모드 (쓰기 중에도 질의 가능)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            # 여러 단계가 같은 DB를 동시에 처음 열 수 있으므로 SELECT 후 INSERT 대신 OR IGNORE로 기록
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                              (str(SCHEMA_VERSION),))
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if int(row[0]) != SCHEMA_VERSION:
+                raise ValueError(f"지원하지 않는 어노테이션 DB 버전입니다: {row[0]} ({path})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.conn.close()
+
+    # --- [갱신] ---
+
+    def stale_paths(self, root_dir, xml_paths):
+        """
+        xml_paths 중 DB에 없거나 크기/수정 시간이 DB 기록과 다른 파일 목록을 반환합니다.
+        (파일마다 os.stat 한 번, 파싱 없음)
+        """
+        known = {xml_path: (size, mtime) for xml_path, size, mtime in self.conn.execute(
+            'SELECT xml_path, size, mtime FROM files WHERE root_dir = ?', (db_root(root_dir),))}
+        stale = []
+        for xml_path in xml_paths:
+            try:
+                st = os.stat(xml_path)
+            except OSError:
+                continue
+            if known.get(os.path.abspath(xml_path)) != (st.st_size, st.st_mtime):
+                stale.append(xml_path)
+        return stale
+
+    def upsert(self, root_dir, annotations):
+        """
+        root_dir 아래 XML의 VocAnnotation 레코드들을 한 트랜잭션으로 저장합니다. (같은 파일의 이전 기록은 교체)
+        크기/수정 시간은 지금 파일에서 읽으므로, 파싱 직후에 호출해야 다음 갱신에서 건너뛸 수 있습니다.
+        """
+        root_key = db_root(root_dir)
+        prefix_length = len(os.path.join(root_key, ''))
+        with self.conn:
+            for annotation in annotations:
+                xml_path = os.path.abspath(annotation.xml_path)
+                try:
+                    st = os.stat(xml_path)
+                except OSError:
+                    continue
+                relative_path = xml_path[prefix_length:]
+                class_folder = relative_path.split(os.sep, 1)[0] if os.sep in relative_path else ''
+                self._delete_paths([xml_path])
+                cursor = self.conn.execute(
+                    'INSERT INTO files (xml_path, root_dir, class_folder, filename, folder, path, width, height, size, mtime) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (xml_path, root_key, class_folder, annotation.filename, annotation.folder, annotation.path,
+                     annotation.width, annotation.height, st.st_size, st.st_mtime))
+                file_id = cursor.lastrowid
+                self.conn.executemany(
+                    'INSERT INTO objects (file_id, seq, class_name, xmin, xmax, ymin, ymax, box_width, box_height, difficult) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(file_id, seq, obj.name, obj.bbox[0], obj.bbox[1], obj.bbox[2], obj.bbox[3],
+                      obj.bbox[1] - obj.bbox[0], obj.bbox[3] - obj.bbox[2], int(obj.difficult))
+                     for seq, obj in enumerate(annotation.objects)])
+
+    def _delete_paths(self, xml_paths):
+        for xml_path in xml_paths:
+            self.conn.execute('DELETE FROM objects WHERE file_id IN (SELECT id FROM files WHERE xml_path = ?)', (xml_path,))
+            self.conn.execute('DELETE FROM files WHERE xml_path = ?', (xml_path,))
+
+    def prune(self, root_dir, live_xml_paths):
+        """root_dir 아래 기록 중 live_xml_paths에 없는(사라진) 파일을 지웁니다. 지운 수를 반환합니다."""
+        live = {os.path.abspath(path) for path in live_xml_paths}
+        stale = [xml_path for (xml_path,) in self.conn.execute('SELECT xml_path FROM files WHERE root_dir = ?',
+                                                               (db_root(root_dir),))
+                 if xml_path not in live]
+        with self.conn:
+            self._delete_paths(stale)
+        return len(stale)
+
+    def update(self, root_dir, workers=UPDATE_WORKERS, chunk_size=UPDATE_CHUNK_SIZE, allowed=None):
+        """
+        root_dir 아래 XML 중 새로 생기거나 바뀐 파일만 파싱하여 DB에 반영하고, 사라진 파일의 기록은 지웁니다.
+        allowed(class_allowlist의 허용 클래스 집합)가 주어지면 제외된 클래스 폴더의 XML은 읽지 않습니다.
+        (파싱한 수, 실패 수, 지운 수)를 반환합니다.
+        """
+        inventory = dataset_inventory.get_inventory(root_dir)
+        xml_paths = [entry.path for entry in inventory.for_classes(allowed).select(('.xml',), exclude='meta')]
+        stale = self.stale_paths(root_dir, xml_paths)
+        # 사라진 파일 정리는 허용 목록과 관계없이 root_dir 전체 기준
+        removed = self.prune(root_dir, xml_paths if allowed is None else
+                             [entry.path for entry in inventory.select(('.xml',), exclude='meta')])
+        print(f"--- 어노테이션 DB 갱신: {root_dir} (전체 {len(xml_paths)}개 중 다시 읽을 파일 {len(stale)}개, "
+              f"사라진 파일 {removed}개) ---")
+
+        chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+        parsed = failed = 0
+        if workers > 1 and len(chunks) > 1:
+            # 다른 단계 스레드가 실행 중일 수 있으므로 fork 대신 spawn으로 워커를 시작
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                results = executor.map(_parse_chunk, chunks)
+                for chunk_results in results:
+                    parsed, failed = self._store_parsed(root_dir, chunk_results, parsed, failed)
+        else:
+            for chunk in chunks:
+                parsed, failed = self._store_parsed(root_dir, _parse_chunk(chunk), parsed, failed)
+        print(f"✅ 어노테이션 DB 갱신 완료: 파싱 {parsed}개, 실패 {failed}개")
+        return parsed, failed, removed
+
+    def _store_parsed(self, root_dir, chunk_results, parsed, failed):
+        annotations = []
+        for xml_path, annotation, error in chunk_results:
+            if annotation is None:
+                failed += 1
+                print(f"[오류] 파일 처리 실패 ({xml_path}): {error}")
+            else:
+                annotations.append(annotation)
+        self.upsert(root_dir, annotations)
+        return parsed + len(annotations), failed
+
+    # --- [질의] ---
+
+    def _root_filter(self, root_dir, column='f.root_dir'):
+        if root_dir is None:
+            return '', ()
+        return f' AND {column} = ?', (db_root(root_dir),)
+
+    def class_folders(self, root_dir):
+        """root_dir 바로 아래 클래스 폴더 이름 목록 (XML이 하나 이상 있는 폴더, 정렬)"""
+        return [name for (name,) in self.conn.execute(
+            "SELECT DISTINCT class_folder FROM files WHERE root_dir = ? AND class_folder != '' ORDER BY class_folder",
+            (db_root(root_dir),))]
+
+    def class_counts(self, root_dir=None, include_difficult=True):
+        """[(클래스 이름, 파일 수, 객체 수)] (클래스 이름 순)"""
+        where, params = self._root_filter(root_dir)
+        if not include_difficult:
+            where += ' AND o.difficult = 0'
+        return self.conn.execute(
+            'SELECT o.class_name, COUNT(DISTINCT o.file_id), COUNT(*) FROM objects o JOIN files f ON f.id = o.file_id '
+            f'WHERE 1 = 1{where} GROUP BY o.class_name ORDER BY o.class_name', params).fetchall()
+
+    def files_for_class(self, class_name, root_dir=None):
+        """class_name 객체가 하나 이상 있는 XML 경로 목록 (경로 순)"""
+        where, params = self._root_filter(root_dir)
+        return [xml_path for (xml_path,) in self.conn.execute(
+            'SELECT DISTINCT f.xml_path FROM objects o JOIN files f ON f.id = o.file_id '
+            f'WHERE o.class_name = ?{where} ORDER BY f.xml_path', (class_name,) + params)]
+
+    def boxes_larger_than(self, min_width=0, min_height=0, class_name=None, root_dir=None, limit=None):
+        """
+        가로/세로(픽셀)가 각각 min_width/min_height 이상인 박스를
+        [(XML 경로, 클래스 이름, xmin, xmax, ymin, ymax, difficult)]로 반환합니다.
+        """
+        where, params = self._root_filter(root_dir)
+        if class_name is not None:
+            where += ' AND o.class_name = ?'
+            params += (class_name,)
+        sql = ('SELECT f.xml_path, o.class_name, o.xmin, o.xmax, o.ymin, o.ymax, o.difficult '
+               'FROM objects o JOIN files f ON f.id = o.file_id '
+               f'WHERE o.box_width >= ? AND o.box_height >= ?{where} ORDER BY f.xml_path, o.seq')
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        return self.conn.execute(sql, (min_width, min_height) + params).fetchall()
+
+    def iter_annotations(self, root_dir, class_folders=None, batch_size=UPDATE_CHUNK_SIZE):
+        """
+        root_dir의 기록을 VocAnnotation 레코드로 경로 순서대로 돌려줍니다. (XML을 읽지 않음)
+        class_folders(이름 집합)가 주어지면 그 클래스 폴더만 돌려줍니다.
+        """
+        files = self.conn.execute(
+            'SELECT id, xml_path, class_folder, filename, folder, path, width, height FROM files '
+            'WHERE root_dir = ? ORDER BY xml_path', (db_root(root_dir),))
+        while True:
+            batch = files.fetchmany(batch_size)
+            if not batch:
+                break
+            rows = [row for row in batch if class_folders is None or row[2] in class_folders]
+            if rows:
+                yield from self._annotations_for_rows(rows)
+
+    def _annotations_for_rows(self, rows):
+        objects = {}
+        ids = [row[0] for row in rows]
+        placeholders = ','.join('?' * len(ids))
+        for file_id, class_name, xmin, xmax, ymin, ymax, difficult in self.conn.execute(
+                'SELECT file_id, class_name, xmin, xmax, ymin, ymax, difficult FROM objects '
+                f'WHERE file_id IN ({placeholders}) ORDER BY file_id, seq', ids):
+            objects.setdefault(file_id, []).append(
+                voc_parser.VocObject(name=class_name, bbox=(xmin, xmax, ymin, ymax), difficult=bool(difficult)))
+        for file_id, xml_path, _, filename, folder, path, width, height in rows:
+            yield voc_parser.VocAnnotation(xml_path=xml_path, filename=filename, folder=folder, path=path,
+                                           width=width, height=height, objects=objects.get(file_id, []))
+
+def split_label_dirs():
+    """스플릿 이름 -> XML 루트 폴더 (trans_coco 설정)"""
+    import trans_coco as tc
+    return {'train': tc.LABEL_ROOT_DIR, 'valid': tc.V_LABEL_ROOT_DIR}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='어노테이션 DB 갱신/질의')
+    parser.add_argument('--db', default=ANNOTATION_DB_PATH, help='DB 파일 경로')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('update', help='바뀐 XML만 다시 읽어 DB 갱신')
+    counts_parser = subparsers.add_parser('counts', help='클래스별 파일/객체 수')
+    counts_parser.add_argument('--no-difficult', action='store_true', help="difficult 객체 제외")
+    files_parser = subparsers.add_parser('files', help='클래스의 XML 파일 목록')
+    files_parser.add_argument('class_name', help='클래스 이름')
+    boxes_parser = subparsers.add_parser('boxes', help='크기 이상인 박스 목록')
+    boxes_parser.add_argument('--min-width', type=float, default=0, help='최소 박스 가로 (픽셀)')
+    boxes_parser.add_argument('--min-height', type=float, default=0, help='최소 박스 세로 (픽셀)')
+    boxes_parser.add_argument('--class', dest='class_name', default=None, help='이 클래스만')
+    boxes_parser.add_argument('--limit', type=int, default=None, help='최대 출력 개수')
+    subparsers.add_parser('yolo', help='XML을 읽지 않고 DB에서 label_coco/ YOLO TXT 생성')
+    for sub in subparsers.choices.values():
+        sub.add_argument('--split', choices=('train', 'valid'), default=None, help='이 스플릿만 (기본: 전체)')
+    args = parser.parse_args()
+
+    label_dirs = split_label_dirs()
+    if args.split is not None:
+        label_dirs = {args.split: label_dirs[args.split]}
+
+    with AnnotationDB(args.db) as db:
+        if args.command == 'update':
+            for label_dir in label_dirs.values():
+                db.update(label_dir)
+        elif args.command == 'yolo':
+            import class_allowlist
+            import trans_coco as tc
+            outputs = {'train': (tc.OUTPUT_ROOT_DIR, tc.BASE_DIR), 'valid': (tc.V_OUTPUT_ROOT_DIR, tc.V_BASE_DIR)}
+            allowed = class_allowlist.load_allowed()
+            for split_name, label_dir in label_dirs.items():
+                tc.convert_from_db(db, label_dir, *outputs[split_name], allowed=allowed)
+        else:
+            for split_name, label_dir in label_dirs.items():
+                print(f"\n--- [{split_name}] {label_dir} ---")
+                if args.command == 'counts':
+                    for class_name, file_count, object_count in db.class_counts(label_dir, not args.no_difficult):
+                        print(f"{class_name}\t파일 {file_count}\t객체 {object_count}")
+                elif args.command == 'files':
+                    for xml_path in db.files_for_class(args.class_name, label_dir):
+                        print(xml_path)
+                elif args.command == 'boxes':
+                    for row in db.boxes_larger_than(args.min_width, args.min_height, args.class_name, label_dir, args.limit):
+                        print('\t'.join(str(value) for value in row))
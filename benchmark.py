@@ -0,0 +1,313 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import annotation_db
+import coco_setting_train as cst
+import dataset_inventory
+import make_dummy_dataset as mdd
+import trans_coco as tc
+import voc_parser
+import xml_path_set as xps
+
+# --- [Configuration Section] ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. 벤치마크 결과(JSON)를 저장할 폴더
+RESULTS_DIR = os.path.join(CURRENT_DIR, 'bench_results')
+
+# 2. 측정할 데이터셋 규모 (Training 파일 수)
+SCALES = (1000, 10000, 100000)
+
+# 3. 벤치마크용 이미지 크기 (가로, 세로)
+BENCH_IMAGE_SIZE = (1024, 768)
+
+# 4. 시작 시간을 측정할 모듈과, 라벨 단계 모듈이 불러오면 안 되는 무거운 모듈
+# (변환 워커 프로세스마다 다시 import되므로 라벨 단계는 cv2/PIL/yaml 없이 시작되어야 합니다.)
+IMPORT_CHECK_MODULES = ('voc_parser', 'xml_path_set', 'trans_coco', 'create_data_yaml', 'coco_setting_train', 'run_all')
+LABEL_ONLY_MODULES = ('voc_parser', 'xml_path_set', 'trans_coco', 'create_data_yaml')
+HEAVY_MODULES = ('cv2', 'PIL', 'numpy', 'yaml')
+
+def git_commit():
+    """현재 커밋 해시를 반환합니다. (git이 없으면 'unknown')"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=CURRENT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+def timed(name, files, func, *args, **kwargs):
+    """
+    func를 실행하면서 화면 출력을 버리고, 걸린 시간과 처리량을 결과 딕셔너리로 반환합니다.
+    """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    result = {
+        'stage': name,
+        'seconds': round(elapsed, 4),
+        'files': files,
+        'files_per_sec': round(files / elapsed, 1) if elapsed > 0 else None,
+    }
+    print(f"  {name:<24} {elapsed:9.3f}s  {result['files_per_sec']} files/s")
+    return result
+
+def count_files(root_dir, extension):
+    return sum(1 for _, _, files in os.walk(root_dir) for f in files if f.endswith(extension))
+
+def check_convert_equivalence(num_boxes=100000, seed=0):
+    """
+    convert_boxes/format_yolo_lines(벡터화)가 convert_box(기준 구현)와 같은 결과를 내는지 확인합니다.
+    """
+    rng = random.Random(seed)
+    sizes = [(rng.randint(1, 5000), rng.randint(1, 5000)) for _ in range(num_boxes)]
+    boxes = [tuple(rng.uniform(-50, 6000) for _ in range(4)) for _ in range(num_boxes)]
+    class_ids = [rng.randint(0, 500) for _ in range(num_boxes)]
+
+    reference = [tc.convert_box(size, box) for size, box in zip(sizes, boxes)]
+    vectorized = tc.convert_boxes(sizes, boxes)
+
+    reference_text = ''.join(f"{c} {b[0]:.6f} {b[1]:.6f} {b[2]:.6f} {b[3]:.6f}\n" for c, b in zip(class_ids, reference))
+    same = np.array_equal(vectorized, np.array(reference)) and reference_text == tc.format_yolo_lines(class_ids, vectorized)
+    print(f"--- convert_box vs convert_boxes 결과 일치 ({num_boxes}개 박스): {'OK' if same else 'MISMATCH'} ---")
+    return same
+
+def measure_import_time(module):
+    """
+    새 인터프리터에서 `python -X importtime -c "import module"`을 실행해
+    module의 누적 import 시간(초)과 함께 불러온 무거운 모듈 목록을 반환합니다.
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=CURRENT_DIR,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'module': module, 'error': proc.stderr.strip().splitlines()[-1:]}
+
+    cumulative_us = None
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        # 형식: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        name = name.strip()
+        if not cumulative.strip().isdigit():
+            continue
+        loaded.add(name.split('.')[0])
+        if name == module:
+            cumulative_us = int(cumulative)
+
+    return {
+        'module': module,
+        'seconds': round(cumulative_us / 1e6, 4) if cumulative_us is not None else None,
+        'heavy_modules': sorted(loaded & set(HEAVY_MODULES)),
+    }
+
+def check_import_times(modules=IMPORT_CHECK_MODULES):
+    """
+    모듈별 시작(import) 시간을 측정하고, 라벨 단계 모듈이 무거운 모듈을 불러오지 않는지 확인합니다.
+    """
+    print("--- 모듈 import 시간 (python -X importtime) ---")
+    results = []
+    ok = True
+    for module in modules:
+        result = measure_import_time(module)
+        if 'error' in result:
+            print(f"  {module:<20} ❌ import 실패: {result['error']}")
+            ok = False
+        else:
+            violation = module in LABEL_ONLY_MODULES and bool(result['heavy_modules'])
+            result['label_only_ok'] = not violation if module in LABEL_ONLY_MODULES else None
+            ok = ok and not violation
+            mark = '⚠️' if violation else '  '
+            print(f"  {module:<20} {result['seconds']:8.4f}s {mark} {', '.join(result['heavy_modules'])}")
+        results.append(result)
+    if not ok:
+        print("⚠️ 라벨 단계 모듈이 무거운 모듈을 import 시점에 불러옵니다.")
+    return results, ok
+
+def bench_parsers(xml_files):
+    """
+    voc_parser의 백엔드별로 같은 XML들을 파싱한 시간을 측정하고, 결과가 'etree'(기준 구현)와 같은지 확인합니다.
+    """
+    results = []
+    reference = None
+    for backend in voc_parser.available_backends():
+        start = time.perf_counter()
+        records = [voc_parser.load_annotation(path, backend) for path in xml_files]
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = records
+        same = records == reference
+        results.append({
+            'stage': f'parse:{backend}',
+            'seconds': round(elapsed, 4),
+            'files': len(xml_files),
+            'files_per_sec': round(len(xml_files) / elapsed, 1) if elapsed > 0 else None,
+            'same_as_etree': same,
+        })
+        print(f"  {'parse:' + backend:<24} {elapsed:9.3f}s  {results[-1]['files_per_sec']} files/s"
+              f"  {'OK' if same else 'MISMATCH'}")
+    return results
+
+@contextlib.contextmanager
+def isolated_caches(work_dir):
+    """
+    측정하는 동안 인벤토리 캐시와 어노테이션 DB를 work_dir 아래에 두고, 끝나면 원래 경로로 되돌립니다.
+    (벤치마크 데이터셋의 기록이 저장소의 캐시/DB에 쌓이지 않도록)
+    """
+    saved = (dataset_inventory.INVENTORY_CACHE_PATH, dataset_inventory._cache, annotation_db.ANNOTATION_DB_PATH)
+    dataset_inventory.INVENTORY_CACHE_PATH = os.path.join(work_dir, 'inventory_cache.json')
+    dataset_inventory._cache = None
+    annotation_db.ANNOTATION_DB_PATH = os.path.join(work_dir, 'annotation_db.sqlite3')
+    try:
+        yield
+    finally:
+        dataset_inventory.INVENTORY_CACHE_PATH, dataset_inventory._cache, annotation_db.ANNOTATION_DB_PATH = saved
+
+# --- [기존 방식 비교용] ---
+# coco_setting_train에서 삭제된 리스트 동기화 + 임시 폴더 정리 방식을 비교 기준으로만 남겨 둡니다.
+
+def _legacy_sync_list(list_a, list_b):
+    """list_a에서 확장자 미포함 이름이 list_b에 없는 요소를 뺀 리스트를 반환합니다."""
+    b_names_set = {os.path.splitext(name)[0] for name in list_b}
+    return [name for name in list_a if os.path.splitext(name)[0] in b_names_set]
+
+def _legacy_cleanup(origin_dir, files_to_keep_list):
+    """남길 파일을 임시 폴더로 옮기고, origin_dir의 나머지 파일을 지운 뒤 다시 되돌립니다."""
+    files_to_keep_set = set(files_to_keep_list)
+    temp_dir = tempfile.mkdtemp(prefix='yolo_sync_temp_', dir=origin_dir)
+    moved = {}
+    try:
+        for root, _, files in os.walk(origin_dir):
+            if root == temp_dir:
+                continue
+            for filename in files:
+                if filename in files_to_keep_set:
+                    temp_path = os.path.join(temp_dir, filename)
+                    shutil.move(os.path.join(root, filename), temp_path)
+                    moved[temp_path] = os.path.join(root, filename)
+        for root, _, files in os.walk(origin_dir):
+            if root == temp_dir:
+                continue
+            for filename in files:
+                os.remove(os.path.join(root, filename))
+    finally:
+        for temp_path, original_path in moved.items():
+            shutil.move(temp_path, original_path)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def bench_scale(scale, work_dir, image_size, objects, labels_only, workers):
+    """
+    scale 크기의 데이터셋을 만들고 단계별 시간을 측정합니다.
+    """
+    dataset_dir = os.path.join(work_dir, f"scale_{scale}")
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        mdd.generate_dataset(dataset_dir, num_files=scale, objects_per_file=objects, image_size=image_size,
+                             write_images=not labels_only)
+
+    base_dir = os.path.join(dataset_dir, 'Training')
+    label_dir = os.path.join(base_dir, 'label')
+    label_coco_dir = os.path.join(base_dir, 'label_coco')
+    image_dir = os.path.join(base_dir, 'image')
+    target_dir = os.path.join(dataset_dir, 'images', 'train')
+    output_dir = os.path.join(dataset_dir, 'labels', 'train')
+
+    xml_files = [os.path.join(root, f) for root, _, files in os.walk(label_dir) for f in files if f.endswith('.xml')]
+    xml_count = len(xml_files)
+    results = []
+
+    print(f"\n=== scale {scale}: XML {xml_count}개 ===")
+    # 캐시/DB는 데이터셋 폴더 아래에 두어 저장소의 inventory_cache.json, annotation_db.sqlite3를 건드리지 않음
+    with isolated_caches(dataset_dir):
+        results.extend(bench_parsers(xml_files))
+        results.append(timed('xml_path_set.run', xml_count, xps.run, label_dir, xps.RELATIVE_PATH_PREFIX))
+        results.append(timed('trans_coco.run', xml_count, tc.run, label_dir, label_coco_dir, base_dir, workers))
+
+        if not labels_only:
+            pairs = {}
+            image_count = count_files(image_dir, '.jpg')
+
+            def pair_index():
+                pairs.update(cst.build_pair_index(image_dir, label_coco_dir))
+
+            results.append(timed('pairing', image_count, pair_index))
+            results.append(timed('materialize', len(pairs), cst.materialize_pairs, pairs, target_dir, output_dir))
+
+            # 기존 방식(리스트 동기화 + 임시 폴더 정리)과의 비교용
+            def legacy_sync_cleanup():
+                images_list = os.listdir(target_dir)
+                labels_list = os.listdir(output_dir)
+                labels_list = _legacy_sync_list(labels_list, images_list)
+                images_list = _legacy_sync_list(images_list, labels_list)
+                _legacy_cleanup(output_dir, labels_list)
+                _legacy_cleanup(target_dir, images_list)
+
+            results.append(timed('legacy_sync_cleanup', len(pairs), legacy_sync_cleanup))
+
+    for result in results:
+        result['scale'] = scale
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='단계별 파이프라인 벤치마크')
+    parser.add_argument('--scales', default=','.join(str(s) for s in SCALES), help='쉼표로 구분한 Training 파일 수')
+    parser.add_argument('--image-size', type=int, nargs=2, default=BENCH_IMAGE_SIZE, metavar=('W', 'H'))
+    parser.add_argument('--objects', type=int, default=mdd.OBJECTS_PER_FILE, help='이미지당 객체 수')
+    parser.add_argument('--workers', type=int, default=tc.NUM_WORKERS, help='변환 워커 수')
+    parser.add_argument('--labels-only', action='store_true', help='라벨 단계만 측정 (이미지 생성 안 함)')
+    parser.add_argument('--imports-only', action='store_true', help='모듈 import 시간만 측정')
+    parser.add_argument('--work-dir', default=None, help='데이터셋을 만들 폴더 (기본: 임시 폴더)')
+    parser.add_argument('--keep', action='store_true', help='측정 후 데이터셋을 지우지 않음')
+    parser.add_argument('--output', default=None, help='결과 JSON 경로 (기본: bench_results/<시각>_<커밋>.json)')
+    args = parser.parse_args()
+
+    scales = [] if args.imports_only else [int(s) for s in args.scales.split(',') if s.strip()]
+    commit = git_commit()
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='voc_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'scales': scales,
+            'image_size': list(args.image_size),
+            'objects_per_file': args.objects,
+            'workers': args.workers,
+            'labels_only': args.labels_only,
+        },
+        'convert_equivalence': check_convert_equivalence(),
+        'results': [],
+    }
+    report['import_times'], report['label_only_imports_ok'] = check_import_times()
+
+    try:
+        for scale in scales:
+            report['results'].extend(bench_scale(scale, work_dir, tuple(args.image_size), args.objects,
+                                                 args.labels_only, args.workers))
+    finally:
+        if not args.keep and args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 벤치마크 결과 저장: {output_path}")
+
+if __name__ == '__main__':
+    main()
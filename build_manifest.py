@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+
+# --- [Configuration Section] ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. 단계별 처리 기록을 저장할 매니페스트 파일 경로
+MANIFEST_PATH = os.path.join(CURRENT_DIR, 'build_manifest.json')
+
+# 2. 크기는 같고 수정 시간만 다른 경우, 내용 해시로 변경 여부를 한 번 더 확인할지 여부
+USE_CONTENT_HASH = False
+
+# 3. 기록 N건마다 매니페스트를 디스크에 저장 (중단된 실행을 이어서 하기 위함)
+SAVE_EVERY = 1000
+
+def file_hash(path, block_size=1 << 20):
+    """
+    파일 내용의 SHA1 해시를 계산합니다.
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class BuildManifest:
+    """
+    단계(stage)별로 입력 파일의 경로/크기/수정 시간/(선택) 해시와 생성한 출력 파일을 기록합니다.
+    다시 실행할 때 바뀌지 않은 입력은 건너뛰고, 사라진 입력의 출력은 삭제할 수 있게 합니다.
+
+    파일 구조: {stage: {"params": ..., "entries": {src: {"size", "mtime", "hash", "outputs"}}}}
+    """
+
+    def __init__(self, path=MANIFEST_PATH, use_hash=USE_CONTENT_HASH, save_every=SAVE_EVERY):
+        self.path = path
+        self.use_hash = use_hash
+        self.save_every = save_every
+        self._pending = 0
+        self.stages = {}
+        # 여러 스플릿 단계가 같은 매니페스트를 동시에 사용할 수 있도록 보호
+        self._lock = threading.RLock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stages = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 매니페스트를 읽을 수 없어 새로 시작합니다. ({path}): {e}")
+                self.stages = {}
+
+    def _entries(self, stage):
+        return self.stages.setdefault(stage, {'params': None, 'entries': {}})['entries']
+
+    def begin_stage(self, stage, params=None):
+        """
+        단계 시작 시 호출합니다. 설정값(params, 예: 클래스 목록)이 지난 실행과 다르면
+        해당 단계의 기록을 비워 모든 입력을 다시 처리하도록 합니다.
+        """
+        with self._lock:
+            state = self.stages.setdefault(stage, {'params': None, 'entries': {}})
+            # JSON으로 저장/로드한 값과 비교할 수 있도록 튜플 등은 리스트 형태로 맞춥니다.
+            params = json.loads(json.dumps(params))
+            if state['params'] != params:
+                if state['entries']:
+                    print(f"🔄 [{stage}] 설정이 바뀌어 모든 입력을 다시 처리합니다.")
+                state['params'] = params
+                state['entries'] = {}
+
+    def is_up_to_date(self, stage, src):
+        """
+        src가 지난 기록과 같고(크기/수정 시간, 또는 해시), 기록된 출력이 모두 존재하면 True를 반환합니다.
+        """
+        with self._lock:
+            entry = self._entries(stage).get(src)
+        if entry is None:
+            return False
+
+        try:
+            st = os.stat(src)
+        except OSError:
+            return False
+
+        if not all(os.path.exists(out) for out in entry['outputs']):
+            return False
+
+        if st.st_size != entry['size']:
+            return False
+        if st.st_mtime == entry['mtime']:
+            return True
+
+        # 수정 시간만 바뀐 경우: 해시가 같으면 변경되지 않은 것으로 보고 기록을 갱신
+        if self.use_hash and entry.get('hash') is not None and file_hash(src) == entry['hash']:
+            with self._lock:
+                entry['mtime'] = st.st_mtime
+            return True
+        return False
+
+    def record(self, stage, src, outputs=()):
+        """
+        src 처리가 끝났음을 기록합니다. SAVE_EVERY건마다 자동으로 저장합니다.
+        """
+        try:
+            st = os.stat(src)
+        except OSError:
+            return
+
+        entry = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'hash': file_hash(src) if self.use_hash else None,
+            'outputs': list(outputs),
+        }
+
+        with self._lock:
+            self._entries(stage)[src] = entry
+            self._pending += 1
+            if self._pending >= self.save_every:
+                self.save()
+
+    def prune(self, stage, live_sources):
+        """
+        live_sources에 없는(원본이 사라진) 기록을 지우고, 그 기록의 출력 파일도 삭제합니다.
+        삭제한 출력 파일 수를 반환합니다.
+        """
+        live_sources = set(live_sources)
+        removed = 0
+
+        with self._lock:
+            entries = self._entries(stage)
+            stale = [entries.pop(src) for src in [s for s in entries if s not in live_sources]]
+
+        for entry in stale:
+            for out in entry['outputs']:
+                if os.path.exists(out):
+                    os.remove(out)
+                    removed += 1
+
+        if removed:
+            print(f"🗑️ [{stage}] 원본이 사라진 출력 파일 {removed}개 삭제")
+        return removed
+
+    def save(self):
+        """
+        임시 파일에 쓴 뒤 교체하여, 저장 도중 중단되어도 매니페스트가 깨지지 않도록 합니다.
+        """
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            # 샤드별 매니페스트처럼 아직 없는 폴더에 저장하는 경우
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stages, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._pending = 0
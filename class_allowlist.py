@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import dataset_inventory
+import sharding
+
+# --- [Configuration Section] ---
+# Training과 Validation의 클래스 목록이 다를 때, 클래스 폴더를 삭제하지 않고
+# 두 스플릿에 모두 있는 클래스만 '허용 목록'으로 한 번 계산하여 변환/쌍 생성 단계가 그 클래스만 읽도록 합니다.
+# 제외된 클래스의 원본(image/, label/)은 그대로 남고, 정말 지우려면 이 스크립트의 정리 명령을 따로 실행합니다.
+#
+#   python class_allowlist.py            : 제외된 클래스 폴더와 크기를 보여 주기만 함 (dry-run)
+#   python class_allowlist.py --delete   : 제외된 클래스 폴더를 병렬로 삭제
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. 허용 목록 파일 경로 (샤드 실행이면 샤드 폴더의 같은 이름 파일)
+ALLOWLIST_PATH = os.path.join(CURRENT_DIR, 'class_allowlist.json')
+
+# 2. 정리 명령에서 폴더 크기 계산/삭제를 동시에 실행할 스레드 수
+CLEANUP_WORKERS = 8
+
+# 3. 정리 대상 폴더 (각 스플릿 폴더 아래)
+CLEANUP_SUBDIRS = ('image', 'label', 'label_coco')
+
+def class_name_of(class_folder):
+    """'ID_클래스이름' 폴더 이름에서 클래스 이름을 꺼냅니다. (trans_coco.find_classes_from_folder_name과 같은 규칙)"""
+    return class_folder.split('_', 1)[-1].strip()
+
+def is_allowed(allowed, class_folder):
+    """allowed가 None이면 항상 True. 루트에 바로 있는 파일(class_folder가 '')도 그대로 사용합니다."""
+    return allowed is None or class_folder == '' or class_name_of(class_folder) in allowed
+
+def allowlist_path(shard=None):
+    """샤드마다 따로 쓰는 허용 목록 경로 (sharding.manifest_path와 같은 방식)"""
+    if shard is None:
+        return ALLOWLIST_PATH
+    return os.path.join(sharding.shard_dir(shard), os.path.basename(ALLOWLIST_PATH))
+
+def reconcile(train_classes, valid_classes, path=None):
+    """
+    두 스플릿의 클래스 목록에서 양쪽에 모두 있는 클래스(정렬)를 허용 목록으로 계산합니다.
+    path가 주어지면 허용/제외 목록을 파일로 저장합니다. (변환 단계와 정리 명령이 같은 결과를 사용)
+    허용 클래스 리스트를 반환합니다. (data.yaml과 YOLO 인덱스의 기준)
+    """
+    train_classes = {name.strip() for name in train_classes}
+    valid_classes = {name.strip() for name in valid_classes}
+    allowed = sorted(train_classes & valid_classes)
+    excluded = {'train_only': sorted(train_classes - valid_classes), 'valid_only': sorted(valid_classes - train_classes)}
+
+    if excluded['train_only'] or excluded['valid_only']:
+        print(f"⚠️ 스플릿 간 클래스 불일치: Training에만 {len(excluded['train_only'])}개, "
+              f"Validation에만 {len(excluded['valid_only'])}개 -> 두 스플릿에 모두 있는 {len(allowed)}개 클래스만 사용합니다.")
+        for name in excluded['train_only'] + excluded['valid_only']:
+            print(f"   - 제외: {name}")
+        print("   (원본 폴더는 삭제하지 않습니다. 정리가 필요하면: python class_allowlist.py)")
+
+    if path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'classes': allowed, 'excluded': excluded}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    return allowed
+
+def load_allowlist(path=ALLOWLIST_PATH):
+    """저장된 허용 목록을 읽어 {'classes': [...], 'excluded': {...}}를 반환합니다. 파일이 없으면 None입니다."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_allowed(path=ALLOWLIST_PATH):
+    """허용 클래스 집합 (파일이 없으면 None = 모든 클래스 허용)"""
+    allowlist = load_allowlist(path)
+    return None if allowlist is None else set(allowlist['classes'])
+
+# --- [정리 명령 (선택)] ---
+
+def find_excluded_folders(base_dirs, excluded_classes, subdirs=CLEANUP_SUBDIRS):
+    """base_dirs의 image/ label/ label_coco/ 바로 아래에서 제외된 클래스의 폴더 경로를 찾습니다."""
+    folders = []
+    for base_dir in base_dirs:
+        for subdir in subdirs:
+            root_dir = os.path.join(base_dir, subdir)
+            if not os.path.isdir(root_dir):
+                continue
+            with os.scandir(root_dir) as it:
+                folders.extend(entry.path for entry in it
+                               if entry.is_dir() and class_name_of(entry.name) in excluded_classes)
+    return sorted(folders)
+
+def folder_usage(folder_path):
+    """(폴더 경로, 파일 수, 전체 바이트)"""
+    file_count = 0
+    total_bytes = 0
+    for entry in dataset_inventory.iter_entries(folder_path):
+        file_count += 1
+        total_bytes += entry.size
+    return folder_path, file_count, total_bytes
+
+def _remove_folder(folder_path):
+    try:
+        shutil.rmtree(folder_path)
+        return folder_path, None
+    except Exception as e:
+        return folder_path, e
+
+def cleanup(base_dirs, excluded_classes, delete=False, workers=CLEANUP_WORKERS):
+    """
+    제외된 클래스의 폴더별 파일 수/크기를 병렬로 계산해 보여 줍니다. delete가 True일 때만 폴더를 병렬로 삭제합니다.
+    (삭제했거나 삭제할) 폴더 수를 반환합니다.
+    """
+    folders = find_excluded_folders(base_dirs, set(excluded_classes))
+    if not folders:
+        print("정리할 제외 클래스 폴더가 없습니다.")
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        usages = list(executor.map(folder_usage, folders))
+    print(f"\n--- 제외된 클래스 폴더 {len(folders)}개 ---")
+    for folder_path, file_count, total_bytes in usages:
+        print(f"  {folder_path}  (파일 {file_count}개, {total_bytes / 2**20:.1f} MiB)")
+    print(f"--- 합계: 파일 {sum(u[1] for u in usages)}개, {sum(u[2] for u in usages) / 2**30:.2f} GiB ---")
+
+    if not delete:
+        print("ℹ️ dry-run: 아무것도 삭제하지 않았습니다. 삭제하려면 --delete 옵션을 붙여 실행하세요.")
+        return len(folders)
+
+    print("\n--- [위험] 제외된 클래스 폴더 삭제를 시작합니다 ---")
+    removed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for folder_path, error in executor.map(_remove_folder, folders):
+            if error is None:
+                removed += 1
+                print(f"🗑️ 삭제됨: {folder_path}")
+            else:
+                print(f"❌ 삭제 실패 ({folder_path}): {error}")
+    return removed
+
+if __name__ == '__main__':
+    import create_data_yaml as cdy
+
+    parser = argparse.ArgumentParser(description='스플릿 간 불일치로 제외된 클래스 폴더 정리 (기본은 dry-run)')
+    parser.add_argument('--delete', action='store_true', help='보여 주기만 하지 않고 실제로 삭제')
+    parser.add_argument('--workers', type=int, default=CLEANUP_WORKERS, help='동시에 크기 계산/삭제할 폴더 수')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+
+    allowlist = load_allowlist(allowlist_path(args.shard))
+    if allowlist is None:
+        print(f"허용 목록이 없습니다: {allowlist_path(args.shard)} (trans_coco.py 또는 run_all.py를 먼저 실행하세요)")
+    else:
+        excluded_classes = allowlist['excluded']['train_only'] + allowlist['excluded']['valid_only']
+        base_dirs = [cdy.BASE_DIR, cdy.V_BASE_DIR]
+        if args.shard is not None:
+            base_dirs += [sharding.shard_path(args.shard, base_dir) for base_dir in base_dirs]
+        cleanup(base_dirs, excluded_classes, delete=args.delete, workers=args.workers)
@@ -0,0 +1,241 @@
+import argparse
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+import annotation_db
+import class_allowlist
+import coco_setting_train as cst
+import create_data_yaml as cdy
+import stage_metrics
+import tar_shards
+import trans_coco as tc
+
+# --- [Configuration Section] ---
+# VOC XML을 COCO instances JSON(detectron 계열 학습용)으로 내보냅니다.
+# XML을 따로 파싱하지 않고 trans_coco 변환이 채운 어노테이션 DB(annotation_db)의 레코드로 만듭니다.
+# images/annotations 를 파일에 바로 쓰므로 데이터셋 크기와 관계없이 메모리 사용량이 일정합니다.
+
+# 1. COCO JSON을 저장할 폴더 (파일 이름: instances_<split>.json)
+COCO_OUTPUT_DIR = './annotations'
+
+# 2. gzip으로 압축하여 저장할지 여부 (instances_<split>.json.gz)
+COCO_GZIP = False
+COCO_GZIP_LEVEL = 6
+
+# 3. COCO 카테고리 ID 시작 값 (COCO 관례는 1, YOLO 인덱스와 같게 하려면 0)
+CATEGORY_ID_START = 1
+
+# 4. images/<split>의 이미지가 리사이징되어 있으면(coco_setting_train.TARGET_SIZE) 박스와 이미지 크기를 그 크기로 맞춤
+SCALE_TO_TARGET_SIZE = True
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+class CocoStreamWriter:
+    """
+    COCO instances JSON을 한 레코드씩 디스크에 씁니다. ID는 추가하는 순서대로 1부터 부여합니다.
+    images는 출력 파일에 바로 쓰고, annotations는 임시 파일(spool)에 모았다가 마지막에 이어 붙입니다.
+    (COCO 형식은 images 배열 다음에 annotations 배열이 와야 하므로)
+    임시 파일에 쓴 뒤 교체하므로, 중간에 실패하면 이전 결과 파일이 그대로 남습니다.
+
+    예:
+        with CocoStreamWriter('instances_train.json', categories) as writer:
+            image_id = writer.add_image('a.jpg', 640, 640)
+            writer.add_annotation(image_id, 1, [x, y, w, h])
+    """
+
+    def __init__(self, output_path, categories, gzip_output=COCO_GZIP, info=None):
+        self.output_path = output_path
+        self.categories = categories
+        self.gzip_output = gzip_output
+        self.info = info or {'description': 'voc_data_2_coco_data export'}
+        self.image_count = 0
+        self.annotation_count = 0
+        self._tmp_path = output_path + '.tmp'
+        self._out = None
+        self._spool = None
+
+    def __enter__(self):
+        output_dir = os.path.dirname(os.path.abspath(self.output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        if self.gzip_output:
+            self._out = gzip.open(self._tmp_path, 'wt', encoding='utf-8', compresslevel=COCO_GZIP_LEVEL)
+        else:
+            self._out = open(self._tmp_path, 'w', encoding='utf-8')
+        self._spool = tempfile.TemporaryFile('w+', encoding='utf-8', dir=output_dir)
+        self._out.write(f'{{"info":{_dumps(self.info)},"licenses":[],"images":[')
+        return self
+
+    def add_image(self, file_name, width, height):
+        self.image_count += 1
+        record = {'id': self.image_count, 'file_name': file_name, 'width': width, 'height': height}
+        self._out.write(('' if self.image_count == 1 else ',') + _dumps(record))
+        return self.image_count
+
+    def add_annotation(self, image_id, category_id, bbox):
+        self.annotation_count += 1
+        record = {'id': self.annotation_count, 'image_id': image_id, 'category_id': category_id,
+                  'bbox': bbox, 'area': round(bbox[2] * bbox[3], 2), 'iscrowd': 0}
+        self._spool.write(('' if self.annotation_count == 1 else ',') + _dumps(record))
+        return self.annotation_count
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._out.write('],"annotations":[')
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, self._out, 1 << 20)
+                self._out.write(f'],"categories":{_dumps(self.categories)}}}')
+        finally:
+            self._spool.close()
+            self._out.close()
+
+        if exc_type is None:
+            os.replace(self._tmp_path, self.output_path)
+        elif os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        return False
+
+def coco_bbox(bbox, width, height, scale_x=1.0, scale_y=1.0):
+    """
+    Pascal VOC 좌표 (xmin, xmax, ymin, ymax, 1-based)를 COCO [x, y, w, h] (0-based 픽셀)로 바꿉니다.
+    trans_coco.convert_box와 같은 기준(-1)으로 이미지 안으로 잘라낸 뒤 scale_x/scale_y를 곱합니다.
+    """
+    x0 = min(max(bbox[0] - 1, 0.0), width)
+    x1 = min(max(bbox[1] - 1, 0.0), width)
+    y0 = min(max(bbox[2] - 1, 0.0), height)
+    y1 = min(max(bbox[3] - 1, 0.0), height)
+    return [round(x0 * scale_x, 2), round(y0 * scale_y, 2),
+            round((x1 - x0) * scale_x, 2), round((y1 - y0) * scale_y, 2)]
+
+def tar_image_names(split_dir):
+    """tar 샤드 index.tsv에서 'stem -> 이미지 멤버 이름(<stem>.<확장자>)' 딕셔너리를 만듭니다. (라벨 txt 멤버 제외)"""
+    return {stem: name for stem, members in tar_shards.load_index(split_dir).items()
+            for name in members if not name.endswith('.txt')}
+
+def find_image_name(image_dir, filename, tar_images=None):
+    """
+    image_dir에서 XML의 <filename>에 해당하는 이미지 파일 이름을 찾습니다. (확장자가 다르면 같은 stem으로 찾음)
+    tar_images(tar_image_names 결과)가 주어지면 tar 샤드에 저장된 같은 stem의 이미지 멤버 이름을 찾습니다.
+    없으면 None을 반환합니다. 둘 다 None이면 <filename>을 그대로 사용합니다.
+    """
+    name = os.path.basename(filename)
+    if tar_images is not None:
+        return tar_images.get(os.path.splitext(name)[0])
+    if image_dir is None:
+        return name
+    if os.path.exists(os.path.join(image_dir, name)):
+        return name
+    stem = os.path.splitext(name)[0]
+    for ext in cst.resized_extensions() + ('.png', '.bmp'):
+        for candidate in (stem + ext, stem + ext.upper()):
+            if os.path.exists(os.path.join(image_dir, candidate)):
+                return candidate
+    return None
+
+def output_path_for(split_name, output_dir=COCO_OUTPUT_DIR, gzip_output=COCO_GZIP):
+    return os.path.join(output_dir, f"instances_{split_name}.json" + ('.gz' if gzip_output else ''))
+
+def export_split(label_dir, classes_list, output_path, image_dir=None, gzip_output=COCO_GZIP, scale_to_target=None,
+                 db_path=None, tar_dir=None, allowed=None):
+    """
+    label_dir 아래 XML을 COCO instances JSON 하나로 내보냅니다.
+    레코드는 어노테이션 DB에서 읽습니다. DB를 먼저 갱신하지만, 변환 직후에는 바뀐 XML이 없어 파싱하지 않습니다.
+    (DB가 비어 있거나 오래된 경우에만 그 XML을 한 번 파싱하여 DB에 저장)
+    image_dir(예: './images/train')이 주어지면 그 폴더에 이미지가 있는 XML만 포함하고,
+    리사이징된 이미지(coco_setting_train.TARGET_SIZE)는 박스와 크기를 그 크기로 맞춥니다.
+    tar_dir(OUTPUT_MODE = 'tar'의 스플릿 샤드 폴더)이 주어지면 image_dir 대신 그 index.tsv에 있는 샘플만 포함하여
+    'files' 모드와 같은 이미지/박스를 내보냅니다. (scale_to_target으로 직접 정할 수도 있음)
+    allowed(허용 클래스 집합)가 주어지면 제외된 클래스 폴더의 XML은 읽지도 내보내지도 않습니다. (class_allowlist)
+    XML 경로 순서대로 처리하므로 실행마다 ID가 같습니다. 집계 딕셔너리를 반환합니다.
+    """
+    category_ids = {}
+    for i, class_name in enumerate(classes_list):
+        category_ids.setdefault(class_name, i + CATEGORY_ID_START)
+    categories = [{'id': i + CATEGORY_ID_START, 'name': name, 'supercategory': 'none'}
+                  for i, name in enumerate(classes_list)]
+    if scale_to_target is None:
+        scale_to_target = SCALE_TO_TARGET_SIZE and (image_dir is not None or tar_dir is not None)
+    tar_images = tar_image_names(tar_dir) if tar_dir is not None else None
+    target_size = cst.TARGET_SIZE if scale_to_target else None
+
+    print(f"\n--- COCO JSON 내보내기 시작: {label_dir} -> {output_path} ---")
+    counts = {'images': 0, 'annotations': 0, 'no_image': 0, 'unknown_class': 0, 'empty_box': 0, 'failed': 0}
+
+    progress = stage_metrics.ProgressPrinter('ing~~')
+    with stage_metrics.StageMetrics(f"coco:{os.path.normpath(label_dir)}") as metrics, \
+            annotation_db.AnnotationDB(db_path or annotation_db.ANNOTATION_DB_PATH) as db:
+        _, counts['failed'], _ = db.update(label_dir, allowed=allowed)
+        metrics.add(errors=counts['failed'])
+        # 루트에 바로 있는 XML(클래스 폴더 '')은 다른 단계와 마찬가지로 항상 포함
+        class_folders = {folder for folder in db.class_folders(label_dir) if class_allowlist.is_allowed(allowed, folder)}
+
+        with CocoStreamWriter(output_path, categories, gzip_output) as writer:
+            for annotation in db.iter_annotations(label_dir, class_folders | {''}):
+                metrics.add(files=1)
+                progress.update()
+                image_name = find_image_name(image_dir, annotation.filename, tar_images)
+                if image_name is None:
+                    counts['no_image'] += 1
+                    continue
+
+                # 리사이징된 이미지(jpg)이면 그 크기 기준으로 변환
+                width, height = annotation.width, annotation.height
+                scale_x = scale_y = 1.0
+                image_width, image_height = width, height
+                if target_size is not None and image_name.lower().endswith(cst.resized_extensions()) and width and height:
+                    image_width, image_height = target_size
+                    scale_x, scale_y = image_width / width, image_height / height
+
+                image_id = writer.add_image(image_name, image_width, image_height)
+                for obj in annotation.objects:
+                    # 'difficult' 객체는 YOLO 변환과 마찬가지로 제외
+                    if obj.difficult:
+                        continue
+                    category_id = category_ids.get(obj.name)
+                    if category_id is None:
+                        counts['unknown_class'] += 1
+                        continue
+                    box = coco_bbox(obj.bbox, width, height, scale_x, scale_y)
+                    if box[2] <= 0 or box[3] <= 0:
+                        counts['empty_box'] += 1
+                        continue
+                    writer.add_annotation(image_id, category_id, box)
+        counts['images'] = writer.image_count
+        counts['annotations'] = writer.annotation_count
+        metrics.add(bytes_written=os.path.getsize(output_path))
+        metrics.extra.update(counts)
+    progress.close()
+
+    print(f"✅ COCO JSON 저장 완료: {output_path} (이미지 {counts['images']}개, 박스 {counts['annotations']}개)")
+    if counts['no_image'] or counts['unknown_class'] or counts['empty_box']:
+        print(f"--- 제외: 이미지 없음 {counts['no_image']}개, 알 수 없는 클래스 {counts['unknown_class']}개, "
+              f"크기 0 박스 {counts['empty_box']}개 ---")
+    return counts
+
+def read_classes(base_dir):
+    """trans_coco.py가 만든 classes.txt를 읽습니다. (data.yaml과 같은 순서)"""
+    classes = []
+    cdy.get_classes_list(os.path.join(base_dir, cdy.CLASSES_TEXT_FILE), classes)
+    return [name.strip() for name in classes if name.strip()]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='VOC XML -> COCO instances JSON 내보내기')
+    parser.add_argument('--gzip', action='store_true', default=COCO_GZIP, help='gzip으로 압축하여 저장')
+    parser.add_argument('--output-dir', default=COCO_OUTPUT_DIR, help='COCO JSON을 저장할 폴더')
+    parser.add_argument('--all-xml', action='store_true',
+                        help='images/<split>에 이미지가 없는 XML도 포함 (원본 크기 기준)')
+    args = parser.parse_args()
+
+    # data.yaml과 같은 클래스 순서(Training classes.txt)를 두 스플릿에 모두 사용
+    classes = read_classes(tc.BASE_DIR)
+    allowed = class_allowlist.load_allowed()
+    tar_mode = cst.OUTPUT_MODE == 'tar' and not args.all_xml
+    for split_name, label_dir, image_dir in (('train', tc.LABEL_ROOT_DIR, cst.TARGET_DIR),
+                                             ('valid', tc.V_LABEL_ROOT_DIR, cst.V_TARGET_DIR)):
+        export_split(label_dir, classes, output_path_for(split_name, args.output_dir, args.gzip),
+                     None if args.all_xml or tar_mode else image_dir, args.gzip,
+                     tar_dir=tar_shards.split_dir_for(split_name) if tar_mode else None, allowed=allowed)
@@ -1,12 +1,21 @@
+import argparse
+import multiprocessing
 import os
 import shutil
 import tempfile
-
-import cv2
-import os
-import glob
-
-from PIL import Image
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import build_manifest
+import class_allowlist
+import dataset_inventory
+import external_sort
+import label_store
+import queue_pipeline
+import sharding
+import stage_metrics
+import tar_shards
 
 BASE_DIR = './Training' 
 # 2. XML 파일 입력 폴더
@@ -32,158 +41,14 @@ V_SOURCE_DIR = os.path.join(V_BASE_DIR, 'image')
 # 대상 경로: image_coco 폴더 (BASE_DIR과 동일 레벨에 생성/사용)
 V_TARGET_DIR = os.path.join('./images', 'valid')
 
-def cp_file(origin_path, mv_path):
-    # 대상 폴더가 없으면 생성합니다.
-    os.makedirs(mv_path, exist_ok=True)
-    print(f"대상 폴더: '{mv_path}' 준비 완료.")
-    print("-" * 30)
-
-    # 3. 파일 복사 프로세스
-    total_copied = 0
-
-    # os.walk를 사용하여 origin pathdhk 그 하위의 모든 폴더를 탐색합니다.
-    for root, dirs, files in os.walk(origin_path):
-        for filename in files:
-            if 'meta' in filename.lower():
-                    continue
-            # 원본 파일의 전체 경로
-            source_file_path = os.path.join(root, filename)
-            
-            # 대상 파일의 전체 경로 (mv_path 바로 아래에 복사)
-            target_file_path = os.path.join(mv_path, filename)
-            
-            try:
-                # shutil.copy2는 파일의 메타데이터(수정 시간 등)도 함께 복사합니다.
-                shutil.copy2(source_file_path, target_file_path)
-                total_copied += 1
-                # 진행 상황을 한 줄에 표시
-                print(f'\r✅ 복사 완료: {total_copied}개 파일 ({filename})', end='')
-                
-            except Exception as e:
-                    print(f"\n❌ 오류 발생 - 파일 복사 실패: {source_file_path} -> {e}")
-
-    print(f"\n\n--- 총 {total_copied}개의 .jpg 파일이 '{mv_path}' 폴더로 복사 완료되었습니다. ---")
-
-def get_filename_without_extension(filename):
-    """
-    확장자가 포함된 파일 이름에서 확장자를 제거한 파일 이름만 반환합니다.
-    예: 'image_01.jpg' -> 'image_01'
-    """
-    # os.path.splitext()를 사용하여 이름과 확장자를 분리하고, 이름 부분만 반환
-    result = os.path.splitext(filename)[0]
-    return result
-
-def sync_list_a_by_list_b(list_a, list_b):
-    """
-    list_a를 list_b를 기준으로 동기화합니다. 
-    list_a 요소의 확장자 미포함 이름이 list_b의 확장자 미포함 이름 목록에 없으면 list_a에서 해당 요소를 제거합니다.
-
-    Args:
-        list_a (list): 동기화할 대상 리스트 (원본이 수정됨).
-        list_b (list): 비교 기준이 되는 리스트.
-
-    Returns:
-        list: 동기화되어 수정된 list_a (list_a와 동일한 객체).
-    """
-    # 1. 비교 기준이 되는 list_b의 '확장자 미포함' 파일 이름 집합(Set) 생성
-    # Set을 사용하면 요소 존재 여부를 O(1)의 속도로 빠르게 확인할 수 있습니다.
-    b_names_set = {get_filename_without_extension(name) for name in list_b}
-
-    # 2. list_a를 순회하며 동기화 (원본 리스트를 수정하므로 역순 순회가 안전합니다)
-    i = len(list_a) - 1
-    while i >= 0:
-        filename_a = list_a[i]
-        name_a_without_ext = get_filename_without_extension(filename_a)
-        
-        # list_a의 파일 이름이 list_b 이름 목록에 없으면 제거
-        if name_a_without_ext not in b_names_set:
-            list_a.pop(i) # 해당 인덱스의 요소 제거
-            print(f"  제거됨: {filename_a} (이유: '{name_a_without_ext}'가 기준 리스트에 없음)")
-        
-        i -= 1
-        
-    return list_a
-
-def secure_file_sync_and_cleanup(origin_dir, files_to_keep_list):
-    """
-    files_to_keep_list에 있는 파일만 남기고, origin_dir의 나머지 파일을 정리합니다.
-    임시 폴더를 사용한 안전한 이동/복구 방식을 사용합니다.
-
-    Args:
-        origin_dir (str): 파일들이 위치한 원본 디렉토리 경로.
-        files_to_keep_list (list): 삭제하지 않고 남겨야 할 파일 이름 (확장자 포함) 리스트.
-    """
-    print(f"\n--- 안전한 파일 정리 시작: {origin_dir} ---")
-    
-    # 1. 임시 작업 폴더 생성
-    # tempfile.mkdtemp()는 OS의 임시 디렉토리에 고유한 이름의 폴더를 생성합니다.
-    temp_dir = tempfile.mkdtemp(prefix='yolo_sync_temp_', dir=origin_dir)
-    print(f"📦 임시 저장 폴더 생성: {temp_dir}")
-
-    # 2. 남겨야 할 파일들을 임시 폴더로 이동 (KEEP)
-    moved_count = 0
-    files_to_move = {} # key: 원본 경로, value: 임시 경로 (복구를 위해 저장)
-
-    try:
-        # origin_dir을 순회하며 남겨야 할 파일을 찾습니다.
-        for root, _, files in os.walk(origin_dir):
-            if root == temp_dir: # 임시 폴더가 origin_dir의 하위에 있는 경우 건너뜁니다.
-                continue
-
-            for filename in files:
-
-                if filename in files_to_keep_list:
-                    original_path = os.path.join(root, filename)
-                    temp_path = os.path.join(temp_dir, filename)
-                    
-                    # shutil.move: 파일 이동
-                    shutil.move(original_path, temp_path)
-                    files_to_move[temp_path] = original_path # 복구 정보를 저장
-                    moved_count += 1
-        
-        print(f"✅ 1단계 완료: 남길 파일 {moved_count}개를 임시 폴더로 이동했습니다.")
-        
-        # 3. 원본 폴더의 나머지 파일 삭제 (CLEANUP)
-        deleted_count = 0
-        
-        # 임시 폴더로 이동된 파일은 이제 원본 폴더에 없습니다.
-        # os.walk를 다시 실행하여 남아있는 파일(삭제 대상)을 찾습니다.
-        for root, _, files in os.walk(origin_dir):
-            if root == temp_dir:
-                 continue
-                 
-            for filename in files:
-                # 남아있는 모든 파일이 삭제 대상입니다.
-                full_file_path = os.path.join(root, filename)
-                os.remove(full_file_path)
-                # print(f"🗑️ 삭제: {full_file_path}")
-                deleted_count += 1
-                
-        print(f"✅ 2단계 완료: 원본 폴더에서 {deleted_count}개 불필요 파일 삭제 완료.")
-
-        # 4. 파일 복구 및 임시 폴더 삭제 (RESTORE & REMOVE)
-        restored_count = 0
-        for temp_path, original_path in files_to_move.items():
-            shutil.move(temp_path, original_path)
-            restored_count += 1
-
-        print(f"✅ 3단계 완료: {restored_count}개 파일 원본 위치로 복구 완료.")
-        
-    finally:
-        # 에러 발생 여부와 관계없이 임시 폴더는 반드시 삭제
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            print(f"🔥 4단계 완료: 임시 폴더 삭제 ({temp_dir})")
-
-    print("\n--- 안전한 파일 정리 및 복구 작업 완료 ---")
-
-def create_image_paths_txt(images_list, output_filename="paths.txt"):
+def create_image_paths_txt(images_list, output_filename="paths.txt", output_dir=None):
     """
     주어진 파일명 리스트를 기반으로 각 파일 앞에 경로를 붙여 TXT 파일을 생성합니다.
 
     Args:
-        images_list (list): 확장자 포함 파일명 리스트 (예: ['cat_01.jpg', 'dog_02.png']).
+        images_list (list): 확장자 포함 파일명 리스트 (예: ['cat_01.jpg', 'dog_02.png']). 한 번만 순서대로 읽으므로 제너레이터도 됩니다.
         output_filename (str): 생성할 TXT 파일의 이름.
+        output_dir (str): TXT 파일을 저장할 폴더. (기본값: 이 스크립트가 있는 폴더, 샤드 실행이면 샤드 폴더)
     """
     # 1. .을 기준으로 문자열을 나눔: ['train', 'txt']
     parts = output_filename.split('.')
@@ -192,7 +57,8 @@ def create_image_paths_txt(images_list, output_filename="paths.txt"):
     result = parts[0]
 
     # 현재 스크립트가 실행되는 디렉토리
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    current_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(current_dir, exist_ok=True)
     output_path = os.path.join(current_dir, output_filename)
     
     # TXT 파일에 들어갈 기본 경로 접두사
@@ -219,81 +85,824 @@ def create_image_paths_txt(images_list, output_filename="paths.txt"):
     except Exception as e:
         print(f"❌ 파일 작성 중 오류 발생: {e}")
  
-# 목표 해상도 (가로, 세로)
+# 목표 해상도 (가로, 세로). None이면 리사이징하지 않고 LINK_MODE 방식으로 이미지를 만듭니다.
 TARGET_SIZE = (640, 640) 
 
-def img_resize(target_dir) :
-        # TARGET_DIR 내의 모든 jpg 및 jpeg 파일 목록을 가져옵니다.
-        image_extensions = ('.jpg', '.jpeg') # 검색하려는 확장자들을 소문자로 정의
-
-        image_files = []
-        for filename in os.listdir(target_dir):
-            # 파일 확장자를 소문자로 변환하여 일치하는지 확인
-            if filename.lower().endswith(image_extensions):
-                file_path = os.path.join(target_dir, filename)
-                image_files.append(file_path)
-
-        total_images = len(image_files)
-
-        if total_images == 0:
-            print(f"❌ '{target_dir}' 경로에서 JPG/JPEG 파일을 찾을 수 없습니다.")
-        else:
-            print(f"총 {total_images}개의 이미지를 {TARGET_SIZE[0]}x{TARGET_SIZE[1]}로 리사이징 시작...")
-            
-            for i, file_path in enumerate(image_files):
-                # 덮어쓰기이므로 input_path와 output_path가 동일합니다.
-                output_path = file_path 
-                filename = os.path.basename(file_path)
+# 복사+리사이징 단계의 병렬 워커 수와 풀 종류 ('pipeline', 'thread' 또는 'process')
+# 'pipeline': 읽기(디스크) -> 디코딩/리사이징/인코딩(CPU) -> 쓰기(디스크)를 크기 제한 큐로 연결한 단계별 스레드로
+#             나누어 디스크와 CPU 작업을 겹쳐 실행합니다. (queue_pipeline) IMAGE_WORKERS는 CPU 단계의 스레드 수입니다.
+# 'thread'/'process': 이미지 하나의 읽기~쓰기를 워커 하나가 모두 처리합니다.
+# cv2는 디코딩/리사이징/인코딩 중 GIL을 해제하므로 스레드로 충분합니다.
+IMAGE_WORKERS = os.cpu_count() or 1
+IMAGE_POOL = 'pipeline'
+
+# 'pipeline'의 읽기/쓰기 단계 스레드 수와 단계 사이 큐 크기 (큐에 쌓이는 원본/인코딩 바이트 수를 제한)
+IMAGE_READ_WORKERS = 4
+IMAGE_WRITE_WORKERS = 2
+IMAGE_QUEUE_SIZE = 32
+
+# 리사이징 대상 이미지 확장자 (소문자)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg')
+
+# 원본이 TARGET_SIZE의 2/4/8배 이상이면 JPEG를 처음부터 1/2, 1/4, 1/8 크기로 디코딩 (cv2.IMREAD_REDUCED_COLOR_*)
+# (4032x3024 원본을 640x640으로 줄일 때 전체 해상도 디코딩을 하지 않음. 헤더 크기 확인에 PIL 사용)
+USE_REDUCED_DECODE = True
+
+# 리사이징한 이미지의 인코딩 설정
+# OUTPUT_IMAGE_FORMAT: None이면 원본 확장자 유지, '.webp'이면 WebP로 저장 (파일 이름의 확장자도 바뀜)
+JPEG_QUALITY = 95
+WEBP_QUALITY = 90
+OUTPUT_IMAGE_FORMAT = None
+
+# 라벨(과 리사이징하지 않는 파일)을 images/labels 폴더에 만드는 방식
+# 'copy': 전체 복사 / 'hardlink': 하드링크 / 'reflink': FICLONE 또는 copy_file_range (XFS/btrfs에서 블록 공유)
+# 'symlink': 심볼릭 링크 (원본 절대 경로). 지원되지 않으면 자동으로 다음 방식 -> 'copy'로 대체합니다.
+LINK_MODE = 'copy'
+LINK_MODES = ('copy', 'hardlink', 'reflink', 'symlink')
+
+# 이미지/라벨 출력 방식
+# 'files': images/<split>, labels/<split>에 파일 하나씩 저장 (기존 방식)
+# 'tar': 리사이징한 이미지와 라벨을 tar_shards.TAR_OUTPUT_DIR/<split>/의 크기 제한 tar 샤드로 저장하고,
+#        train.txt/valid.txt에는 샤드 경로 목록을 씀 (파일 수십만 개 대신 순차 I/O)
+OUTPUT_MODE = 'files'
+OUTPUT_MODES = ('files', 'tar')
+
+# 스트리밍 모드 (파일 수백만 개 이상의 스플릿용, OUTPUT_MODE = 'files'에서만 사용)
+# 이미지/라벨 목록과 쌍 인덱스를 메모리에 만들지 않고, 디스크의 정렬된 run 파일(external_sort)을 stem 순서로
+# 병합 조인합니다. 파일 수와 관계없이 메모리 사용량이 일정하고 train.txt 순서는 기존과 같은 stem 순서입니다.
+# 매니페스트 대신 '대상 파일이 원본보다 새로우면 건너뜀'으로 증분 처리하며, 라벨 저장소는 만들지 않습니다.
+STREAMING_MODE = False
+
+# Linux FICLONE ioctl 번호 (_IOW(0x94, 9, int))
+FICLONE = 0x40049409
+
+def _reflink(source_file_path, target_file_path):
+    """
+    FICLONE으로 블록을 공유하는 복사본을 만들고, 실패하면 copy_file_range(커널 내부 복사)를 시도합니다.
+    둘 다 지원되지 않으면 OSError를 발생시킵니다.
+    """
+    with open(source_file_path, 'rb') as src, open(target_file_path, 'wb') as dst:
+        try:
+            import fcntl
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except (ImportError, OSError):
+            if not hasattr(os, 'copy_file_range'):
+                raise OSError("reflink/copy_file_range를 지원하지 않는 환경입니다.")
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    shutil.copystat(source_file_path, target_file_path)
+
+def materialize_file(source_file_path, target_file_path, link_mode=LINK_MODE):
+    """
+    link_mode 방식으로 target_file_path에 source_file_path의 내용을 만듭니다.
+    링크 방식이 실패하면(다른 파일 시스템, 권한 부족 등) shutil.copy2로 대체합니다. 실제 사용한 방식을 반환합니다.
+    주의: 하드링크/심볼릭 링크는 원본과 내용을 공유하므로, 만든 뒤 제자리에서 수정하면 안 됩니다.
+    """
+    # 기존 파일(또는 링크)을 먼저 제거합니다. 링크 생성이 실패하지 않도록 하고,
+    # 지난 실행의 링크를 통해 원본에 덮어쓰는 일이 없도록 하기 위함입니다.
+    if os.path.lexists(target_file_path):
+        os.remove(target_file_path)
+
+    if link_mode != 'copy':
+        try:
+            if link_mode == 'hardlink':
+                os.link(source_file_path, target_file_path)
+            elif link_mode == 'symlink':
+                os.symlink(os.path.abspath(source_file_path), target_file_path)
+            elif link_mode == 'reflink':
+                _reflink(source_file_path, target_file_path)
+            else:
+                raise ValueError(f"알 수 없는 link_mode: {link_mode} (가능한 값: {LINK_MODES})")
+            return link_mode
+        except OSError:
+            if os.path.lexists(target_file_path):
+                os.remove(target_file_path)
+
+    # shutil.copy2는 파일의 메타데이터(수정 시간 등)도 함께 복사합니다.
+    shutil.copy2(source_file_path, target_file_path)
+    return 'copy'
+
+def output_image_name(filename):
+    """images/<split>에 저장할 이미지 파일 이름 (OUTPUT_IMAGE_FORMAT이 설정되면 리사이징 대상의 확장자를 바꿈)"""
+    if OUTPUT_IMAGE_FORMAT is None or TARGET_SIZE is None or not filename.lower().endswith(IMAGE_EXTENSIONS):
+        return filename
+    return os.path.splitext(filename)[0] + OUTPUT_IMAGE_FORMAT
+
+def encode_settings():
+    """결과 이미지에 영향을 주는 설정 (바뀌면 매니페스트가 이미지를 모두 다시 만들도록 단계 params에 포함)"""
+    return {'reduced_decode': USE_REDUCED_DECODE, 'jpeg_quality': JPEG_QUALITY, 'webp_quality': WEBP_QUALITY,
+            'format': OUTPUT_IMAGE_FORMAT}
+
+def resized_extensions():
+    """리사이징되어 TARGET_SIZE가 된 출력 이미지의 확장자 목록 (라벨 저장소/COCO 내보내기에서 크기 판단용)"""
+    return IMAGE_EXTENSIONS + ((OUTPUT_IMAGE_FORMAT,) if OUTPUT_IMAGE_FORMAT else ())
+
+def _same_format(ext_a, ext_b):
+    normalize = lambda ext: '.jpg' if ext.lower() in ('.jpg', '.jpeg') else ext.lower()
+    return normalize(ext_a) == normalize(ext_b)
+
+def image_header_size(file_path):
+    """
+    이미지 헤더만 읽어 (가로, 세로)를 반환합니다. PIL이 없거나 읽을 수 없으면 None입니다. (전체 디코딩 없음)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(file_path) as img:
+            return img.size
+    except Exception:
+        return None
 
-                try:
-                    img = cv2.imread(file_path)
-                    
-                    if img is None:
-                        print(f"  > 경고: '{filename}' 파일을 읽을 수 없습니다.")
-                        continue
+def reduced_decode_flag(size):
+    """
+    원본 크기(size)가 TARGET_SIZE의 8/4/2배 이상이면 그 배율로 줄여서 디코딩하는 cv2 플래그를 반환합니다.
+    (EXIF 회전을 고려해 긴 변/짧은 변끼리 비교하므로 줄인 결과가 TARGET_SIZE보다 작아지지 않음)
+    """
+    import cv2
+
+    if not USE_REDUCED_DECODE or size is None:
+        return cv2.IMREAD_COLOR
+    source_long, source_short = max(size), min(size)
+    target_long, target_short = max(TARGET_SIZE), min(TARGET_SIZE)
+    for factor, flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if source_long >= target_long * factor and source_short >= target_short * factor:
+            return flag
+    return cv2.IMREAD_COLOR
+
+def encode_params(ext):
+    """확장자별 cv2.imencode 설정 (JPEG_QUALITY / WEBP_QUALITY)"""
+    import cv2
+
+    ext = ext.lower()
+    if ext in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+    if ext == '.webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]
+    return []
+
+def read_image(file_path, flags=None):
+    """
+    한글 경로에서도 동작하도록 파일을 바이트로 읽은 뒤 디코딩합니다. (cv2.imread는 Windows 한글 경로를 읽지 못함)
+    flags를 주면 그 방식(예: reduced_decode_flag의 결과)으로 디코딩합니다.
+    """
+    import cv2
+    import numpy as np
 
-                    # 이미지 리사이징
-                    resized_img = cv2.resize(img, TARGET_SIZE, interpolation=cv2.INTER_LINEAR)
-                    
-                    # 원본 파일 경로에 덮어쓰기 저장
-                    cv2.imwrite(output_path, resized_img)
+    data = np.fromfile(file_path, dtype=np.uint8)
+    return cv2.imdecode(data, cv2.IMREAD_COLOR if flags is None else flags)
 
-                    if (i + 1) % 100 == 0 or (i + 1) == total_images:
-                        print(f"\r  > 진행률: {i + 1}/{total_images}개 이미지 덮어쓰기 완료.", end='')
+def encode_image(img, ext):
+    """ext 형식(JPEG_QUALITY/WEBP_QUALITY 적용)으로 메모리에서 인코딩한 numpy 바이트 배열을 반환합니다."""
+    import cv2
 
-                except Exception as e:
-                    print(f"  > 오류 발생: '{filename}' 덮어쓰기 중 문제 발생: {e}")
+    ok, encoded = cv2.imencode(ext, img, encode_params(ext))
+    if not ok:
+        raise ValueError("이미지 인코딩에 실패했습니다.")
+    return encoded
 
-            print("-" * 40)
-            print("✅ 모든 이미지 파일 덮어쓰기 완료.") 
+def write_image(file_path, img):
+    """
+    한글 경로에서도 동작하도록 메모리에서 인코딩한 뒤 파일로 씁니다. 쓴 바이트 수를 반환합니다.
+    """
+    encoded = encode_image(img, os.path.splitext(file_path)[1])
+    encoded.tofile(file_path)
+    return encoded.size
+
+def resize_to_target(img):
+    """TARGET_SIZE로 리사이징합니다. (줄여서 디코딩한 결과가 이미 TARGET_SIZE이면 그대로 반환)"""
+    import cv2
+
+    if (img.shape[1], img.shape[0]) == tuple(TARGET_SIZE):
+        return img
+    return cv2.resize(img, TARGET_SIZE, interpolation=cv2.INTER_LINEAR)
+
+def is_pass_through(size, source_file_path, output_ext):
+    """헤더 크기가 이미 TARGET_SIZE이고 저장 형식이 같으면 다시 인코딩하지 않고 원본 바이트를 그대로 사용"""
+    return size is not None and tuple(size) == tuple(TARGET_SIZE) and \
+        _same_format(os.path.splitext(source_file_path)[1], output_ext)
+
+def needs_resize(source_file_path, output_ext):
+    """
+    (리사이징 여부, 헤더 크기)를 반환합니다. 리사이징하지 않는 파일(TARGET_SIZE가 None이거나 이미지가 아닌 파일)과
+    이미 TARGET_SIZE이고 저장 형식이 같은 이미지는 False이며, 다시 인코딩하지 않고 원본 바이트를 그대로 사용합니다.
+    """
+    if TARGET_SIZE is None or not source_file_path.lower().endswith(IMAGE_EXTENSIONS):
+        return False, None
+    header_size = image_header_size(source_file_path)
+    return not is_pass_through(header_size, source_file_path, output_ext), header_size
+
+def resize_encoded(data, header_size, output_ext):
+    """원본 바이트를 (큰 JPEG는 줄여서) 디코딩하고 TARGET_SIZE로 리사이징한 뒤 output_ext 형식으로 인코딩합니다."""
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), reduced_decode_flag(header_size))
+    if img is None:
+        return None
+    return encode_image(resize_to_target(img), output_ext)
+
+def _unlink_shared_target(target_file_path):
+    # 새로 쓰기 전에 기존 링크를 끊어 원본이 덮어써지지 않도록 합니다.
+    if os.path.islink(target_file_path) or (os.path.exists(target_file_path) and os.stat(target_file_path).st_nlink > 1):
+        os.remove(target_file_path)
+
+def copy_resize_image(source_file_path, target_file_path, link_mode='copy'):
+    """
+    원본 이미지를 한 번만 읽어 TARGET_SIZE로 리사이징한 뒤 대상 경로에 바로 씁니다.
+    (복사한 뒤 다시 읽어 덮어쓰던 두 단계를 하나로 합친 작업)
+    리사이징하지 않는 파일(TARGET_SIZE가 None이거나 이미지가 아닌 파일)과 이미 TARGET_SIZE인 이미지는
+    다시 인코딩하지 않고 link_mode 방식으로 만듭니다. 큰 JPEG는 줄여서 디코딩합니다. (reduced_decode_flag)
+    (원본 경로, 대상 경로, 오류 메시지 또는 None, 읽은 바이트, 쓴 바이트)를 반환합니다.
+    """
+    try:
+        resize, header_size = needs_resize(source_file_path, os.path.splitext(target_file_path)[1])
+        if not resize:
+            # 리사이징 대상이 아니거나 이미 목표 크기인 파일은 그대로 복사(또는 링크)
+            used_mode = materialize_file(source_file_path, target_file_path, link_mode)
+            size = os.path.getsize(source_file_path) if used_mode == 'copy' else 0
+            return source_file_path, target_file_path, None, size, size
+
+        _unlink_shared_target(target_file_path)
+
+        bytes_read = os.path.getsize(source_file_path)
+        img = read_image(source_file_path, reduced_decode_flag(header_size))
+        if img is None:
+            return source_file_path, target_file_path, f"  > 경고: '{source_file_path}' 파일을 읽을 수 없습니다.", bytes_read, 0
+
+        bytes_written = write_image(target_file_path, resize_to_target(img))
+        return source_file_path, target_file_path, None, bytes_read, bytes_written
+
+    except Exception as e:
+        return source_file_path, target_file_path, f"  > 오류 발생: '{source_file_path}' 처리 중 문제 발생: {e}", 0, 0
+
+def encode_output_image(source_file_path):
+    """
+    copy_resize_image가 파일로 쓰는 것과 같은 이미지를 바이트로 반환합니다. (tar 출력용)
+    리사이징 대상이 아니거나 이미 목표 크기이면 원본 바이트를 그대로 반환합니다. (읽은 바이트 수, 결과 바이트)를 반환합니다.
+    """
+    output_ext = os.path.splitext(output_image_name(source_file_path))[1]
+    resize, header_size = needs_resize(source_file_path, output_ext)
+    with open(source_file_path, 'rb') as f:
+        data = f.read()
+    if not resize:
+        return len(data), data
+
+    encoded = resize_encoded(data, header_size, output_ext)
+    if encoded is None:
+        raise ValueError(f"'{source_file_path}' 파일을 읽을 수 없습니다.")
+    return len(data), encoded.tobytes()
+
+# --- [이미지 파이프라인 단계 (IMAGE_POOL = 'pipeline')] ---
+# 작업 하나는 딕셔너리 하나이며 단계를 거치며 채워집니다. 'done'이면 이후 단계는 그대로 넘깁니다.
+
+def _read_stage(job):
+    """[읽기] 헤더로 리사이징 여부를 정하고 원본 바이트를 읽습니다. 그대로 쓰는 파일은 여기서 복사(링크)까지 끝냅니다."""
+    source_file_path, target_file_path = job['source'], job['target']
+    resize, job['header_size'] = needs_resize(source_file_path, os.path.splitext(target_file_path)[1])
+    if not resize:
+        used_mode = materialize_file(source_file_path, target_file_path, job['link_mode'])
+        size = os.path.getsize(source_file_path) if used_mode == 'copy' else 0
+        job.update(done=True, bytes_read=size, bytes_written=size)
+        return job
+    with open(source_file_path, 'rb') as f:
+        job['data'] = f.read()
+    job['bytes_read'] = len(job['data'])
+    return job
+
+def _encode_stage(job):
+    """[CPU] 디코딩 + 리사이징 + 인코딩 (원본 바이트는 인코딩 결과로 바꿔 메모리를 바로 돌려줌)"""
+    if job['done']:
+        return job
+    job['data'] = resize_encoded(job['data'], job['header_size'], os.path.splitext(job['target'])[1])
+    if job['data'] is None:
+        job.update(done=True, error=f"  > 경고: '{job['source']}' 파일을 읽을 수 없습니다.")
+    return job
+
+def _write_stage(job):
+    """[쓰기] 인코딩된 바이트를 대상 파일로 씁니다."""
+    if job['done']:
+        return job
+    _unlink_shared_target(job['target'])
+    job['data'].tofile(job['target'])
+    job.update(done=True, bytes_written=job['data'].size, data=None)
+    return job
+
+def image_pipeline_stages(workers=IMAGE_WORKERS):
+    return [queue_pipeline.PipelineStage('read', _read_stage, IMAGE_READ_WORKERS),
+            queue_pipeline.PipelineStage('encode', _encode_stage, workers),
+            queue_pipeline.PipelineStage('write', _write_stage, IMAGE_WRITE_WORKERS)]
+
+def run_image_pipeline(tasks, on_result, workers=IMAGE_WORKERS, link_mode='copy'):
+    """
+    (원본 경로, 대상 경로) 작업을 읽기 -> 인코딩 -> 쓰기 파이프라인으로 처리하고, 끝난 작업마다
+    copy_resize_image와 같은 형식의 결과 튜플로 on_result를 호출합니다. PipelineStats를 반환합니다.
+    """
+    def jobs():
+        for source_file_path, target_file_path in tasks:
+            yield {'source': source_file_path, 'target': target_file_path, 'link_mode': link_mode,
+                   'done': False, 'error': None, 'bytes_read': 0, 'bytes_written': 0}
+
+    def handle(job):
+        if isinstance(job, queue_pipeline.StageError):
+            failed = job.item
+            on_result((failed['source'], failed['target'],
+                       f"  > 오류 발생: '{failed['source']}' 처리 중 문제 발생 ({job.stage}): {job.error}",
+                       failed['bytes_read'], 0))
+            return
+        on_result((job['source'], job['target'], job['error'], job['bytes_read'], job['bytes_written']))
+
+    return queue_pipeline.run_pipeline(jobs(), image_pipeline_stages(workers), handle, IMAGE_QUEUE_SIZE)
+
+def process_image_tasks(tasks, stage, workers=IMAGE_WORKERS, pool=IMAGE_POOL, manifest=None, link_mode='copy', skipped=0):
+    """
+    (원본 경로, 대상 경로) 작업 목록을 이미지 파이프라인(또는 스레드/프로세스 풀의 copy_resize_image)으로 처리합니다.
+    이미지마다 읽기 1회/쓰기 1회만 수행하고, 끝나면 처리량(images/s)을 출력합니다.
+    'pipeline'이면 단계별 사용률/큐 깊이도 출력하고 단계 측정값('pipeline')에 기록합니다.
+    skipped는 증분 실행으로 건너뛴 이미지 수이며 단계 측정값에만 기록됩니다.
+    """
+    total_images = len(tasks)
+    if total_images == 0:
+        print("--- 새로 처리할 이미지가 없습니다. ---")
+        with stage_metrics.StageMetrics(stage) as metrics:
+            metrics.add(skipped=skipped)
+        return
+
+    if pool == 'pipeline':
+        workers_text = f"읽기 {IMAGE_READ_WORKERS} / 인코딩 {workers} / 쓰기 {IMAGE_WRITE_WORKERS}, 큐 {IMAGE_QUEUE_SIZE}"
+    else:
+        workers_text = f"워커 {workers}개"
+    if TARGET_SIZE is None:
+        print(f"총 {total_images}개의 이미지를 리사이징 없이 저장 시작... ({link_mode}, {workers_text}, {pool})")
+    else:
+        print(f"총 {total_images}개의 이미지를 {TARGET_SIZE[0]}x{TARGET_SIZE[1]}로 리사이징하여 저장 시작... ({workers_text}, {pool})")
+    start_time = time.perf_counter()
+    progress = stage_metrics.ProgressPrinter('개 이미지 처리 완료', total=total_images)
+    pipeline_stats = None
+
+    with stage_metrics.StageMetrics(stage) as metrics:
+        metrics.add(skipped=skipped)
+
+        def handle(result):
+            source_file_path, target_file_path, error, bytes_read, bytes_written = result
+            metrics.add(files=1, bytes_read=bytes_read, bytes_written=bytes_written)
+            if error is not None:
+                metrics.add(errors=1)
+                print(f"\n{error}")
+            elif manifest is not None:
+                manifest.record(stage, source_file_path, [target_file_path])
+            progress.update()
+
+        try:
+            if pool == 'pipeline':
+                pipeline_stats = run_image_pipeline(tasks, handle, workers, link_mode)
+                metrics.extra['pipeline'] = pipeline_stats.as_dict()
+            else:
+                if pool == 'process':
+                    # DAG 단계 스레드에서도 호출되므로 fork 대신 spawn으로 워커를 시작
+                    executor = ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+                with executor:
+                    futures = [executor.submit(copy_resize_image, src, dst, link_mode) for src, dst in tasks]
+                    for future in as_completed(futures):
+                        handle(future.result())
+        finally:
+            if manifest is not None:
+                manifest.save()
+    progress.close()
+
+    elapsed = time.perf_counter() - start_time
+    print("-" * 40)
+    if pipeline_stats is not None:
+        pipeline_stats.print_report()
+    print(f"✅ 이미지 {metrics.files - metrics.errors}개 저장 완료 (실패 {metrics.errors}개), "
+          f"{elapsed:.1f}초, {metrics.files / elapsed if elapsed > 0 else 0:.1f} images/s")
+
+# --- [이미지/라벨 쌍 매칭] ---
+
+def build_pair_index(image_dir, label_dir, shard=None, allowed=None):
+    """
+    복사하기 전에 원본 image/ 와 label_coco/ 를 한 번씩만 스캔하여
+    '확장자 미포함 이름 -> (이미지 경로, 라벨 경로)' 쌍 인덱스를 만듭니다.
+    이미지와 라벨이 모두 있는 stem만 포함됩니다.
+    shard(sharding.Shard)가 주어지면 그 샤드의 클래스 폴더 이미지만 사용합니다.
+    allowed(허용 클래스 집합)가 주어지면 제외된 클래스의 이미지/라벨은 쌍에 넣지 않습니다. (복사/리사이징하지 않음)
+    """
+    print(f"\n--- 이미지/라벨 쌍 인덱스 생성: {image_dir} + {label_dir} ---")
+    image_index, image_duplicates = dataset_inventory.get_inventory(image_dir).for_shard(shard).for_classes(allowed).index_by_stem(exclude='meta')
+    label_index, label_duplicates = dataset_inventory.get_inventory(label_dir).for_classes(allowed).index_by_stem(exclude='meta')
+
+    pairs = {stem: (image_index[stem], label_index[stem]) for stem in image_index.keys() & label_index.keys()}
+
+    print(f"--- 이미지 {len(image_index)}개, 라벨 {len(label_index)}개 중 쌍 {len(pairs)}개 ---")
+    print(f"--- 라벨 없는 이미지 {len(image_index) - len(pairs)}개, 이미지 없는 라벨 {len(label_index) - len(pairs)}개 제외 ---")
+    if image_duplicates or label_duplicates:
+        print(f"⚠️ 중복 stem: 이미지 {image_duplicates}개, 라벨 {label_duplicates}개 (마지막 파일 사용)")
+    return pairs
 
-def make_list(target_dir, filename_list) :
-    # os.walk를 사용하여 origin pathdhk 그 하위의 모든 폴더를 탐색합니다.
-    for root, dirs, files in os.walk(target_dir):
-        for filename in files:  
-            filename_list.append(filename)     
+def remove_stale_files(target_dir, keep_names):
+    """
+    target_dir 바로 아래에서 keep_names(확장자 포함 파일 이름 집합)에 없는 파일을 삭제합니다.
+    (지난 실행에서 만들어졌지만 이제 쌍이 없는 파일 정리용) 삭제한 파일 수를 반환합니다.
+    """
+    removed = 0
+    with os.scandir(target_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name not in keep_names:
+                os.remove(entry.path)
+                removed += 1
+    if removed:
+        print(f"🗑️ '{target_dir}'에서 쌍이 없는 파일 {removed}개 삭제")
+    return removed
+
+def materialize_pairs(pairs, target_dir, output_dir, manifest=None, workers=IMAGE_WORKERS, pool=IMAGE_POOL, link_mode=LINK_MODE):
+    """
+    쌍 인덱스에 있는 이미지/라벨만 images/<split>, labels/<split>에 만듭니다.
+    이미지는 copy_resize_image로 한 번에 리사이징하여 쓰고, 라벨(과 리사이징하지 않는 이미지)은
+    link_mode 방식(copy/hardlink/reflink/symlink)으로 만듭니다.
+    복사 후 삭제나 임시 폴더 이동 없이, 쌍이 없는 파일은 처음부터 만들지 않습니다.
+    새로 만들거나 삭제한 파일이 있으면 True를 반환합니다.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    image_stage = f"image:{os.path.normpath(target_dir)}"
+    label_stage = f"label:{os.path.normpath(output_dir)}"
+
+    # 리사이징 크기나 생성 방식이 바뀌면 전체를 다시 만듭니다.
+    if manifest is not None:
+        manifest.begin_stage(image_stage, {'target_size': TARGET_SIZE, 'link_mode': link_mode, 'encode': encode_settings()})
+        manifest.begin_stage(label_stage, {'link_mode': link_mode})
+
+    image_tasks = []
+    label_tasks = []
+    for stem in sorted(pairs):
+        image_path, label_path = pairs[stem]
+        if manifest is None or not manifest.is_up_to_date(image_stage, image_path):
+            image_tasks.append((image_path, os.path.join(target_dir, output_image_name(os.path.basename(image_path)))))
+        if manifest is None or not manifest.is_up_to_date(label_stage, label_path):
+            label_tasks.append((label_path, os.path.join(output_dir, os.path.basename(label_path))))
+
+    # 쌍에서 빠진(또는 사라진) 원본의 출력 정리
+    if manifest is not None:
+        manifest.prune(image_stage, [image_path for image_path, _ in pairs.values()])
+        manifest.prune(label_stage, [label_path for _, label_path in pairs.values()])
+        print(f"--- 변경되지 않아 건너뛴 쌍: 이미지 {len(pairs) - len(image_tasks)}개, 라벨 {len(pairs) - len(label_tasks)}개 ---")
+
+    # 1. 이미지: 읽기 1회 + 리사이징 + 쓰기 1회
+    process_image_tasks(image_tasks, image_stage, workers, pool, manifest, link_mode,
+                        skipped=len(pairs) - len(image_tasks))
+
+    # 2. 라벨: 그대로 복사(또는 링크)
+    with stage_metrics.StageMetrics(label_stage) as metrics:
+        metrics.add(skipped=len(pairs) - len(label_tasks))
+        try:
+            for label_path, target_label_path in label_tasks:
+                try:
+                    used_mode = materialize_file(label_path, target_label_path, link_mode)
+                    size = os.path.getsize(label_path) if used_mode == 'copy' else 0
+                    metrics.add(files=1, bytes_read=size, bytes_written=size)
+                    if manifest is not None:
+                        manifest.record(label_stage, label_path, [target_label_path])
+                except Exception as e:
+                    metrics.add(files=1, errors=1)
+                    print(f"\n❌ 오류 발생 - 파일 복사 실패: {label_path} -> {e}")
+        finally:
+            if manifest is not None:
+                manifest.save()
+    print(f"✅ 라벨 {len(label_tasks)}개 생성 완료 ({link_mode}): '{output_dir}'")
+
+    # 3. 지난 실행에서 남은, 이제 쌍이 없는 파일 정리
+    removed = remove_stale_files(target_dir, {output_image_name(os.path.basename(image_path)) for image_path, _ in pairs.values()})
+    removed += remove_stale_files(output_dir, {os.path.basename(label_path) for _, label_path in pairs.values()})
+    return bool(image_tasks or label_tasks or removed)
+
+def _encode_pair(pair):
+    image_path, label_path = pair
+    bytes_read, image_bytes = encode_output_image(image_path)
+    with open(label_path, 'rb') as f:
+        label_bytes = f.read()
+    return bytes_read + len(label_bytes), image_bytes, label_bytes
+
+def materialize_tar(pairs, split_dir, manifest=None, workers=IMAGE_WORKERS):
+    """
+    쌍 인덱스의 이미지(리사이징)와 라벨을 stem 순서대로 split_dir의 tar 샤드에 씁니다.
+    이미지 인코딩은 스레드 풀에서 하고, 결과는 순서대로 바로 써서 메모리에 쌓지 않습니다.
+    manifest가 주어지고 원본이 모두 그대로이며 샘플 목록도 같으면 샤드를 다시 쓰지 않습니다.
+    (샤드 중간을 고칠 수 없으므로 바뀐 것이 있으면 스플릿 전체를 다시 씁니다.) 새로 썼으면 True를 반환합니다.
+    """
+    stage = f"tar:{os.path.normpath(split_dir)}"
+    index_path = os.path.join(split_dir, tar_shards.TAR_INDEX_FILENAME)
+    sources = [path for stem in sorted(pairs) for path in pairs[stem]]
+    if manifest is not None:
+        manifest.begin_stage(stage, {'target_size': TARGET_SIZE, 'encode': encode_settings(),
+                                     'max_bytes': tar_shards.TAR_SHARD_MAX_BYTES,
+                                     'max_samples': tar_shards.TAR_SHARD_MAX_SAMPLES})
+        if (os.path.exists(index_path) and all(manifest.is_up_to_date(stage, path) for path in sources)
+                and set(tar_shards.load_index(split_dir)) == set(pairs)):
+            print(f"--- 바뀐 쌍이 없어 tar 샤드를 그대로 사용합니다: {split_dir} ---")
+            with stage_metrics.StageMetrics(stage) as metrics:
+                metrics.add(skipped=len(pairs))
+            return False
+
+    print(f"총 {len(pairs)}개의 쌍을 tar 샤드로 저장 시작... ({split_dir}, 워커 {workers}개)")
+    stems = sorted(pairs)
+    progress = stage_metrics.ProgressPrinter('개 샘플 저장 완료', total=len(stems))
+    with stage_metrics.StageMetrics(stage) as metrics:
+        with tar_shards.TarShardWriter(split_dir) as writer, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            window = deque()
+
+            def write_next():
+                stem, future = window.popleft()
+                image_path = pairs[stem][0]
+                try:
+                    bytes_read, image_bytes, label_bytes = future.result()
+                except Exception as e:
+                    metrics.add(files=1, errors=1)
+                    print(f"\n❌ 오류 발생 - 샘플 저장 실패: {image_path} -> {e}")
+                    return
+                image_ext = os.path.splitext(output_image_name(image_path))[1].lstrip('.').lower()
+                writer.add_sample(stem, [(image_ext, image_bytes), ('txt', label_bytes)],
+                                  mtime=os.path.getmtime(image_path))
+                metrics.add(files=1, bytes_read=bytes_read)
+                progress.update()
+
+            for stem in stems:
+                window.append((stem, executor.submit(_encode_pair, pairs[stem])))
+                if len(window) >= max(1, workers) * 2:
+                    write_next()
+            while window:
+                write_next()
+        metrics.add(bytes_written=writer.bytes_written)
+    progress.close()
+    print(f"✅ tar 샤드 {len(writer.shard_names)}개 저장 완료: '{split_dir}' (샘플 {writer.sample_count}개)")
+
+    if manifest is not None:
+        manifest.prune(stage, sources)
+        for path in sources:
+            manifest.record(stage, path, [index_path])
+        manifest.save()
+    return True
+
+def run_tar(pairs, txt_filename, manifest=None, shard=None):
+    """OUTPUT_MODE = 'tar': 쌍을 tar 샤드로 저장하고 train.txt/valid.txt에는 샤드 경로 목록을 씁니다."""
+    split_name = os.path.splitext(txt_filename)[0]
+    split_dir = sharding.shard_path(shard, tar_shards.split_dir_for(split_name))
+    changed = materialize_tar(pairs, split_dir, manifest)
+
+    list_dir = sharding.shard_dir(shard) if shard is not None else os.path.dirname(os.path.abspath(__file__))
+    tar_shards.write_shard_list(split_dir, os.path.join(list_dir, txt_filename))
+
+    # 라벨 저장소는 원본 label_coco/이미지에서 같은 순서로 생성
+    if label_store.WRITE_LABEL_STORE:
+        store_dir = sharding.shard_path(shard, label_store.store_dir_for(split_name))
+        if changed or not os.path.exists(os.path.join(store_dir, 'meta.json')):
+            stems = sorted(pairs)
+            label_store.build_store([output_image_name(os.path.basename(pairs[stem][0])) for stem in stems],
+                                    [pairs[stem][1] for stem in stems], [pairs[stem][0] for stem in stems],
+                                    store_dir, TARGET_SIZE, resized_extensions())
+
+# --- [스트리밍 모드 (STREAMING_MODE)] ---
+
+def iter_stem_lines(root_dir, shard=None, allowed=None):
+    """root_dir 아래 파일을 'stem<TAB>경로' 줄로 하나씩 돌려줍니다. (외부 정렬 입력, 'meta' 파일 제외)"""
+    for entry in dataset_inventory.iter_entries(root_dir, exclude='meta'):
+        if sharding.contains(shard, entry.class_folder) and class_allowlist.is_allowed(allowed, entry.class_folder):
+            yield f"{entry.stem}\t{entry.path}\n"
+
+def write_pair_file(image_dir, label_dir, pair_path, shard=None, allowed=None):
+    """
+    build_pair_index의 스트리밍 버전. 이미지/라벨 목록을 각각 외부 정렬한 뒤 stem으로 병합 조인하여
+    'stem<TAB>이미지 경로<TAB>라벨 경로' 줄을 stem 순서로 pair_path에 씁니다. 쌍 수를 반환합니다.
+    같은 stem이 여러 폴더에 있으면 경로 순서상 마지막 파일을 사용합니다.
+    """
+    print(f"\n--- [스트리밍] 이미지/라벨 쌍 파일 생성: {image_dir} + {label_dir} ---")
+    image_counts, label_counts, join_counts = {}, {}, {}
+    with external_sort.SortedLines(iter_stem_lines(image_dir, shard, allowed)) as image_lines, \
+            external_sort.SortedLines(iter_stem_lines(label_dir, allowed=allowed)) as label_lines:
+        images = external_sort.last_per_key(image_lines, image_counts)
+        labels = external_sort.last_per_key(label_lines, label_counts)
+        with open(pair_path, 'w', encoding='utf-8', newline='\n') as f:
+            for stem, image_path, label_path in external_sort.merge_join(images, labels, join_counts):
+                f.write(f"{stem}\t{image_path}\t{label_path}\n")
+        image_total, label_total = image_lines.count, label_lines.count
+
+    pair_count = join_counts['matched']
+    print(f"--- 이미지 {image_total}개, 라벨 {label_total}개 중 쌍 {pair_count}개 ---")
+    print(f"--- 라벨 없는 이미지 {join_counts['left_only']}개, 이미지 없는 라벨 {join_counts['right_only']}개 제외 ---")
+    if image_counts or label_counts:
+        print(f"⚠️ 중복 stem: 이미지 {image_counts.get('duplicates', 0)}개, "
+              f"라벨 {label_counts.get('duplicates', 0)}개 (경로 순서상 마지막 파일 사용)")
+    return pair_count
+
+def iter_pair_file(pair_path):
+    """write_pair_file이 만든 파일에서 (stem, 이미지 경로, 라벨 경로)를 stem 순서로 하나씩 읽습니다."""
+    with open(pair_path, 'r', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            yield external_sort.split_line(line)
+
+def _is_newer(target_file_path, source_file_path):
+    """대상 파일이 있고 원본보다 오래되지 않았으면 True (스트리밍 모드의 증분 판단)"""
+    try:
+        return os.path.getmtime(target_file_path) >= os.path.getmtime(source_file_path)
+    except OSError:
+        return False
 
-def run(source_dir, target_dir, label_dir, output_dir, txt_filename):
-    images_list = []
-    cp_file(source_dir, target_dir)
-    print('image cp complate')
-    img_resize(target_dir)
-    print('image 640X640 complate')
-    make_list(target_dir, images_list)
+def _stream_params_path(target_dir):
+    # 폴더 안에 두면 쌍이 없는 파일로 지워지므로 폴더 옆에 둡니다. (예: ./images/train.stream.json)
+    return os.path.normpath(target_dir) + '.stream.json'
 
-    labels_list = []
-    cp_file(label_dir, output_dir)
-    print('label cp complate')
-    make_list(label_dir, labels_list)
+def _check_stream_params(target_dir, params):
+    """
+    지난 스트리밍 실행이 끝까지 완료되었고 설정이 같으면 True. 다르면 기록을 지우고 False (전체를 다시 만듦)
+    새 설정은 전체 실행이 끝난 뒤 _write_stream_params로 기록하므로, 다시 만드는 도중 중단되어도
+    다음 실행이 예전 설정으로 만든 파일을 최신으로 보고 건너뛰지 않습니다.
+    """
+    import json
 
-    labels_list = sync_list_a_by_list_b(labels_list, images_list)
-    images_list = sync_list_a_by_list_b(images_list, labels_list)
+    path = _stream_params_path(target_dir)
+    params = json.loads(json.dumps(params))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if json.load(f) == params:
+                return True
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(path):
+        os.remove(path)
+    return False
+
+def _write_stream_params(target_dir, params):
+    """스트리밍 실행을 끝까지 마친 뒤 그 설정을 기록합니다. (임시 파일에 쓴 뒤 교체)"""
+    import json
+
+    path = _stream_params_path(target_dir)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(params, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+def remove_stale_files_streaming(target_dir, expected_lines):
+    """
+    remove_stale_files의 스트리밍 버전. expected_lines('stem<TAB>파일 이름' 정렬된 줄)에 없는 파일을
+    target_dir 바로 아래에서 삭제합니다. 폴더 목록도 외부 정렬하여 비교합니다. 삭제한 파일 수를 반환합니다.
+    """
+    def actual_lines():
+        with os.scandir(target_dir) as it:
+            for entry in it:
+                if entry.is_file():
+                    yield f"{os.path.splitext(entry.name)[0]}\t{entry.name}\n"
+
+    removed = 0
+    with external_sort.SortedLines(actual_lines()) as actual:
+        for line in external_sort.sorted_difference(actual, expected_lines):
+            os.remove(os.path.join(target_dir, external_sort.split_line(line)[1]))
+            removed += 1
+    if removed:
+        print(f"🗑️ '{target_dir}'에서 쌍이 없는 파일 {removed}개 삭제")
+    return removed
+
+def run_streaming(source_dir, target_dir, label_dir, output_dir, txt_filename, shard=None, link_mode=LINK_MODE,
+                  allowed=None):
+    """
+    STREAMING_MODE: 쌍 인덱스를 디스크의 정렬된 파일로 만든 뒤, 그 파일을 여러 번 순서대로 읽어
+    이미지(파이프라인)/라벨 생성, 쌍 없는 파일 정리, train.txt/valid.txt 생성을 합니다.
+    (파일 목록/쌍 인덱스를 메모리에 만들지 않으므로 파일 수와 관계없이 메모리 사용량이 일정)
+    """
+    import tempfile
+
+    os.makedirs(target_dir, exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
+    image_stage = f"image:{os.path.normpath(target_dir)}"
+    label_stage = f"label:{os.path.normpath(output_dir)}"
+    # 리사이징 크기나 생성 방식이 바뀌면 전체를 다시 만듭니다. (새 설정은 전체 실행이 끝난 뒤에 기록)
+    image_params = {'target_size': TARGET_SIZE, 'link_mode': link_mode, 'encode': encode_settings()}
+    label_params = {'link_mode': link_mode}
+    images_fresh = _check_stream_params(target_dir, image_params)
+    labels_fresh = _check_stream_params(output_dir, label_params)
+
+    work_dir = tempfile.mkdtemp(prefix='pairs_', dir=external_sort.SORT_TMP_DIR)
+    try:
+        pair_path = os.path.join(work_dir, 'pairs.tsv')
+        pair_count = write_pair_file(source_dir, label_dir, pair_path, shard, allowed)
 
-    secure_file_sync_and_cleanup(output_dir, labels_list)
-    secure_file_sync_and_cleanup(target_dir, images_list)
+        def target_image_path(image_path):
+            return os.path.join(target_dir, output_image_name(os.path.basename(image_path)))
 
-    create_image_paths_txt(images_list, txt_filename)
+        # 1. 이미지: 바뀐 원본만 읽기 -> 인코딩 -> 쓰기 파이프라인으로 (작업 목록도 파일에서 바로 흘려보냄)
+        image_counts = {'skipped': 0}
+
+        def image_tasks():
+            for _, image_path, _ in iter_pair_file(pair_path):
+                target_file_path = target_image_path(image_path)
+                if images_fresh and _is_newer(target_file_path, image_path):
+                    image_counts['skipped'] += 1
+                    continue
+                yield image_path, target_file_path
+
+        print(f"총 {pair_count}개의 쌍을 스트리밍으로 저장 시작... "
+              f"(읽기 {IMAGE_READ_WORKERS} / 인코딩 {IMAGE_WORKERS} / 쓰기 {IMAGE_WRITE_WORKERS}, 큐 {IMAGE_QUEUE_SIZE})")
+        progress = stage_metrics.ProgressPrinter('개 이미지 처리 완료')
+        with stage_metrics.StageMetrics(image_stage) as metrics:
+            def handle(result):
+                _, _, error, bytes_read, bytes_written = result
+                metrics.add(files=1, bytes_read=bytes_read, bytes_written=bytes_written, errors=int(error is not None))
+                if error is not None:
+                    print(f"\n{error}")
+                progress.update()
+
+            pipeline_stats = run_image_pipeline(image_tasks(), handle, IMAGE_WORKERS, link_mode)
+            metrics.add(skipped=image_counts['skipped'])
+            metrics.extra['pipeline'] = pipeline_stats.as_dict()
+        progress.close()
+        if metrics.files:
+            pipeline_stats.print_report()
+        print(f"✅ 이미지 {metrics.files - metrics.errors}개 저장 완료 (실패 {metrics.errors}개, "
+              f"변경되지 않아 건너뜀 {image_counts['skipped']}개)")
+
+        # 2. 라벨: 그대로 복사(또는 링크)
+        with stage_metrics.StageMetrics(label_stage) as metrics:
+            for _, _, label_path in iter_pair_file(pair_path):
+                target_label_path = os.path.join(output_dir, os.path.basename(label_path))
+                if labels_fresh and _is_newer(target_label_path, label_path):
+                    metrics.add(skipped=1)
+                    continue
+                try:
+                    used_mode = materialize_file(label_path, target_label_path, link_mode)
+                    size = os.path.getsize(label_path) if used_mode == 'copy' else 0
+                    metrics.add(files=1, bytes_read=size, bytes_written=size)
+                except Exception as e:
+                    metrics.add(files=1, errors=1)
+                    print(f"\n❌ 오류 발생 - 파일 복사 실패: {label_path} -> {e}")
+        print(f"✅ 라벨 {metrics.files}개 생성 완료 ({link_mode}, 건너뜀 {metrics.skipped}개): '{output_dir}'")
+
+        # 3. 쌍이 없는 파일 정리 (쌍 파일이 stem 순서이므로 기대 목록도 그대로 정렬된 스트림)
+        remove_stale_files_streaming(target_dir, (f"{stem}\t{os.path.basename(target_image_path(image_path))}\n"
+                                                  for stem, image_path, _ in iter_pair_file(pair_path)))
+        remove_stale_files_streaming(output_dir, (f"{stem}\t{os.path.basename(label_path)}\n"
+                                                  for stem, _, label_path in iter_pair_file(pair_path)))
+
+        # 4. 이미지 경로 목록 파일 (stem 순서, 한 줄씩 바로 씀)
+        create_image_paths_txt((output_image_name(os.path.basename(image_path)) for _, image_path, _ in iter_pair_file(pair_path)),
+                               txt_filename, sharding.shard_dir(shard) if shard is not None else None)
+
+        # 5. 전체를 마쳤으므로 이번 설정을 기록 (다음 실행부터 바뀐 파일만 처리)
+        _write_stream_params(target_dir, image_params)
+        _write_stream_params(output_dir, label_params)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if label_store.WRITE_LABEL_STORE:
+        print("ℹ️ 스트리밍 모드에서는 라벨 저장소를 만들지 않습니다. (필요하면 STREAMING_MODE = False로 실행)")
+
+def run(source_dir, target_dir, label_dir, output_dir, txt_filename, manifest=None, shard=None, allowed=None):
+    # allowed: class_allowlist의 허용 클래스 집합 (스플릿 간 불일치로 제외된 클래스는 읽지도 복사하지도 않음)
+    if STREAMING_MODE:
+        if OUTPUT_MODE == 'files':
+            run_streaming(source_dir, target_dir, label_dir, output_dir, txt_filename, shard, allowed=allowed)
+            return
+        print("⚠️ 스트리밍 모드는 OUTPUT_MODE = 'files'에서만 사용할 수 있어 기본 방식으로 실행합니다.")
+
+    # 1. 복사 전에 이미지/라벨 쌍을 먼저 결정
+    pairs = build_pair_index(source_dir, label_dir, shard, allowed)
+    if OUTPUT_MODE == 'tar':
+        run_tar(pairs, txt_filename, manifest, shard)
+        return
+
+    # 2. 쌍이 있는 파일만 images/<split>, labels/<split>에 생성 (이미지는 640X640 리사이징)
+    changed = materialize_pairs(pairs, target_dir, output_dir, manifest)
+    print('image cp + 640X640, label cp complate')
+
+    # 3. 이미지 경로 목록 파일 생성 (stem 순서로 고정)
+    images_list = [output_image_name(os.path.basename(pairs[stem][0])) for stem in sorted(pairs)]
+    # (샤드 실행이면 train.txt/valid.txt도 샤드 폴더에 만들고, merge_shards.py가 합칩니다.)
+    create_image_paths_txt(images_list, txt_filename, sharding.shard_dir(shard) if shard is not None else None)
+
+    # 4. 학습 시 TXT를 하나씩 읽지 않도록 같은 순서의 라벨 저장소 생성 (바뀐 파일이 없으면 그대로 사용)
+    if label_store.WRITE_LABEL_STORE:
+        store_dir = sharding.shard_path(shard, label_store.store_dir_for(os.path.splitext(txt_filename)[0]))
+        if changed or not os.path.exists(os.path.join(store_dir, 'meta.json')):
+            label_store.build_store(images_list,
+                                    [os.path.join(output_dir, os.path.splitext(name)[0] + '.txt') for name in images_list],
+                                    [os.path.join(target_dir, name) for name in images_list],
+                                    store_dir, TARGET_SIZE, resized_extensions())
     
 if __name__ == '__main__':
-    run(SOURCE_DIR, TARGET_DIR, LABEL_ROOT_DIR, OUTPUT_ROOT_DIR, 'train.txt')
-    run(V_SOURCE_DIR, V_TARGET_DIR, V_LABEL_ROOT_DIR, V_OUTPUT_ROOT_DIR, 'valid.txt')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='이미지/라벨 쌍 생성 (리사이징 포함)')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+    shard = args.shard
+
+    # 지난 실행 이후 새로 생기거나 바뀐 파일만 복사/리사이징 (build_manifest.json)
+    # 샤드 실행이면 trans_coco.py --shard가 만든 샤드 폴더의 label_coco를 읽고, 결과도 샤드 폴더에 만듭니다.
+    manifest = build_manifest.BuildManifest(sharding.manifest_path(shard))
+    # trans_coco.py가 계산한 허용 목록 (없으면 모든 클래스 사용)
+    allowed = class_allowlist.load_allowed(class_allowlist.allowlist_path(shard))
+    run(SOURCE_DIR, sharding.shard_path(shard, TARGET_DIR), sharding.shard_path(shard, LABEL_ROOT_DIR),
+        sharding.shard_path(shard, OUTPUT_ROOT_DIR), 'train.txt', manifest, shard, allowed)
+    run(V_SOURCE_DIR, sharding.shard_path(shard, V_TARGET_DIR), sharding.shard_path(shard, V_LABEL_ROOT_DIR),
+        sharding.shard_path(shard, V_OUTPUT_ROOT_DIR), 'valid.txt', manifest, shard, allowed)
\ No newline at end of file
@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+# --- [Configuration Section] ---
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. 폴더 스캔 결과를 저장할 캐시 파일 경로
+INVENTORY_CACHE_PATH = os.path.join(CURRENT_DIR, 'inventory_cache.json')
+
+# 2. 디스크 캐시 사용 여부 (False이면 매번 전체를 다시 스캔)
+USE_INVENTORY_CACHE = True
+
+# 3. 수정 시간이 스캔 시각과 이 시간(초) 이내인 폴더는 캐시를 믿지 않고 다시 스캔
+# (수정 시간 해상도가 낮은 파일 시스템에서, 스캔 직후 같은 시각에 추가된 파일을 놓치지 않기 위함)
+RACY_WINDOW_SEC = 2.0
+
+# 4. 폴더 스캔 스레드 수 (네트워크 저장소에서는 listdir/stat 하나하나가 왕복 지연이므로 여러 폴더를 동시에 읽음)
+# 1이면 한 스레드에서 순서대로 스캔합니다. 결과 순서는 스레드 수와 관계없이 같습니다.
+WALK_WORKERS = 16
+
+# --- [인벤토리 레코드] ---
+
+class FileEntry(NamedTuple):
+    """스캔한 파일 하나. class_folder는 루트 바로 아래 폴더 이름입니다. (루트에 있는 파일이면 '')"""
+    path: str
+    stem: str
+    ext: str
+    size: int
+    mtime: float
+    class_folder: str
+
+class Inventory:
+    """
+    루트 폴더 하나를 스캔한 결과. 단계들은 폴더를 다시 탐색하지 않고 이 객체에 질의합니다.
+    files는 폴더/파일 이름 순으로 정렬되어 있어 실행마다 순서가 같습니다.
+    """
+
+    def __init__(self, root_dir, dirs, files):
+        self.root_dir = root_dir
+        # 루트를 포함한 모든 폴더 경로 (os.walk의 root와 같은 형식)
+        self.dirs = dirs
+        self.files = files
+
+    def select(self, extensions=None, exclude=None):
+        """
+        extensions(소문자 확장자 튜플, 예: ('.xml',))에 해당하는 파일만 반환합니다.
+        exclude가 주어지면 파일 이름(소문자)에 그 문자열이 들어간 파일은 제외합니다. (예: 'meta')
+        """
+        return [entry for entry in self.files
+                if (extensions is None or entry.ext in extensions)
+                and (exclude is None or exclude not in os.path.basename(entry.path).lower())]
+
+    def class_folders(self):
+        """루트 바로 아래의 폴더 이름 목록"""
+        prefix_length = len(os.path.join(self.root_dir, ''))
+        return [path[prefix_length:] for path in self.dirs
+                if path != self.root_dir and os.sep not in path[prefix_length:]]
+
+    def for_class_folders(self, predicate):
+        """클래스 폴더 이름에 대해 predicate(이름)가 True인 폴더/파일만 남긴 인벤토리를 반환합니다."""
+        prefix_length = len(os.path.join(self.root_dir, ''))
+        dirs = [path for path in self.dirs
+                if path == self.root_dir or predicate(path[prefix_length:].split(os.sep, 1)[0])]
+        files = [entry for entry in self.files if predicate(entry.class_folder)]
+        return Inventory(self.root_dir, dirs, files)
+
+    def for_shard(self, shard):
+        """
+        클래스 폴더가 shard(sharding.Shard)에 속하는 폴더/파일만 남긴 인벤토리를 반환합니다. (None이면 그대로)
+        """
+        if shard is None:
+            return self
+        import sharding
+
+        return self.for_class_folders(lambda class_folder: sharding.contains(shard, class_folder))
+
+    def for_classes(self, allowed):
+        """
+        클래스 이름이 allowed(class_allowlist의 허용 클래스 집합)에 있는 클래스 폴더만 남긴 인벤토리를 반환합니다.
+        (None이면 그대로) 제외된 클래스의 파일은 이후 단계에서 읽지도, 복사하지도 않습니다.
+        """
+        if allowed is None:
+            return self
+        import class_allowlist
+
+        return self.for_class_folders(lambda class_folder: class_allowlist.is_allowed(allowed, class_folder))
+
+    def index_by_stem(self, exclude='meta'):
+        """
+        '확장자 미포함 이름(stem) -> 전체 경로' 딕셔너리와 중복 stem 수를 반환합니다.
+        같은 stem이 여러 폴더에 있으면 나중(정렬 순서상 뒤) 파일이 남습니다.
+        """
+        index = {}
+        duplicate_count = 0
+        for entry in self.select(exclude=exclude):
+            if entry.stem in index:
+                duplicate_count += 1
+            index[entry.stem] = entry.path
+        return index, duplicate_count
+
+# --- [스캔 / 캐시] ---
+
+_lock = threading.Lock()
+_cache = None
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        if USE_INVENTORY_CACHE and os.path.exists(INVENTORY_CACHE_PATH):
+            try:
+                with open(INVENTORY_CACHE_PATH, 'r', encoding='utf-8') as f:
+                    _cache = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 인벤토리 캐시를 읽을 수 없어 새로 스캔합니다. ({INVENTORY_CACHE_PATH}): {e}")
+    return _cache
+
+def _save_cache():
+    # 여러 프로세스(로컬 샤드 실행 등)가 같은 캐시를 저장해도 임시 파일이 겹치지 않도록 PID를 붙임
+    tmp_path = f"{INVENTORY_CACHE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_cache, f, ensure_ascii=False)
+    os.replace(tmp_path, INVENTORY_CACHE_PATH)
+
+def scan_directory(dir_path):
+    """
+    os.scandir로 폴더 하나를 읽어 캐시 노드 {"files": [[이름, 크기, 수정 시간]], "subdirs": [이름]}를 만듭니다.
+    (Windows에서는 scandir 결과에 크기/수정 시간이 들어 있어 파일마다 stat을 하지 않습니다.)
+    """
+    files = []
+    subdirs = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    st = entry.stat()
+                    files.append([entry.name, st.st_size, st.st_mtime])
+            except OSError:
+                # 스캔 도중 사라진 파일/깨진 링크
+                continue
+    files.sort()
+    subdirs.sort()
+    return {'files': files, 'subdirs': subdirs}
+
+def _node_is_fresh(node, st):
+    return (node is not None and node.get('mtime_ns') == st.st_mtime_ns
+            and st.st_mtime_ns < node.get('scanned_ns', 0) - RACY_WINDOW_SEC * 1e9)
+
+def _scan_tree(root_dir, cached_nodes, scan_node=scan_directory, workers=None):
+    """
+    root_dir 아래 폴더를 한 단계(깊이)씩 스캔합니다. 같은 깊이의 폴더(수천 개의 'ID_클래스이름' 폴더 등)는
+    최대 workers개의 스레드에서 동시에 stat/scandir하고, 수정 시간이 캐시와 같은 폴더는 다시 읽지 않습니다.
+    (새 노드 딕셔너리, 다시 읽은 폴더 수)를 반환합니다. 노드 키는 루트 기준 상대 경로('/' 구분, 루트는 '')입니다.
+    노드는 키로 저장되고 결과는 _build_inventory가 이름 순으로 다시 모으므로, 스레드 실행 순서와 관계없이 같습니다.
+    """
+    workers = WALK_WORKERS if workers is None else workers
+
+    def visit(item):
+        key, dir_path = item
+        try:
+            st = os.stat(dir_path)
+        except OSError:
+            return key, dir_path, None, False
+
+        node = cached_nodes.get(key)
+        if _node_is_fresh(node, st):
+            return key, dir_path, node, False
+        scanned_ns = time.time_ns()
+        try:
+            node = scan_node(dir_path)
+        except OSError:
+            return key, dir_path, None, False
+        node['mtime_ns'] = st.st_mtime_ns
+        node['scanned_ns'] = scanned_ns
+        return key, dir_path, node, True
+
+    nodes = {}
+    rescanned = 0
+    level = [('', root_dir)]
+    executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while level:
+            results = executor.map(visit, level) if executor is not None and len(level) > 1 else map(visit, level)
+            next_level = []
+            for key, dir_path, node, was_scanned in results:
+                if node is None:
+                    continue
+                nodes[key] = node
+                rescanned += was_scanned
+                for name in node['subdirs']:
+                    next_level.append((f"{key}/{name}" if key else name, os.path.join(dir_path, name)))
+            level = next_level
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return nodes, rescanned
+
+def _build_inventory(root_dir, nodes):
+    dirs = []
+    files = []
+
+    def visit(key, dir_path):
+        node = nodes.get(key)
+        if node is None:
+            return
+        dirs.append(dir_path)
+        class_folder = key.split('/', 1)[0]
+        for name, size, mtime in node['files']:
+            stem, ext = os.path.splitext(name)
+            files.append(FileEntry(os.path.join(dir_path, name), stem, ext.lower(), size, mtime, class_folder))
+        for name in node['subdirs']:
+            visit(f"{key}/{name}" if key else name, os.path.join(dir_path, name))
+
+    visit('', root_dir)
+    return Inventory(root_dir, dirs, files)
+
+def walk(root_dir, workers=None):
+    """
+    os.walk(root_dir)처럼 (폴더 경로, 하위 폴더 이름 리스트, 파일 이름 리스트)를 위에서부터 차례로 돌려주지만,
+    폴더를 스레드 풀에서 동시에 읽고 이름 순으로 정렬된 결과를 줍니다. (캐시는 사용하지 않음)
+    인벤토리를 쓰지 않는 기존 함수들도 os.walk 대신 이 함수로 바꿔 쓸 수 있습니다.
+    """
+    if not os.path.isdir(root_dir):
+        return
+    nodes, _ = _scan_tree(root_dir, {}, workers=workers)
+
+    stack = [('', root_dir)]
+    while stack:
+        key, dir_path = stack.pop()
+        node = nodes.get(key)
+        if node is None:
+            continue
+        yield dir_path, list(node['subdirs']), [name for name, _, _ in node['files']]
+        for name in reversed(node['subdirs']):
+            stack.append((f"{key}/{name}" if key else name, os.path.join(dir_path, name)))
+
+def iter_entries(root_dir, exclude=None):
+    """
+    root_dir 아래의 파일을 FileEntry로 하나씩 돌려줍니다. 인벤토리/캐시와 달라 전체 목록을 메모리에 만들지 않으므로
+    파일 수와 관계없이 메모리 사용량이 일정합니다. (순서는 정해지지 않음, 스트리밍 모드에서 외부 정렬과 함께 사용)
+    exclude가 주어지면 파일 이름(소문자)에 그 문자열이 들어간 파일은 제외합니다.
+    """
+    if not os.path.isdir(root_dir):
+        return
+    stack = [(root_dir, '')]
+    while stack:
+        dir_path, class_folder = stack.pop()
+        try:
+            it = os.scandir(dir_path)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        stack.append((entry.path, class_folder or entry.name))
+                    elif entry.is_file():
+                        if exclude is not None and exclude in entry.name.lower():
+                            continue
+                        st = entry.stat()
+                        stem, ext = os.path.splitext(entry.name)
+                        yield FileEntry(entry.path, stem, ext.lower(), st.st_size, st.st_mtime, class_folder)
+                except OSError:
+                    # 스캔 도중 사라진 파일/깨진 링크
+                    continue
+
+def get_inventory(root_dir, use_cache=None, workers=None):
+    """
+    root_dir의 인벤토리를 반환합니다. 캐시가 있으면 폴더마다 stat 한 번으로 변경 여부를 확인하고,
+    수정 시간이 바뀐(파일이 추가/삭제/이름 변경된) 폴더만 다시 읽습니다. 폴더는 workers개(기본 WALK_WORKERS)의
+    스레드에서 동시에 확인합니다.
+    주의: 파일 내용만 바뀐 경우 폴더 수정 시간은 그대로이므로 크기/수정 시간은 스캔 당시 값입니다.
+    (변경 여부 판단은 build_manifest가 파일별로 다시 확인합니다.)
+    """
+    use_cache = USE_INVENTORY_CACHE if use_cache is None else use_cache
+    if not os.path.isdir(root_dir):
+        return Inventory(root_dir, [], [])
+
+    cache_key = os.path.abspath(root_dir)
+    with _lock:
+        cached_nodes = _load_cache().get(cache_key, {}) if use_cache else {}
+
+    start = time.perf_counter()
+    nodes, rescanned = _scan_tree(root_dir, cached_nodes, workers=workers)
+    inventory = _build_inventory(root_dir, nodes)
+    elapsed = time.perf_counter() - start
+
+    if use_cache and (rescanned or len(nodes) != len(cached_nodes)):
+        with _lock:
+            _load_cache()[cache_key] = nodes
+            _save_cache()
+
+    print(f"📂 인벤토리: {root_dir} (파일 {len(inventory.files)}개, 폴더 {len(nodes)}개 중 "
+          f"{rescanned}개 다시 읽음, {elapsed:.2f}초)")
+    return inventory
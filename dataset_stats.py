@@ -0,0 +1,323 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+import annotation_db
+import class_allowlist
+import create_data_yaml as cdy
+import stage_metrics
+
+# --- [Configuration Section] ---
+# 학습 전에 확인하는 데이터셋 통계(클래스별 박스/이미지 수, 박스 가로/세로/비율 분포, 이미지당 박스 수,
+# convert_box에서 클리핑되는 박스 수)와 k-means 앵커 추천값을 data.yaml 옆에 JSON/CSV로 저장합니다.
+# XML을 다시 파싱하지 않고, trans_coco 변환 중 같은 파싱 결과로 채워진 어노테이션 DB(annotation_db)에서
+# 박스를 NumPy 배열로 한 번에 읽어 배열 연산으로만 계산합니다. (박스 수백만 개도 수 초)
+#
+#   python dataset_stats.py              : Training/Validation 통계 + Training 박스로 앵커 계산
+#   python dataset_stats.py --anchors 6  : 앵커 개수 지정
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 1. 보고서 저장 경로 (data.yaml과 같은 폴더)
+STATS_JSON_PATH = os.path.join(os.path.dirname(cdy.DATA_YAML_PATH), 'dataset_stats.json')
+STATS_CSV_PATH = os.path.join(os.path.dirname(cdy.DATA_YAML_PATH), 'dataset_stats.csv')
+
+# 2. run_all.py 실행 시 통계 단계를 추가할지 여부 (annotation_db.USE_ANNOTATION_DB가 켜져 있어야 함)
+STATS_ENABLED = True
+
+# 3. 앵커 개수, k-means 반복 횟수, 사용할 최대 박스 수(넘으면 무작위 표본), 난수 시드
+ANCHOR_COUNT = 9
+KMEANS_ITERATIONS = 300
+KMEANS_MAX_BOXES = 50000
+KMEANS_SEED = 0
+
+# 4. 앵커를 계산할 학습 이미지 크기 (None이면 coco_setting_train.TARGET_SIZE)
+ANCHOR_IMAGE_SIZE = None
+
+# 5. 분포 보고서의 백분위수와 히스토그램 구간 수
+PERCENTILES = (0, 5, 25, 50, 75, 95, 100)
+HISTOGRAM_BINS = 20
+
+# 6. 이미지당 박스 수 히스토그램의 마지막 구간 (이 값 이상은 한 구간으로 합침)
+MAX_BOXES_PER_IMAGE_BIN = 50
+
+# load_boxes 결과의 열 순서 (파일 배열 / 박스 배열)
+FILE_ID, IMAGE_W, IMAGE_H = range(3)
+BOX_FILE_ID, CLASS_ID, XMIN, XMAX, YMIN, YMAX, DIFFICULT = range(7)
+
+def anchor_image_size():
+    """앵커를 픽셀 단위로 계산할 (width, height)"""
+    if ANCHOR_IMAGE_SIZE is not None:
+        return tuple(ANCHOR_IMAGE_SIZE)
+    import coco_setting_train as cst
+    return tuple(cst.TARGET_SIZE) if cst.TARGET_SIZE is not None else (640, 640)
+
+def load_boxes(db, root_dir, classes_list, allowed=None):
+    """
+    DB에서 root_dir의 (허용된 클래스 폴더) 파일 배열 (F, 3)과 박스 배열 (N, 7)을 읽습니다.
+    파일 열은 FILE_ID, 이미지 크기(ID 순서), 박스 열은 파일 ID, CLASS_ID(classes_list 인덱스, 없으면 -1),
+    VOC 좌표, DIFFICULT 순서입니다. (행마다 sqlite3 비용이 들므로 이미지 크기는 박스마다 읽지 않음)
+    """
+    import numpy as np
+
+    conn = db.conn
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS stats_classes (name TEXT PRIMARY KEY, id INTEGER NOT NULL)')
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS stats_folders (name TEXT PRIMARY KEY)')
+    conn.execute('DELETE FROM stats_classes')
+    conn.execute('DELETE FROM stats_folders')
+    # list.index와 같은 결과(첫 번째 위치) = trans_coco.write_yolo_labels의 클래스 인덱스
+    class_index = {}
+    for i, class_name in enumerate(classes_list):
+        class_index.setdefault(class_name, i)
+    conn.executemany('INSERT INTO stats_classes VALUES (?, ?)', class_index.items())
+    # 루트에 바로 있는 XML(클래스 폴더 '')도 coco_export/convert_from_db와 마찬가지로 항상 포함
+    conn.executemany('INSERT INTO stats_folders VALUES (?)',
+                     [(folder,) for folder in db.class_folders(root_dir) + ['']
+                      if class_allowlist.is_allowed(allowed, folder)])
+
+    root_key = annotation_db.db_root(root_dir)
+    files = np.fromiter(conn.execute(
+        'SELECT id, width, height FROM files '
+        'WHERE root_dir = ? AND class_folder IN (SELECT name FROM stats_folders) ORDER BY id', (root_key,)),
+        dtype=np.dtype((np.float64, 3)))
+    boxes = np.fromiter(conn.execute(
+        'SELECT o.file_id, COALESCE(c.id, -1), o.xmin, o.xmax, o.ymin, o.ymax, o.difficult '
+        'FROM files f JOIN objects o ON o.file_id = f.id LEFT JOIN stats_classes c ON c.name = o.class_name '
+        'WHERE f.root_dir = ? AND f.class_folder IN (SELECT name FROM stats_folders)', (root_key,)),
+        dtype=np.dtype((np.float64, 7)))
+    return files.reshape(-1, 3), boxes.reshape(-1, 7)
+
+def distribution(values):
+    """백분위수/평균/히스토그램 (값이 없으면 None)"""
+    import numpy as np
+
+    if values.size == 0:
+        return None
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    return {
+        'mean': round(float(values.mean()), 6),
+        'percentiles': {str(p): round(float(v), 6) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        'histogram': {'edges': [round(float(edge), 6) for edge in edges], 'counts': counts.tolist()},
+    }
+
+def wh_iou(wh, anchors):
+    """(N, 2) 박스 크기와 (K, 2) 앵커의 IoU 행렬 (N, K). 두 박스의 중심이 같다고 보고 크기만 비교합니다."""
+    import numpy as np
+
+    inter = np.minimum(wh[:, None, 0], anchors[None, :, 0]) * np.minimum(wh[:, None, 1], anchors[None, :, 1])
+    union = (wh[:, 0] * wh[:, 1])[:, None] + (anchors[:, 0] * anchors[:, 1])[None, :] - inter
+    return inter / np.maximum(union, 1e-12)
+
+def kmeans_anchors(wh, k=ANCHOR_COUNT, iterations=KMEANS_ITERATIONS, max_boxes=KMEANS_MAX_BOXES, seed=KMEANS_SEED):
+    """
+    박스 크기 (N, 2)를 1 - IoU 거리로 k-means 군집화하여 면적 순으로 정렬한 앵커 (k, 2)와 평가 값을 반환합니다.
+    박스가 max_boxes보다 많으면 무작위 표본으로 군집화하고, 평가는 전체 박스로 합니다.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    sample = wh if len(wh) <= max_boxes else wh[rng.choice(len(wh), max_boxes, replace=False)]
+    # 같은 크기의 박스가 많아도 초기 앵커가 겹치지 않도록 서로 다른 크기 중에서 고름
+    unique_wh = np.unique(sample, axis=0)
+    k = min(k, len(unique_wh))
+    anchors = unique_wh[rng.choice(len(unique_wh), k, replace=False)]
+    iterations_run = 0
+    for iterations_run in range(1, iterations + 1):
+        assign = wh_iou(sample, anchors).argmax(axis=1)
+        sizes = np.bincount(assign, minlength=k)
+        sums = np.stack([np.bincount(assign, weights=sample[:, i], minlength=k) for i in range(2)], axis=1)
+        # 박스가 하나도 배정되지 않은 앵커는 그대로 둠
+        updated = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], anchors)
+        if np.allclose(updated, anchors):
+            break
+        anchors = updated
+
+    anchors = anchors[np.argsort(anchors[:, 0] * anchors[:, 1])]
+    best_iou = wh_iou(wh, anchors).max(axis=1) if len(wh) else np.zeros(0)
+    return anchors, {
+        'iterations': iterations_run,
+        'boxes_clustered': int(len(sample)),
+        'mean_best_iou': round(float(best_iou.mean()), 4) if best_iou.size else None,
+        # 가장 잘 맞는 앵커와의 IoU가 0.5 이상인 박스 비율
+        'recall_iou50': round(float((best_iou >= 0.5).mean()), 4) if best_iou.size else None,
+    }
+
+def compute_stats(files, boxes, classes_list):
+    """
+    load_boxes 결과로 통계 딕셔너리를 계산합니다. (모든 계산은 배열 연산)
+    YOLO TXT와 같은 박스(difficult 아님, 알 수 없는 클래스 아님)를 기준으로 하고, 제외된 박스 수는 따로 셉니다.
+    앵커 계산용으로 정규화된 박스 크기 배열 (M, 2)도 함께 반환합니다.
+    """
+    import numpy as np
+
+    from trans_coco import convert_boxes
+
+    class_count = len(classes_list)
+    difficult = boxes[:, DIFFICULT] != 0
+    unknown = boxes[:, CLASS_ID] < 0
+    used = boxes[~difficult & ~unknown]
+    class_ids = used[:, CLASS_ID].astype(np.int64)
+    # 박스가 속한 파일의 위치 (files는 ID 순서)
+    file_ids = files[:, FILE_ID].astype(np.int64)
+    positions = np.searchsorted(file_ids, used[:, BOX_FILE_ID].astype(np.int64))
+
+    # convert_box와 같은 연산으로 정규화 좌표를 구하고, 클리핑 전 값이 [0, 1]을 벗어난 박스를 셉니다.
+    raw = convert_boxes(files[positions, IMAGE_W:IMAGE_H + 1], used[:, [XMIN, XMAX, YMIN, YMAX]], clip=False)
+    coords = np.clip(raw, 0.0, 1.0)
+    clipped = (raw != coords).any(axis=1)
+    norm_w, norm_h = coords[:, 2], coords[:, 3]
+    pixel_w = used[:, XMAX] - used[:, XMIN]
+    pixel_h = used[:, YMAX] - used[:, YMIN]
+    degenerate = (norm_w <= 0) | (norm_h <= 0)
+    valid = ~degenerate & (pixel_w > 0) & (pixel_h > 0)
+
+    # 이미지당 박스 수 (박스가 없는 이미지 포함)
+    per_image = np.bincount(positions, minlength=len(file_ids))
+    per_image_hist = np.bincount(np.minimum(per_image, MAX_BOXES_PER_IMAGE_BIN), minlength=MAX_BOXES_PER_IMAGE_BIN + 1)
+    # 클래스별 이미지 수 = 서로 다른 (이미지, 클래스) 쌍의 수 (np.unique보다 정렬 후 인접 비교가 훨씬 빠름)
+    pair_keys = np.sort(positions * max(class_count, 1) + class_ids)
+    image_class_pairs = pair_keys[np.r_[True, pair_keys[1:] != pair_keys[:-1]]] if pair_keys.size else pair_keys
+
+    all_class_ids = boxes[~unknown, CLASS_ID].astype(np.int64)
+    per_class = {
+        'boxes': np.bincount(class_ids, minlength=class_count),
+        'images': np.bincount(image_class_pairs % max(class_count, 1), minlength=class_count),
+        'difficult': np.bincount(all_class_ids, weights=difficult[~unknown], minlength=class_count).astype(np.int64),
+        'clipped': np.bincount(class_ids, weights=clipped, minlength=class_count).astype(np.int64),
+        'pixel_w_sum': np.bincount(class_ids, weights=pixel_w, minlength=class_count),
+        'pixel_h_sum': np.bincount(class_ids, weights=pixel_h, minlength=class_count),
+    }
+    classes = []
+    for i, class_name in enumerate(classes_list):
+        count = int(per_class['boxes'][i])
+        classes.append({
+            'id': i,
+            'name': class_name,
+            'images': int(per_class['images'][i]),
+            'boxes': count,
+            'difficult': int(per_class['difficult'][i]),
+            'clipped': int(per_class['clipped'][i]),
+            'mean_pixel_w': round(float(per_class['pixel_w_sum'][i] / count), 2) if count else None,
+            'mean_pixel_h': round(float(per_class['pixel_h_sum'][i] / count), 2) if count else None,
+        })
+
+    stats = {
+        'images': int(len(file_ids)),
+        'boxes': int(len(used)),
+        'skipped_difficult': int(difficult.sum()),
+        'skipped_unknown_class': int(unknown.sum()),
+        'clipped': int(clipped.sum()),
+        'degenerate': int(degenerate.sum()),
+        'classes': classes,
+        'boxes_per_image': {
+            'mean': round(float(per_image.mean()), 4) if per_image.size else None,
+            'median': float(np.median(per_image)) if per_image.size else None,
+            'max': int(per_image.max()) if per_image.size else None,
+            'empty_images': int((per_image == 0).sum()),
+            # counts[i] = 박스가 i개인 이미지 수 (마지막 구간은 MAX_BOXES_PER_IMAGE_BIN개 이상)
+            'histogram': per_image_hist.tolist(),
+        },
+        'box_width': distribution(norm_w[valid]),
+        'box_height': distribution(norm_h[valid]),
+        'box_pixel_width': distribution(pixel_w[valid]),
+        'box_pixel_height': distribution(pixel_h[valid]),
+        # 가로/세로 비율은 log2로 히스토그램 (1보다 큰 쪽과 작은 쪽을 같은 폭으로)
+        'aspect_ratio': distribution(pixel_w[valid] / pixel_h[valid]),
+        'aspect_ratio_log2': distribution(np.log2(pixel_w[valid] / pixel_h[valid])),
+    }
+    return stats, np.stack((norm_w[valid], norm_h[valid]), axis=1)
+
+def write_csv(report, path=STATS_CSV_PATH):
+    """스플릿/클래스별 한 줄씩 CSV로 저장합니다."""
+    columns = ['split', 'id', 'name', 'images', 'boxes', 'difficult', 'clipped', 'mean_pixel_w', 'mean_pixel_h']
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for split_name, stats in report['splits'].items():
+            for row in stats['classes']:
+                writer.writerow({'split': split_name, **row})
+    os.replace(tmp_path, path)
+
+def write_json(report, path=STATS_JSON_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+def print_summary(report):
+    for split_name, stats in report['splits'].items():
+        print(f"  [{split_name}] 이미지 {stats['images']}개, 박스 {stats['boxes']}개 "
+              f"(클리핑 {stats['clipped']}개, difficult 제외 {stats['skipped_difficult']}개, "
+              f"알 수 없는 클래스 {stats['skipped_unknown_class']}개, 크기 0 {stats['degenerate']}개)")
+    anchors = report.get('anchors')
+    if anchors is not None:
+        wh = ', '.join(f"{w:.0f}x{h:.0f}" for w, h in anchors['wh'])
+        print(f"  앵커 ({anchors['image_size'][0]}x{anchors['image_size'][1]} 기준): {wh}")
+        print(f"  앵커 평균 최대 IoU {anchors['mean_best_iou']}, IoU 0.5 이상 박스 비율 {anchors['recall_iou50']}")
+
+def run(label_dirs, classes_list, allowed=None, anchor_split='train', anchor_count=ANCHOR_COUNT, db_path=None,
+        json_path=STATS_JSON_PATH, csv_path=STATS_CSV_PATH):
+    """
+    label_dirs({스플릿 이름: XML 루트 폴더})의 통계와 anchor_split 박스의 앵커를 계산하여 JSON/CSV로 저장합니다.
+    classes_list는 data.yaml의 클래스 순서입니다. 보고서 딕셔너리를 반환합니다.
+    """
+    import numpy as np
+
+    print(f"\n--- 데이터셋 통계 계산 시작 (어노테이션 DB: {db_path or annotation_db.ANNOTATION_DB_PATH}) ---")
+    report = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'classes': list(classes_list),
+        'splits': {},
+    }
+    with stage_metrics.StageMetrics('stats') as metrics, \
+            annotation_db.AnnotationDB(db_path or annotation_db.ANNOTATION_DB_PATH) as db:
+        anchor_wh = None
+        for split_name, label_dir in label_dirs.items():
+            start = time.perf_counter()
+            files, boxes = load_boxes(db, label_dir, classes_list, allowed)
+            load_time = time.perf_counter() - start
+            stats, norm_wh = compute_stats(files, boxes, classes_list)
+            stats['label_dir'] = label_dir
+            stats['load_time'] = round(load_time, 4)
+            stats['compute_time'] = round(time.perf_counter() - start - load_time, 4)
+            report['splits'][split_name] = stats
+            metrics.add(files=stats['images'])
+            if split_name == anchor_split:
+                anchor_wh = norm_wh
+            if stats['images'] == 0:
+                print(f"⚠️ [{split_name}] DB에 기록이 없습니다. 먼저 trans_coco.py 또는 annotation_db.py update를 실행하세요.")
+
+        if anchor_wh is not None and len(anchor_wh):
+            image_size = anchor_image_size()
+            start = time.perf_counter()
+            anchors, quality = kmeans_anchors(anchor_wh * np.asarray(image_size, dtype=np.float64), anchor_count)
+            report['anchors'] = {
+                'split': anchor_split,
+                'k': int(len(anchors)),
+                'image_size': list(image_size),
+                'wh': [[round(float(w), 2), round(float(h), 2)] for w, h in anchors],
+                **quality,
+                'compute_time': round(time.perf_counter() - start, 4),
+            }
+        metrics.extra['boxes'] = sum(stats['boxes'] for stats in report['splits'].values())
+
+    write_json(report, json_path)
+    write_csv(report, csv_path)
+    print_summary(report)
+    print(f"✅ 데이터셋 통계 저장 완료: {json_path}, {csv_path}")
+    return report
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='데이터셋 통계/앵커 보고서 (어노테이션 DB 기반, XML 재파싱 없음)')
+    parser.add_argument('--anchors', type=int, default=ANCHOR_COUNT, help='k-means 앵커 개수')
+    parser.add_argument('--db', default=annotation_db.ANNOTATION_DB_PATH, help='어노테이션 DB 파일 경로')
+    args = parser.parse_args()
+
+    allowlist = class_allowlist.load_allowlist()
+    if allowlist is None:
+        print(f"허용 목록이 없습니다: {class_allowlist.ALLOWLIST_PATH} (trans_coco.py 또는 run_all.py를 먼저 실행하세요)")
+    else:
+        run(annotation_db.split_label_dirs(), allowlist['classes'], set(allowlist['classes']),
+            anchor_count=args.anchors, db_path=args.db)
@@ -0,0 +1,131 @@
+import heapq
+import os
+import shutil
+import tempfile
+
+# --- [Configuration Section] ---
+# 파일 수천만 개 규모의 목록을 메모리에 올리지 않고 정렬/조인하기 위한 외부 정렬입니다.
+# 줄을 SORT_RUN_LINES개씩 정렬하여 임시 run 파일로 쓰고, 읽을 때 heapq.merge로 합쳐 정렬된 순서로 돌려줍니다.
+# 메모리에는 run 하나 분량과 run 파일마다 한 줄씩만 올라갑니다.
+#
+# 줄 형식은 'key<TAB>값...\n'입니다. 탭은 출력 가능한 어떤 문자보다 작으므로
+# 줄 전체를 문자열로 정렬하면 key 순서(같은 key는 값 순서)가 됩니다.
+
+# 1. run 파일 하나에 담을 최대 줄 수 (한 번에 메모리에서 정렬하는 양)
+SORT_RUN_LINES = 500000
+
+# 2. run 파일을 만들 임시 폴더 (None이면 시스템 임시 폴더, 출력 폴더와 같은 디스크를 권장)
+SORT_TMP_DIR = None
+
+class SortedLines:
+    """
+    lines(끝에 '\\n'이 있는 문자열)를 외부 정렬합니다. with 문 안에서 여러 번 반복할 수 있고, 끝나면 run 파일을 지웁니다.
+
+    예:
+        with SortedLines(f"{stem}\\t{path}\\n" for stem, path in records) as sorted_lines:
+            for line in sorted_lines:
+                ...
+    """
+
+    def __init__(self, lines, run_lines=None, tmp_dir=None):
+        self._lines = lines
+        self.run_lines = max(1, SORT_RUN_LINES if run_lines is None else run_lines)
+        self.tmp_dir = SORT_TMP_DIR if tmp_dir is None else tmp_dir
+        self.run_paths = []
+        self.count = 0
+        self._work_dir = None
+
+    def __enter__(self):
+        if self.tmp_dir is not None:
+            os.makedirs(self.tmp_dir, exist_ok=True)
+        self._work_dir = tempfile.mkdtemp(prefix='sort_', dir=self.tmp_dir)
+        try:
+            run = []
+            for line in self._lines:
+                run.append(line)
+                if len(run) >= self.run_lines:
+                    self._write_run(run)
+                    run = []
+            if run:
+                self._write_run(run)
+        except BaseException:
+            # __enter__가 실패하면 __exit__가 불리지 않으므로 여기서 run 파일을 지움
+            shutil.rmtree(self._work_dir, ignore_errors=True)
+            raise
+        self._lines = None
+        return self
+
+    def _write_run(self, run):
+        run.sort()
+        path = os.path.join(self._work_dir, f"run_{len(self.run_paths):06d}.txt")
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            f.writelines(run)
+        self.run_paths.append(path)
+        self.count += len(run)
+
+    def __iter__(self):
+        files = [open(path, 'r', encoding='utf-8', newline='\n') for path in self.run_paths]
+        try:
+            yield from heapq.merge(*files)
+        finally:
+            for f in files:
+                f.close()
+
+    def __exit__(self, exc_type, exc, tb):
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+        return False
+
+def split_line(line):
+    """'key<TAB>값<TAB>...\\n' -> (key, 값, ...)"""
+    return tuple(line.rstrip('\n').split('\t'))
+
+def last_per_key(sorted_lines, counts=None):
+    """
+    정렬된 'key<TAB>값' 줄에서 key마다 마지막(값 순서상 가장 큰) (key, 값)만 돌려줍니다.
+    counts(딕셔너리)가 주어지면 버린 중복 수를 counts['duplicates']에 더합니다.
+    """
+    previous = None
+    for line in sorted_lines:
+        record = split_line(line)
+        if previous is not None and previous[0] != record[0]:
+            yield previous
+        elif previous is not None and counts is not None:
+            counts['duplicates'] = counts.get('duplicates', 0) + 1
+        previous = record
+    if previous is not None:
+        yield previous
+
+def merge_join(left, right, counts=None):
+    """
+    key 순서로 정렬되고 key가 겹치지 않는 두 (key, 값) 스트림을 병합 조인하여 양쪽에 모두 있는 key의
+    (key, 왼쪽 값, 오른쪽 값)을 key 순서로 돌려줍니다.
+    counts(딕셔너리)가 주어지면 'left_only', 'right_only', 'matched' 수를 기록합니다.
+    """
+    counts = {} if counts is None else counts
+    for name in ('left_only', 'right_only', 'matched'):
+        counts.setdefault(name, 0)
+    left, right = iter(left), iter(right)
+    left_record, right_record = next(left, None), next(right, None)
+    while left_record is not None and right_record is not None:
+        if left_record[0] < right_record[0]:
+            counts['left_only'] += 1
+            left_record = next(left, None)
+        elif left_record[0] > right_record[0]:
+            counts['right_only'] += 1
+            right_record = next(right, None)
+        else:
+            counts['matched'] += 1
+            yield left_record[0], left_record[1], right_record[1]
+            left_record, right_record = next(left, None), next(right, None)
+    counts['left_only'] += sum(1 for _ in left) + (left_record is not None)
+    counts['right_only'] += sum(1 for _ in right) + (right_record is not None)
+
+def sorted_difference(sorted_a, sorted_b):
+    """정렬된 두 스트림에서 sorted_a에만 있는 항목을 순서대로 돌려줍니다."""
+    sorted_b = iter(sorted_b)
+    b = next(sorted_b, None)
+    for a in sorted_a:
+        while b is not None and b < a:
+            b = next(sorted_b, None)
+        if b is None or b != a:
+            yield a
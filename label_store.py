@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import shutil
+
+# --- [Configuration Section] ---
+# labels/<split>의 작은 YOLO TXT 수십만 개를 스플릿마다 파일 몇 개로 묶은 라벨 저장소입니다.
+# 학습 코드는 TXT를 하나씩 읽지 않고 np.load(mmap_mode='r')로 필요한 부분만 읽습니다.
+#
+# <LABEL_STORE_DIR>/<split>/
+#   offsets.npy : int64 (N+1,)  이미지 i의 박스는 labels[offsets[i]:offsets[i+1]]
+#   labels.npy  : 구조체 배열 (class_id, xc, yc, w, h), 좌표는 COORD_SCALE을 곱한 정수 (TXT의 소수 6자리를 그대로 보존)
+#   sizes.npy   : int32 (N, 2)  images/<split>에 저장된 이미지의 (가로, 세로)
+#   names.txt   : 이미지 파일 이름 (train.txt와 같은 순서)
+#   meta.json   : 개수/형식 정보
+
+# 1. 라벨 저장소를 만들 폴더 (스플릿별 하위 폴더)
+LABEL_STORE_DIR = './label_store'
+
+# 2. coco_setting_train.run이 labels/<split>을 만든 뒤 저장소도 함께 만들지 여부
+WRITE_LABEL_STORE = True
+
+# 3. 좌표 저장 배율 (YOLO TXT는 소수 6자리이므로 1e6이면 TXT를 똑같이 다시 만들 수 있음)
+COORD_SCALE = 1000000
+
+STORE_VERSION = 1
+LABEL_FIELDS = ('class_id', 'xc', 'yc', 'w', 'h')
+
+def label_dtype():
+    import numpy as np
+    return np.dtype([(name, '<i4') for name in LABEL_FIELDS])
+
+def store_dir_for(split_name, root_dir=LABEL_STORE_DIR):
+    return os.path.join(root_dir, split_name)
+
+def read_image_size(image_path):
+    """
+    이미지 헤더만 읽어 (가로, 세로)를 반환합니다. PIL이 없으면 cv2로 디코딩합니다. 읽을 수 없으면 (0, 0)입니다.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    try:
+        if Image is not None:
+            with Image.open(image_path) as img:
+                return img.size
+        import cv2
+        import numpy as np
+        img = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        return (img.shape[1], img.shape[0]) if img is not None else (0, 0)
+    except Exception:
+        return 0, 0
+
+def _write_atomic_dir(store_dir, write_files):
+    """임시 폴더에 저장소 파일을 모두 쓴 뒤 기존 폴더와 교체합니다. (쓰는 도중 실패해도 이전 저장소가 남음)"""
+    tmp_dir = store_dir.rstrip('\\/') + '.tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    write_files(tmp_dir)
+    if os.path.exists(store_dir):
+        shutil.rmtree(store_dir)
+    os.replace(tmp_dir, store_dir)
+
+def build_store(image_names, label_paths, image_paths, store_dir, target_size=None, image_extensions=('.jpg', '.jpeg')):
+    """
+    image_names(확장자 포함 이미지 파일 이름, train.txt 순서)와 같은 순서의 라벨 TXT(label_paths)를 읽어 저장소를 만듭니다.
+    이미지 크기는 target_size로 리사이징된 이미지(image_extensions)이면 그 값을, 아니면 image_paths의 헤더를 읽어 기록합니다.
+    형식이 맞지 않는(열이 5개가 아닌) 라벨 파일은 경고 후 박스 없이 기록합니다. 저장한 박스 수를 반환합니다.
+    """
+    import numpy as np
+
+    print(f"\n--- 라벨 저장소 생성: {store_dir} (이미지 {len(image_names)}개) ---")
+    counts = np.zeros(len(image_names), dtype=np.int64)
+    sizes = np.zeros((len(image_names), 2), dtype=np.int32)
+    tokens = []
+    for i, (image_name, label_path, image_path) in enumerate(zip(image_names, label_paths, image_paths)):
+        try:
+            with open(label_path, 'r', encoding='utf-8') as f:
+                values = f.read().split()
+        except OSError as e:
+            print(f"⚠️ 라벨 파일을 읽을 수 없습니다: {label_path} ({e})")
+            values = []
+        if len(values) % len(LABEL_FIELDS) != 0:
+            print(f"⚠️ 형식이 맞지 않는 라벨 파일은 박스 없이 기록합니다: {label_path}")
+            values = []
+        counts[i] = len(values) // len(LABEL_FIELDS)
+        tokens.extend(values)
+
+        if target_size is not None and image_name.lower().endswith(image_extensions):
+            sizes[i] = target_size
+        else:
+            sizes[i] = read_image_size(image_path)
+
+    # 모든 파일의 값을 한 번에 숫자로 변환 (소수 6자리 -> 정수, 반올림으로 TXT 값과 정확히 일치)
+    raw = np.array(tokens, dtype=np.float64).reshape(-1, len(LABEL_FIELDS))
+    labels = np.empty(len(raw), dtype=label_dtype())
+    labels['class_id'] = raw[:, 0].astype(np.int32)
+    for column, name in enumerate(LABEL_FIELDS[1:], start=1):
+        labels[name] = np.rint(raw[:, column] * COORD_SCALE).astype(np.int32)
+
+    offsets = np.zeros(len(image_names) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    def write_files(tmp_dir):
+        np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+        np.save(os.path.join(tmp_dir, 'labels.npy'), labels)
+        np.save(os.path.join(tmp_dir, 'sizes.npy'), sizes)
+        with open(os.path.join(tmp_dir, 'names.txt'), 'w', encoding='utf-8') as f:
+            f.writelines(name + '\n' for name in image_names)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'images': len(image_names), 'boxes': len(labels),
+                       'coord_scale': COORD_SCALE, 'fields': list(LABEL_FIELDS)}, f, ensure_ascii=False, indent=2)
+
+    _write_atomic_dir(store_dir, write_files)
+    print(f"✅ 라벨 저장소 저장 완료: {store_dir} (이미지 {len(image_names)}개, 박스 {len(labels)}개)")
+    return len(labels)
+
+class LabelStore:
+    """
+    build_store로 만든 라벨 저장소를 읽습니다. 기본은 메모리 매핑이라 여는 비용이 파일 크기와 관계없이 작습니다.
+
+    예:
+        store = LabelStore('./label_store/train')
+        for i in range(len(store)):
+            classes, boxes = store.classes(i), store.boxes(i)   # (k,), (k, 4) xc yc w h (0~1)
+    """
+
+    def __init__(self, store_dir, mmap=True):
+        import numpy as np
+
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != STORE_VERSION:
+            raise ValueError(f"지원하지 않는 라벨 저장소 버전입니다: {self.meta.get('version')} ({store_dir})")
+
+        mmap_mode = 'r' if mmap else None
+        self.offsets = np.load(os.path.join(store_dir, 'offsets.npy'), mmap_mode=mmap_mode)
+        self.labels = np.load(os.path.join(store_dir, 'labels.npy'), mmap_mode=mmap_mode)
+        self.sizes = np.load(os.path.join(store_dir, 'sizes.npy'), mmap_mode=mmap_mode)
+        with open(os.path.join(store_dir, 'names.txt'), 'r', encoding='utf-8') as f:
+            self.names = f.read().splitlines()
+        self.coord_scale = self.meta['coord_scale']
+        self._index = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def raw(self, i):
+        """이미지 i의 구조체 배열 (정수 좌표) 조각"""
+        return self.labels[self.offsets[i]:self.offsets[i + 1]]
+
+    def classes(self, i):
+        return self.raw(i)['class_id']
+
+    def boxes(self, i):
+        """이미지 i의 (k, 4) float32 배열 (xc, yc, w, h, 0~1 정규화 좌표)"""
+        import numpy as np
+
+        rows = self.raw(i)
+        boxes = np.empty((len(rows), 4), dtype=np.float32)
+        for column, name in enumerate(LABEL_FIELDS[1:]):
+            boxes[:, column] = rows[name] / self.coord_scale
+        return boxes
+
+    def size(self, i):
+        return tuple(int(v) for v in self.sizes[i])
+
+    def index_of(self, stem):
+        """확장자 미포함 이미지 이름으로 위치를 찾습니다. 없으면 KeyError"""
+        if self._index is None:
+            self._index = {os.path.splitext(name)[0]: i for i, name in enumerate(self.names)}
+        return self._index[stem]
+
+    def label_text(self, i):
+        """이미지 i의 YOLO TXT 내용 (coco_setting_train이 만든 파일과 같은 형식)"""
+        from trans_coco import YOLO_LINE_FORMAT
+
+        rows = self.raw(i)
+        scale = self.coord_scale
+        return ''.join(YOLO_LINE_FORMAT % (row['class_id'], row['xc'] / scale, row['yc'] / scale,
+                                           row['w'] / scale, row['h'] / scale) for row in rows)
+
+def write_txt_files(store, output_dir):
+    """저장소의 라벨을 '<stem>.txt' 파일로 다시 만듭니다. 만든 파일 수를 반환합니다."""
+    os.makedirs(output_dir, exist_ok=True)
+    for i, name in enumerate(store.names):
+        with open(os.path.join(output_dir, os.path.splitext(name)[0] + '.txt'), 'w') as f:
+            f.write(store.label_text(i))
+    print(f"✅ TXT {len(store)}개 생성 완료: {output_dir}")
+    return len(store)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='라벨 저장소 정보 확인 / TXT 다시 만들기')
+    parser.add_argument('split', choices=('train', 'valid'), help='스플릿 이름')
+    parser.add_argument('--store-dir', default=LABEL_STORE_DIR, help='라벨 저장소 폴더')
+    parser.add_argument('--to-txt', metavar='OUTPUT_DIR', default=None, help='저장소에서 YOLO TXT 파일을 다시 만들 폴더')
+    args = parser.parse_args()
+
+    label_store = LabelStore(store_dir_for(args.split, args.store_dir))
+    print(f"📦 {label_store.store_dir}: 이미지 {len(label_store)}개, 박스 {label_store.meta['boxes']}개")
+    if args.to_txt:
+        write_txt_files(label_store, args.to_txt)
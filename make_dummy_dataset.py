@@ -0,0 +1,163 @@
+import argparse
+import os
+import random
+
+import cv2
+import numpy as np
+
+# --- [Configuration Section] ---
+# AI Hub 데이터셋과 같은 구조의 가짜 데이터셋을 만듭니다.
+# <root>/Training/image/<ID_클래스이름>/<ID>_<번호>_m_<split>.jpg
+# <root>/Training/label/<ID_클래스이름>/<ID>_<번호>_m_<split>.xml
+# (Validation도 같은 구조)
+
+# 1. 기본 출력 폴더
+OUTPUT_DIR = './dummy_dataset'
+
+# 2. Training 전체 파일 수 (Validation은 VALID_RATIO 비율로 생성)
+NUM_FILES = 1000
+VALID_RATIO = 0.2
+
+# 3. 클래스 수, 이미지당 객체 수, 이미지 크기 (가로, 세로)
+NUM_CLASSES = 10
+OBJECTS_PER_FILE = 5
+IMAGE_SIZE = (1024, 768)
+
+# 4. 쌍이 없는 파일 비율 (이미지만 있거나 라벨만 있는 파일)
+MISSING_PAIR_RATIO = 0.02
+
+# 5. Validation에서 빠질 클래스 수 (클래스 불일치 재현용)
+MISMATCH_CLASSES = 0
+
+# 6. <comp_cd>로 감싼 XML 비율 (AI Hub 원본처럼 메타데이터가 앞에 붙은 형식)
+WRAPPED_XML_RATIO = 0.3
+
+def class_folder_names(num_classes):
+    """'ID_클래스이름' 형식의 폴더 이름 리스트를 만듭니다."""
+    return [f"{10000 + i}_상품{i:04d}" for i in range(num_classes)]
+
+def make_xml(filename, class_name, image_size, num_objects, rng, wrapped):
+    """
+    AI Hub VOC 형식의 XML 문자열을 만듭니다. 좌표는 1-based 정수입니다.
+    """
+    width, height = image_size
+    objects = []
+    for _ in range(num_objects):
+        xmin = rng.randint(1, max(1, width - 20))
+        ymin = rng.randint(1, max(1, height - 20))
+        xmax = rng.randint(xmin + 1, width)
+        ymax = rng.randint(ymin + 1, height)
+        difficult = 1 if rng.random() < 0.05 else 0
+        objects.append(
+            f"<object><name>{class_name}</name><pose>Unspecified</pose><truncated>0</truncated>"
+            f"<difficult>{difficult}</difficult><bndbox><xmin>{xmin}</xmin><ymin>{ymin}</ymin>"
+            f"<xmax>{xmax}</xmax><ymax>{ymax}</ymax></bndbox></object>"
+        )
+
+    annotation = (
+        f"<annotation><folder>image</folder><filename>{filename}</filename>"
+        f"<path>{filename}</path><source><database>AI Hub</database></source>"
+        f"<size><width>{width}</width><height>{height}</height><depth>3</depth></size>"
+        f"<segmented>0</segmented>{''.join(objects)}</annotation>"
+    )
+    if wrapped:
+        meta = ''.join(f"<item{i}>{'메타데이터' * 8}</item{i}>" for i in range(20))
+        annotation = f"<comp_cd><meta_info>{meta}</meta_info>{annotation}</comp_cd>"
+    return '<?xml version="1.0" encoding="utf-8"?>\n' + annotation
+
+def encode_dummy_image(image_size, seed=0):
+    """
+    한 번만 인코딩한 JPEG 바이트를 만들어 모든 이미지 파일에 재사용합니다. (생성 속도를 위해)
+    """
+    width, height = image_size
+    rng = np.random.default_rng(seed)
+    # 완전한 노이즈보다 실제 사진에 가까운 압축률이 나오도록 그라디언트 + 약한 노이즈 사용
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    img = np.broadcast_to(gradient, (height, width, 3)).copy()
+    img += rng.normal(0, 12, img.shape).astype(np.float32)
+    ok, encoded = cv2.imencode('.jpg', np.clip(img, 0, 255).astype(np.uint8))
+    if not ok:
+        raise ValueError("더미 이미지 인코딩에 실패했습니다.")
+    return encoded.tobytes()
+
+def generate_split(split_dir, split_tag, num_files, class_folders, image_bytes, image_size,
+                   objects_per_file, missing_pair_ratio, wrapped_ratio, rng, write_images=True):
+    """
+    split_dir(예: <root>/Training) 아래에 image/, label/ 폴더와 파일을 만듭니다.
+    (이미지 수, 라벨 수)를 반환합니다.
+    """
+    image_count = 0
+    label_count = 0
+    for i in range(num_files):
+        folder = class_folders[i % len(class_folders)]
+        class_id, class_name = folder.split('_', 1)
+        stem = f"{class_id}_{i}_m_{split_tag}"
+
+        image_dir = os.path.join(split_dir, 'image', folder)
+        label_dir = os.path.join(split_dir, 'label', folder)
+        os.makedirs(image_dir, exist_ok=True)
+        os.makedirs(label_dir, exist_ok=True)
+
+        # 쌍이 없는 파일 만들기: 절반은 이미지 없음, 절반은 라벨 없음
+        missing = rng.random() < missing_pair_ratio
+        drop_image = missing and rng.random() < 0.5
+        drop_label = missing and not drop_image
+
+        if write_images and not drop_image:
+            with open(os.path.join(image_dir, stem + '.jpg'), 'wb') as f:
+                f.write(image_bytes)
+            image_count += 1
+
+        if not drop_label:
+            xml = make_xml(stem + '.jpg', class_name, image_size, objects_per_file, rng,
+                           rng.random() < wrapped_ratio)
+            with open(os.path.join(label_dir, stem + '.xml'), 'w', encoding='utf-8') as f:
+                f.write(xml)
+            label_count += 1
+
+    return image_count, label_count
+
+def generate_dataset(output_dir=OUTPUT_DIR, num_files=NUM_FILES, num_classes=NUM_CLASSES,
+                     objects_per_file=OBJECTS_PER_FILE, image_size=IMAGE_SIZE,
+                     missing_pair_ratio=MISSING_PAIR_RATIO, mismatch_classes=MISMATCH_CLASSES,
+                     valid_ratio=VALID_RATIO, wrapped_ratio=WRAPPED_XML_RATIO, seed=0, write_images=True):
+    """
+    output_dir 아래에 Training/Validation 가짜 데이터셋을 만듭니다.
+    write_images=False이면 라벨만 만듭니다. (라벨 단계만 벤치마크할 때)
+    """
+    rng = random.Random(seed)
+    class_folders = class_folder_names(num_classes)
+    image_bytes = encode_dummy_image(image_size, seed) if write_images else b''
+
+    valid_folders = class_folders[:len(class_folders) - mismatch_classes] if mismatch_classes else class_folders
+    num_valid = max(1, int(num_files * valid_ratio))
+
+    print(f"--- 더미 데이터셋 생성 시작: {output_dir} ---")
+    for split, split_tag, count, folders in (('Training', 'T', num_files, class_folders),
+                                              ('Validation', 'V', num_valid, valid_folders)):
+        images, labels = generate_split(os.path.join(output_dir, split), split_tag, count, folders,
+                                        image_bytes, image_size, objects_per_file, missing_pair_ratio,
+                                        wrapped_ratio, rng, write_images)
+        print(f"✅ {split}: 이미지 {images}개, 라벨 {labels}개, 클래스 {len(folders)}개")
+
+def main():
+    parser = argparse.ArgumentParser(description='AI Hub 형식의 가짜 Training/Validation 데이터셋을 만듭니다.')
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--files', type=int, default=NUM_FILES, help='Training 파일 수')
+    parser.add_argument('--classes', type=int, default=NUM_CLASSES)
+    parser.add_argument('--objects', type=int, default=OBJECTS_PER_FILE, help='이미지당 객체 수')
+    parser.add_argument('--image-size', type=int, nargs=2, default=IMAGE_SIZE, metavar=('W', 'H'))
+    parser.add_argument('--missing-pairs', type=float, default=MISSING_PAIR_RATIO, help='쌍이 없는 파일 비율')
+    parser.add_argument('--mismatch-classes', type=int, default=MISMATCH_CLASSES, help='Validation에서 빠질 클래스 수')
+    parser.add_argument('--valid-ratio', type=float, default=VALID_RATIO)
+    parser.add_argument('--wrapped-ratio', type=float, default=WRAPPED_XML_RATIO, help='<comp_cd>로 감싼 XML 비율')
+    parser.add_argument('--labels-only', action='store_true', help='이미지 없이 라벨만 생성')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    generate_dataset(args.output, args.files, args.classes, args.objects, tuple(args.image_size),
+                     args.missing_pairs, args.mismatch_classes, args.valid_ratio, args.wrapped_ratio,
+                     args.seed, not args.labels_only)
+
+if __name__ == '__main__':
+    main()
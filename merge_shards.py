@@ -0,0 +1,263 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import annotation_db
+import coco_setting_train as cst
+import create_data_yaml as cdy
+import dataset_stats
+import label_store
+import sharding
+import stage_metrics
+import xml_path_set as xps
+
+# --- [Configuration Section] ---
+# run_all.py --shard i/N 으로 나누어 실행한 샤드 결과(SHARD_ROOT_DIR/shard_<i>_of_<N>/)를
+# 하나의 images/ labels/ train.txt valid.txt data.yaml 로 합칩니다.
+
+# 1. 샤드 이미지를 최종 images 폴더에 만드는 방식 (coco_setting_train.LINK_MODES 중 하나)
+# 같은 파일 시스템이면 'hardlink'로 복사 없이 만들고, 지원되지 않으면 자동으로 'copy'로 대체합니다.
+MERGE_LINK_MODE = 'hardlink'
+
+# 2. 합칠 스플릿 (샤드 폴더 안의 상대 경로는 단일 실행의 출력 경로와 같음)
+SPLITS = [
+    {'name': 'train', 'base_dir': cdy.BASE_DIR, 'label_dir': xps.LABEL_ROOT_DIR,
+     'images_out': cst.TARGET_DIR, 'labels_out': cst.OUTPUT_ROOT_DIR, 'txt': 'train.txt'},
+    {'name': 'valid', 'base_dir': cdy.V_BASE_DIR, 'label_dir': xps.V_LABEL_ROOT_DIR,
+     'images_out': cst.V_TARGET_DIR, 'labels_out': cst.V_OUTPUT_ROOT_DIR, 'txt': 'valid.txt'},
+]
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run_local_shards(count):
+    """
+    한 머신에서 run_all.py --shard i/N 을 N개의 프로세스로 동시에 실행합니다. (여러 노드 실행을 로컬에서 확인하는 용도)
+    각 샤드의 출력은 샤드 폴더의 run.log에 저장합니다. 모든 샤드가 성공하면 True를 반환합니다.
+    """
+    print(f"\n--- 로컬 샤드 실행: {count}개 프로세스 ---")
+    processes = []
+    for index in range(count):
+        shard = sharding.Shard(index, count)
+        os.makedirs(sharding.shard_dir(shard), exist_ok=True)
+        log_path = os.path.join(sharding.shard_dir(shard), 'run.log')
+        log_file = open(log_path, 'w', encoding='utf-8')
+        process = subprocess.Popen([sys.executable, os.path.join(CURRENT_DIR, 'run_all.py'),
+                                    '--shard', f"{index}/{count}"],
+                                   stdout=log_file, stderr=subprocess.STDOUT)
+        processes.append((shard, process, log_file, log_path))
+
+    ok = True
+    for shard, process, log_file, log_path in processes:
+        returncode = process.wait()
+        log_file.close()
+        if returncode == 0:
+            print(f"✅ 샤드 {shard.index}/{shard.count} 완료 (로그: {log_path})")
+        else:
+            ok = False
+            print(f"❌ 샤드 {shard.index}/{shard.count} 실패 (Exit Code: {returncode}, 로그: {log_path})")
+    return ok
+
+def read_classes(path):
+    """classes.txt를 읽어 클래스 이름 리스트를 반환합니다. (줄바꿈 제거)"""
+    classes = []
+    if cdy.get_classes_list(path, classes) != 0:
+        raise FileNotFoundError(path)
+    return [name.strip() for name in classes if name.strip()]
+
+def merge_class_lists(class_lists):
+    """
+    샤드별 클래스 목록의 합집합을 단일 실행과 같은 기준(이름 정렬)으로 정렬해 반환합니다.
+    (ID가 다른 폴더가 같은 클래스 이름을 가지면 서로 다른 샤드에 들어갈 수 있으므로 합집합으로 합침)
+    """
+    return sorted(set().union(*class_lists))
+
+def remap_label_lines(text, id_map, label_path):
+    """
+    YOLO 라벨의 첫 번째 열(클래스 ID)을 id_map(샤드 ID -> 전체 ID)으로 바꿉니다.
+    id_map에 없는 ID의 줄은 경고 후 제외합니다.
+    """
+    lines = []
+    for line in text.splitlines():
+        parts = line.split(' ', 1)
+        if not parts[0]:
+            continue
+        try:
+            class_id = id_map[int(parts[0])]
+        except (KeyError, ValueError):
+            print(f"\n⚠️ 알 수 없는 클래스 ID '{parts[0]}' 줄을 제외합니다: {label_path}")
+            continue
+        lines.append(f"{class_id} {parts[1]}" if len(parts) > 1 else str(class_id))
+    return ''.join(line + '\n' for line in lines)
+
+def _is_same_file(source_path, target_path):
+    """target이 이미 source의 하드링크이거나 크기/수정 시간이 같은 복사본이면 True"""
+    try:
+        if os.path.samefile(source_path, target_path):
+            return True
+        src, dst = os.stat(source_path), os.stat(target_path)
+    except OSError:
+        return False
+    return src.st_size == dst.st_size and src.st_mtime_ns == dst.st_mtime_ns
+
+def merge_split(split, shards, global_classes, link_mode=MERGE_LINK_MODE):
+    """
+    모든 샤드의 한 스플릿(images/<split>, labels/<split>)을 최종 폴더로 합치고 경로 목록 파일을 만듭니다.
+    샤드 라벨의 클래스 ID는 global_classes 기준으로 바꿔 씁니다. (샤드 폴더의 파일은 수정하지 않음)
+    이미 같은 내용인 이미지/라벨은 다시 쓰지 않습니다.
+    """
+    global_ids = {name: class_id for class_id, name in enumerate(global_classes)}
+    os.makedirs(split['images_out'], exist_ok=True)
+    os.makedirs(split['labels_out'], exist_ok=True)
+
+    images = {}
+    labels = set()
+    with stage_metrics.StageMetrics(f"merge:{split['name']}") as metrics:
+        for shard in shards:
+            shard_classes = read_classes(os.path.join(sharding.shard_path(shard, split['base_dir']),
+                                                      cdy.CLASSES_TEXT_FILE))
+            id_map = {}
+            for class_id, name in enumerate(shard_classes):
+                if name in global_ids:
+                    id_map[class_id] = global_ids[name]
+            identity = all(local == target for local, target in id_map.items()) and len(id_map) == len(shard_classes)
+            print(f"--- 샤드 {shard.index}/{shard.count} [{split['name']}]: 클래스 {len(shard_classes)}개"
+                  f"{'' if identity else ' (ID 재매핑)'} ---")
+
+            # 1. 이미지: 샤드 파일을 그대로 링크(또는 복사)
+            shard_images_dir = sharding.shard_path(shard, split['images_out'])
+            for entry in sorted(os.scandir(shard_images_dir), key=lambda e: e.name):
+                if not entry.is_file():
+                    continue
+                stem = os.path.splitext(entry.name)[0]
+                if stem in images:
+                    print(f"\n⚠️ 여러 샤드에 같은 stem이 있습니다 (마지막 샤드 사용): {stem}")
+                images[stem] = entry.name
+                target_path = os.path.join(split['images_out'], entry.name)
+                if _is_same_file(entry.path, target_path):
+                    metrics.add(skipped=1)
+                    continue
+                used_mode = cst.materialize_file(entry.path, target_path, link_mode)
+                size = entry.stat().st_size if used_mode == 'copy' else 0
+                metrics.add(files=1, bytes_read=size, bytes_written=size)
+
+            # 2. 라벨: 클래스 ID를 전체 목록 기준으로 바꿔 쓰기 (내용이 같으면 건너뜀)
+            shard_labels_dir = sharding.shard_path(shard, split['labels_out'])
+            for entry in sorted(os.scandir(shard_labels_dir), key=lambda e: e.name):
+                if not entry.is_file():
+                    continue
+                labels.add(entry.name)
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                if not identity:
+                    text = remap_label_lines(text, id_map, entry.path)
+                target_path = os.path.join(split['labels_out'], entry.name)
+                if os.path.exists(target_path):
+                    with open(target_path, 'r', encoding='utf-8') as f:
+                        if f.read() == text:
+                            metrics.add(skipped=1)
+                            continue
+                with open(target_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                metrics.add(files=1, bytes_read=entry.stat().st_size, bytes_written=len(text.encode('utf-8')))
+
+    print(f"✅ [{split['name']}] 이미지 {len(images)}개, 라벨 {len(labels)}개 병합 완료 "
+          f"(새로 쓴 파일 {metrics.files}개, 건너뜀 {metrics.skipped}개)")
+
+    # 3. 지난 병합에서 남은, 이제 어느 샤드에도 없는 파일 정리
+    cst.remove_stale_files(split['images_out'], set(images.values()))
+    cst.remove_stale_files(split['labels_out'], labels)
+
+    # 4. 경로 목록 파일과 라벨 저장소 (단일 실행과 같이 stem 순서)
+    images_list = [images[stem] for stem in sorted(images)]
+    cst.create_image_paths_txt(images_list, split['txt'])
+    if label_store.WRITE_LABEL_STORE:
+        label_store.build_store(images_list,
+                                [os.path.join(split['labels_out'], os.path.splitext(name)[0] + '.txt') for name in images_list],
+                                [os.path.join(split['images_out'], name) for name in images_list],
+                                label_store.store_dir_for(split['name']), cst.TARGET_SIZE, cst.resized_extensions())
+
+def merge_path_indexes(split, shards):
+    """샤드별 sidecar 경로 인덱스가 있으면 원본 label 폴더의 인덱스 하나로 합칩니다."""
+    merged = {}
+    found = False
+    for shard in shards:
+        shard_label_dir = sharding.shard_path(shard, split['label_dir'])
+        if os.path.exists(xps.path_index_path(shard_label_dir)):
+            found = True
+            merged.update(xps.load_path_index(shard_label_dir))
+    if found:
+        xps.update_path_index(split['label_dir'], merged, merged.keys())
+
+def write_classes(base_dir, classes):
+    path = os.path.join(base_dir, cdy.CLASSES_TEXT_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        for class_name in classes:
+            f.write(f"{class_name}\n")
+    print(f"✅ 전체 CLASSES 리스트를 '{path}'에 저장했습니다. ({len(classes)}개)")
+
+def merge(count, link_mode=MERGE_LINK_MODE):
+    """
+    N개 샤드의 결과를 합칩니다. 클래스 목록은 스플릿별로 샤드 목록의 합집합(정렬)이고,
+    data.yaml은 Training 목록으로 만듭니다. 샤드 결과가 하나라도 없으면 아무것도 바꾸지 않고 False를 반환합니다.
+    """
+    if cst.OUTPUT_MODE != 'files':
+        print(f"❌ 병합은 OUTPUT_MODE = 'files' 샤드 결과만 지원합니다. (현재: '{cst.OUTPUT_MODE}')")
+        return False
+    shards = [sharding.Shard(index, count) for index in range(count)]
+    missing = [sharding.shard_dir(shard) for shard in shards
+               if not all(os.path.exists(os.path.join(sharding.shard_path(shard, split['base_dir']), cdy.CLASSES_TEXT_FILE))
+                          for split in SPLITS)]
+    if missing:
+        print(f"❌ 샤드 결과가 없습니다. 먼저 run_all.py --shard i/{count}를 실행하세요: {missing}")
+        return False
+
+    print(f"\n--- 샤드 {count}개 병합 시작 ---")
+    split_classes = {}
+    for split in SPLITS:
+        class_lists = [read_classes(os.path.join(sharding.shard_path(shard, split['base_dir']), cdy.CLASSES_TEXT_FILE))
+                       for shard in shards]
+        split_classes[split['name']] = merge_class_lists(class_lists)
+
+    train_classes = split_classes[SPLITS[0]['name']]
+    for split in SPLITS[1:]:
+        if split_classes[split['name']] != train_classes:
+            print(f"⚠️ [{split['name']}] 클래스 목록이 Training과 다릅니다. "
+                  f"(data.yaml은 Training 목록 기준, 샤드 실행 시 불일치 정리를 확인하세요)")
+
+    for split in SPLITS:
+        merge_split(split, shards, split_classes[split['name']], link_mode)
+        merge_path_indexes(split, shards)
+        write_classes(split['base_dir'], split_classes[split['name']])
+
+    cdy.write_data_yaml(train_classes)
+
+    # 샤드들이 같은 어노테이션 DB에 기록했으므로 병합된 전체 데이터셋의 통계/앵커 보고서를 만듭니다.
+    if dataset_stats.STATS_ENABLED and annotation_db.USE_ANNOTATION_DB:
+        dataset_stats.run({split['name']: split['label_dir'] for split in SPLITS}, train_classes, set(train_classes))
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='샤드별 실행 결과 병합')
+    parser.add_argument('--count', type=int, required=True, help='샤드 수 N (run_all.py --shard i/N의 N)')
+    parser.add_argument('--run-local', action='store_true',
+                        help='병합 전에 N개의 샤드를 이 머신에서 프로세스로 동시에 실행')
+    parser.add_argument('--link-mode', choices=cst.LINK_MODES, default=MERGE_LINK_MODE,
+                        help='샤드 이미지를 최종 폴더에 만드는 방식')
+    args = parser.parse_args()
+    if args.count < 1:
+        parser.error('--count는 1 이상이어야 합니다.')
+
+    start = time.perf_counter()
+    if args.run_local and not run_local_shards(args.count):
+        print("🚨 실패한 샤드가 있어 병합하지 않습니다.")
+        return False
+
+    ok = merge(args.count, args.link_mode)
+    if ok:
+        print(f"\n🎉 샤드 {args.count}개 병합 완료 ({time.perf_counter() - start:.1f}초)")
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
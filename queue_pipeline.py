@@ -0,0 +1,234 @@
+import queue
+import threading
+import time
+from typing import Callable, NamedTuple
+
+# --- [Configuration Section] ---
+# 읽기(디스크) -> 디코딩/리사이징/인코딩(CPU) -> 쓰기(디스크)처럼 성격이 다른 작업을 단계별 스레드로 나누고,
+# 단계 사이를 크기 제한 큐로 연결하여 디스크 I/O와 CPU 작업이 겹쳐서 실행되도록 합니다.
+# 큐가 가득 차면 앞 단계가 기다리므로(backpressure) 데이터셋 크기와 관계없이 메모리에 올라가는 항목 수가 제한됩니다.
+# (최대 항목 수 = 큐 크기 x (단계 수 + 1) + 전체 워커 수)
+
+# 1. 단계 사이 큐의 기본 크기 (항목 수)
+DEFAULT_QUEUE_SIZE = 32
+
+# 2. 큐 깊이 측정 간격 (초)
+QUEUE_SAMPLE_INTERVAL = 0.05
+
+# 큐에서 기다리는 동안 중단 요청을 확인하는 간격 (초)
+_POLL_INTERVAL = 0.1
+
+# 단계 종료 신호
+_DONE = object()
+
+class PipelineStage(NamedTuple):
+    """workers개의 스레드가 앞 큐에서 항목을 꺼내 func(item)의 결과를 다음 큐에 넣는 단계"""
+    name: str
+    func: Callable
+    workers: int = 1
+
+class StageError(NamedTuple):
+    """stage 단계의 func에서 예외가 난 항목. 이후 단계는 건너뛰고 그대로 결과로 전달됩니다."""
+    stage: str
+    item: object
+    error: Exception
+
+class _StageStats:
+    """단계 하나의 처리 수, 작업/대기 시간, 입력 큐 깊이 측정값"""
+
+    def __init__(self, stage):
+        self.name = stage.name
+        self.workers = max(1, stage.workers)
+        self.items = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.input_wait_time = 0.0
+        self.output_wait_time = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.depth_samples = 0
+        self._lock = threading.Lock()
+
+    def add(self, items, errors, busy_time, input_wait_time, output_wait_time):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy_time += busy_time
+            self.input_wait_time += input_wait_time
+            self.output_wait_time += output_wait_time
+
+    def sample_depth(self, depth):
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+        self.depth_samples += 1
+
+    def as_dict(self, wall_time):
+        capacity = self.workers * wall_time
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'errors': self.errors,
+            # 워커가 실제로 작업한 시간의 비율 (1에 가까우면 이 단계가 병목)
+            'utilization': round(self.busy_time / capacity, 3) if capacity > 0 else None,
+            'busy_time': round(self.busy_time, 4),
+            # 입력을 기다린 시간 (앞 단계가 느림) / 다음 큐가 가득 차서 기다린 시간 (뒤 단계가 느림)
+            'input_wait_time': round(self.input_wait_time, 4),
+            'output_wait_time': round(self.output_wait_time, 4),
+            'queue_depth_avg': round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0,
+            'queue_depth_max': self.depth_max,
+        }
+
+class PipelineStats:
+    """run_pipeline의 단계별 측정 결과"""
+
+    def __init__(self, stages, queue_size):
+        self.stages = [_StageStats(stage) for stage in stages]
+        self.queue_size = queue_size
+        self.wall_time = 0.0
+
+    def as_dict(self):
+        return {
+            'queue_size': self.queue_size,
+            'wall_time': round(self.wall_time, 4),
+            'bottleneck': self.bottleneck(),
+            'stages': {stats.name: stats.as_dict(self.wall_time) for stats in self.stages},
+        }
+
+    def bottleneck(self):
+        """워커 사용률이 가장 높은 단계 이름 (처리한 항목이 없으면 None)"""
+        busiest = max(self.stages, key=lambda stats: stats.busy_time / stats.workers, default=None)
+        return busiest.name if busiest is not None and busiest.items else None
+
+    def print_report(self):
+        print(f"--- 파이프라인 단계별 측정 (큐 크기 {self.queue_size}, {self.wall_time:.1f}초) ---")
+        print(f"  {'단계':<10} {'워커':>4} {'처리':>8} {'사용률':>7} {'입력대기':>9} {'출력대기':>9} {'큐 평균/최대':>12}")
+        for name, stats in self.as_dict()['stages'].items():
+            utilization = f"{stats['utilization'] * 100:.0f}%" if stats['utilization'] is not None else '-'
+            print(f"  {name:<10} {stats['workers']:>4} {stats['items']:>8} {utilization:>7} "
+                  f"{stats['input_wait_time']:>8.1f}s {stats['output_wait_time']:>8.1f}s "
+                  f"{stats['queue_depth_avg']:>7.1f}/{stats['queue_depth_max']:<4}")
+        if self.bottleneck() is not None:
+            print(f"📌 병목 추정 단계: {self.bottleneck()} (워커를 늘리면 전체 처리량이 가장 많이 오르는 단계)")
+
+def _get(q, stop):
+    """항목을 꺼냅니다. 기다리는 중 중단 요청이 오면 _DONE을 반환합니다."""
+    while True:
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                return _DONE
+
+def _put(q, item, stop):
+    """항목을 넣습니다. 큐가 가득 찬 동안 중단 요청이 오면 False를 반환합니다."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def run_pipeline(items, stages, on_result, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    items의 각 항목을 stages(PipelineStage 목록) 순서대로 처리하고, 마지막 단계의 결과마다
+    호출한 스레드에서 on_result(result)를 호출합니다. (결과 순서는 입력 순서와 다를 수 있음)
+    func에서 예외가 난 항목은 StageError로 on_result에 전달됩니다.
+    on_result나 items에서 예외가 나면 모든 단계를 멈추고 그 예외를 다시 발생시킵니다.
+    PipelineStats(단계별 사용률, 대기 시간, 큐 깊이)를 반환합니다.
+    """
+    stats = PipelineStats(stages, queue_size)
+    # queues[i]: i번째 단계의 입력 큐, queues[-1]: 결과 큐
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+    sampling_done = threading.Event()
+    feeder_errors = []
+    remaining_workers = [stage_stats.workers for stage_stats in stats.stages]
+    remaining_lock = threading.Lock()
+
+    def finish_worker(index):
+        # 단계의 마지막 워커가 끝나면 다음 단계의 워커 수만큼 종료 신호를 보냅니다.
+        with remaining_lock:
+            remaining_workers[index] -= 1
+            last = remaining_workers[index] == 0
+        if last:
+            next_workers = stats.stages[index + 1].workers if index + 1 < len(stages) else 1
+            for _ in range(next_workers):
+                _put(queues[index + 1], _DONE, stop)
+
+    def worker(index):
+        stage, stage_stats = stages[index], stats.stages[index]
+        input_queue, output_queue = queues[index], queues[index + 1]
+        items_done = errors = 0
+        busy_time = input_wait_time = output_wait_time = 0.0
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = _get(input_queue, stop)
+                work_start = time.perf_counter()
+                input_wait_time += work_start - wait_start
+                if item is _DONE:
+                    break
+                if not isinstance(item, StageError):
+                    try:
+                        item = stage.func(item)
+                    except Exception as e:
+                        item = StageError(stage.name, item, e)
+                        errors += 1
+                    items_done += 1
+                work_end = time.perf_counter()
+                busy_time += work_end - work_start
+                delivered = _put(output_queue, item, stop)
+                output_wait_time += time.perf_counter() - work_end
+                if not delivered:
+                    break
+        finally:
+            stage_stats.add(items_done, errors, busy_time, input_wait_time, output_wait_time)
+            finish_worker(index)
+
+    def feeder():
+        try:
+            for item in items:
+                if not _put(queues[0], item, stop):
+                    return
+        except BaseException as e:
+            feeder_errors.append(e)
+            stop.set()
+            return
+        for _ in range(stats.stages[0].workers if stages else 1):
+            _put(queues[0], _DONE, stop)
+
+    def sampler():
+        while not sampling_done.wait(QUEUE_SAMPLE_INTERVAL):
+            for stage_stats, input_queue in zip(stats.stages, queues):
+                stage_stats.sample_depth(input_queue.qsize())
+
+    threads = [threading.Thread(target=feeder, name='pipeline-feeder', daemon=True)]
+    for index, stage in enumerate(stages):
+        threads.extend(threading.Thread(target=worker, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                       for n in range(stats.stages[index].workers))
+    sampler_thread = threading.Thread(target=sampler, name='pipeline-sampler', daemon=True)
+
+    start_time = time.perf_counter()
+    sampler_thread.start()
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            result = _get(queues[-1], stop)
+            if result is _DONE:
+                break
+            on_result(result)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+        sampling_done.set()
+        sampler_thread.join()
+        stats.wall_time = time.perf_counter() - start_time
+
+    if feeder_errors:
+        raise feeder_errors[0]
+    return stats
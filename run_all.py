@@ -1,21 +1,49 @@
+import argparse
+import json
 import subprocess
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-# 실행할 스크립트 파일 목록
+import build_manifest
+import class_allowlist
+import create_data_yaml as cdy
+import sharding
+import stage_metrics
+
+# 실행할 스크립트 파일 목록 (--subprocess 모드에서 사용)
+# (XML 경로 수정은 trans_coco.py가 변환과 같은 파싱에서 함께 처리하므로 xml_path_set.py는 따로 실행하지 않습니다.)
 SCRIPTS = [
-    'xml_path_set.py',
     'trans_coco.py',
     'coco_setting_train.py',
     'create_data_yaml.py'
 ]
 
-def run_script(script_name):
+# 단계별 측정 결과를 모은 보고서 파일
+REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline_report.json')
+
+# 동시에 실행할 DAG 단계 수 (Training/Validation 스플릿을 동시에 처리)
+DAG_WORKERS = 2
+
+def run_script(script_name, metrics_path=None, profile=None, profile_stage=None, profile_dir=None):
     """지정된 Python 스크립트를 실행하고 출력을 CMD에 실시간으로 표시합니다."""
     print(f"\n========================================================")
     print(f"▶️ 스크립트 실행 시작: {script_name}")
     print(f"========================================================")
-    
+
+    # 스크립트 안의 각 단계가 측정 결과를 metrics_path에 저장하도록 환경 변수로 전달
+    env = dict(os.environ)
+    if metrics_path is not None:
+        env[stage_metrics.METRICS_FILE_ENV] = metrics_path
+    if profile is not None:
+        env[stage_metrics.PROFILE_ENV] = profile
+        env[stage_metrics.PROFILE_STAGE_ENV] = profile_stage or ''
+        env[stage_metrics.PROFILE_DIR_ENV] = profile_dir or '.'
+
     try:
         # subprocess.run을 사용하여 스크립트를 실행합니다.
         # stdout=sys.stdout, stderr=sys.stderr
@@ -25,35 +53,278 @@ def run_script(script_name):
             check=True,
             stdout=sys.stdout,
             stderr=sys.stderr,
-            text=True
+            text=True,
+            env=env
         )
-        
+
         print(f"\n✅ 스크립트 실행 성공: {script_name}")
         return True
-        
+
     except subprocess.CalledProcessError as e:
         print(f"\n❌ 오류 발생: {script_name}이(가) 비정상 종료되었습니다. (Exit Code: {e.returncode})")
         return False
-        
+
     except FileNotFoundError:
         print(f"\n❌ 오류 발생: {script_name} 파일을 찾을 수 없습니다. 경로를 확인해주세요.")
         return False
 
+def read_stage_metrics(metrics_path):
+    """스크립트가 저장한 단계별 측정 결과를 읽습니다. 없으면 빈 리스트를 반환합니다."""
+    if not os.path.exists(metrics_path):
+        return []
+    try:
+        with open(metrics_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ 측정 결과를 읽을 수 없습니다 ({metrics_path}): {e}")
+        return []
+
+def write_report(report, report_path):
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📊 단계별 측정 보고서: {report_path}")
+
+# --- [In-process 단계 DAG] ---
+
+class Stage:
+    """
+    DAG의 단계 하나. deps의 단계가 모두 성공하면 func(results)를 실행합니다.
+    results는 지금까지 끝난 단계 이름 -> 반환값 딕셔너리입니다.
+    """
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+def run_dag(stages, max_workers=DAG_WORKERS):
+    """
+    의존 관계가 풀린 단계를 스레드 풀에서 동시에 실행합니다. (서로 독립적인 스플릿은 병렬 진행)
+    한 단계라도 실패하면 새 단계는 시작하지 않고, 실행 중인 단계만 끝까지 기다린 뒤 중단합니다.
+    (단계 기록 리스트, 성공 여부)를 반환합니다.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"단계 '{stage.name}'의 의존 단계 '{dep}'가 없습니다.")
+
+    results = {}
+    records = []
+    pending = list(stages)
+    running = {}
+    failed = False
+    lock = threading.Lock()
+
+    def execute(stage):
+        print(f"\n▶️ 단계 시작: {stage.name}")
+        start = time.perf_counter()
+        # 진행 상황 출력에 단계 이름을 붙여 동시에 실행되는 단계의 출력이 섞이지 않도록 함
+        stage_metrics.set_stage_label(stage.name)
+        try:
+            value = stage.func(results)
+            status = 'ok'
+        except Exception as e:
+            value = None
+            status = 'failed'
+            print(f"\n❌ 단계 실패: {stage.name} -> {e!r}")
+        finally:
+            stage_metrics.set_stage_label(None)
+        record = {'stage': stage.name, 'status': status, 'wall_time': round(time.perf_counter() - start, 4)}
+        with lock:
+            if status == 'ok':
+                results[stage.name] = value
+            records.append(record)
+        if status == 'ok':
+            print(f"\n✅ 단계 완료: {stage.name} ({record['wall_time']:.1f}초)")
+        return status
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        while pending or running:
+            # 실패가 없으면 의존 단계가 모두 끝난 단계를 시작
+            if not failed:
+                for stage in list(pending):
+                    if all(dep in results for dep in stage.deps):
+                        pending.remove(stage)
+                        running[executor.submit(execute, stage)] = stage
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                if future.result() != 'ok':
+                    failed = True
+
+    for stage in pending:
+        records.append({'stage': stage.name, 'status': 'not_run', 'wall_time': 0.0})
+    return records, not failed and not pending
+
+def build_pipeline(manifest, shard=None, coco=False):
+    """
+    경로 수정+변환(한 번의 파싱) -> 쌍 매칭/생성(리사이징 포함) -> data.yaml 순서의 단계 DAG를 만듭니다.
+    클래스 확인/불일치 정리는 두 스플릿의 클래스 목록이 모두 필요하므로 공통 단계이고,
+    나머지는 스플릿별 단계라 Training과 Validation이 동시에 진행됩니다.
+    shard(sharding.Shard)가 주어지면 그 샤드의 클래스 폴더만 처리하여 출력을 샤드 폴더에 만들고,
+    data.yaml은 만들지 않습니다. (merge_shards.py가 샤드를 합친 뒤 생성)
+    coco가 True이면 스플릿마다 COCO instances JSON 내보내기(coco_export) 단계를 추가합니다.
+    dataset_stats.STATS_ENABLED이면 data.yaml 옆에 데이터셋 통계/앵커 보고서를 만드는 단계를 추가합니다.
+    """
+    # 무거운 모듈은 in-process 모드에서만 불러옵니다.
+    import coco_setting_train as cst
+    import trans_coco as tc
+    import xml_path_set as xps
+
+    # 원본(label_dir, image_dir)은 그대로 읽고, 출력 경로만 샤드 폴더 아래로 바꿉니다.
+    out = lambda path: sharding.shard_path(shard, path)
+    splits = [
+        {'name': 'train', 'base_dir': out(tc.BASE_DIR), 'label_dir': tc.LABEL_ROOT_DIR,
+         'label_coco_dir': out(tc.OUTPUT_ROOT_DIR), 'path_prefix': xps.RELATIVE_PATH_PREFIX, 'image_dir': cst.SOURCE_DIR,
+         'images_out': out(cst.TARGET_DIR), 'labels_out': out(cst.OUTPUT_ROOT_DIR), 'txt': 'train.txt'},
+        {'name': 'valid', 'base_dir': out(tc.V_BASE_DIR), 'label_dir': tc.V_LABEL_ROOT_DIR,
+         'label_coco_dir': out(tc.V_OUTPUT_ROOT_DIR), 'path_prefix': xps.V_RELATIVE_PATH_PREFIX, 'image_dir': cst.V_SOURCE_DIR,
+         'images_out': out(cst.V_TARGET_DIR), 'labels_out': out(cst.V_OUTPUT_ROOT_DIR), 'txt': 'valid.txt'},
+    ]
+    stages = []
+    for split in splits:
+        stages.append(Stage(f"classes:{split['name']}",
+                            lambda results, sp=split: tc.find_classes_from_folder_name(sp['label_dir'], shard)))
+
+    # 두 스플릿에 모두 있는 클래스만 허용 목록으로 한 번 계산합니다. (data.yaml과 YOLO 인덱스의 기준)
+    # 불일치 클래스 폴더는 삭제하지 않고, 이후 단계가 읽지 않습니다. (정리는 class_allowlist.py로 따로)
+    stages.append(Stage('reconcile', lambda results: class_allowlist.reconcile(
+        results['classes:train'], results['classes:valid'], class_allowlist.allowlist_path(shard)),
+        deps=[f"classes:{split['name']}" for split in splits]))
+
+    for split in splits:
+        stages.append(Stage(
+            f"label:{split['name']}",
+            lambda results, sp=split: tc.run(sp['label_dir'], sp['label_coco_dir'], sp['base_dir'],
+                                             path_prefix=sp['path_prefix'], manifest=manifest, shard=shard,
+                                             allowed=set(results['reconcile'])),
+            deps=['reconcile']))
+        stages.append(Stage(
+            f"materialize:{split['name']}",
+            lambda results, sp=split: cst.run(sp['image_dir'], sp['images_out'], sp['label_coco_dir'],
+                                              sp['labels_out'], sp['txt'], manifest, shard, set(results['reconcile'])),
+            deps=['reconcile', f"label:{split['name']}"]))
+
+    if shard is not None:
+        return stages
+
+    if coco:
+        import coco_export
+        import tar_shards
+
+        # tar 출력이면 images/<split> 폴더 대신 tar 샤드 index.tsv에 저장된 샘플로 이미지 확인
+        tar_mode = cst.OUTPUT_MODE == 'tar'
+        for split in splits:
+            stages.append(Stage(
+                f"coco:{split['name']}",
+                lambda results, sp=split: coco_export.export_split(
+                    sp['label_dir'], results['reconcile'], coco_export.output_path_for(sp['name']),
+                    None if tar_mode else sp['images_out'], scale_to_target=coco_export.SCALE_TO_TARGET_SIZE,
+                    tar_dir=tar_shards.split_dir_for(sp['name']) if tar_mode else None,
+                    allowed=set(results['reconcile'])),
+                deps=['reconcile', f"materialize:{split['name']}"]))
+
+    stages.append(Stage('yaml', lambda results: cdy.write_data_yaml(results['reconcile']),
+                        deps=['reconcile'] + [f"materialize:{split['name']}" for split in splits]))
+
+    # 변환 단계가 채운 어노테이션 DB로 통계/앵커 보고서를 만듭니다. (XML을 다시 파싱하지 않음)
+    import annotation_db
+    import dataset_stats
+    if dataset_stats.STATS_ENABLED and annotation_db.USE_ANNOTATION_DB:
+        stages.append(Stage('stats', lambda results: dataset_stats.run(
+            {split['name']: split['label_dir'] for split in splits}, results['reconcile'], set(results['reconcile'])),
+            deps=['reconcile'] + [f"label:{split['name']}" for split in splits]))
+    return stages
+
+def run_subprocess_scripts(report, report_dir, args):
+    """기존 방식: 스크립트를 하나씩 별도 프로세스로 실행합니다."""
+    metrics_dir = tempfile.mkdtemp(prefix='pipeline_metrics_')
+
+    for script in SCRIPTS:
+        metrics_path = os.path.join(metrics_dir, script + '.json')
+        start = time.perf_counter()
+        ok = run_script(script, metrics_path, args.profile, args.profile_stage, report_dir)
+        report['scripts'].append({
+            'script': script,
+            'status': 'ok' if ok else 'failed',
+            'wall_time': round(time.perf_counter() - start, 4),
+            'stages': read_stage_metrics(metrics_path),
+        })
+        if not ok:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+            return False, script
+
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    return True, None
+
 def main():
-    """모든 스크립트를 순차적으로 실행하는 메인 함수."""
-    
+    """전체 파이프라인을 실행하는 메인 함수. 기본은 한 프로세스 안에서 단계 DAG를 실행합니다."""
+    parser = argparse.ArgumentParser(description='전체 파이프라인 실행')
+    parser.add_argument('--report', default=REPORT_PATH, help='단계별 측정 보고서(JSON) 경로')
+    parser.add_argument('--profile', choices=('cprofile', 'tracemalloc'), default=None,
+                        help='단계를 cProfile 또는 tracemalloc으로 감싸 보고서 옆에 저장')
+    parser.add_argument('--profile-stage', default='',
+                        help='이름에 이 문자열이 포함된 단계만 프로파일 (예: convert, image)')
+    parser.add_argument('--workers', type=int, default=DAG_WORKERS,
+                        help='동시에 실행할 단계 수 (1이면 스플릿을 순서대로 처리)')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='기존처럼 스크립트를 하나씩 별도 프로세스로 실행')
+    parser.add_argument('--coco', action='store_true',
+                        help='COCO instances JSON(annotations/instances_<split>.json)도 함께 생성')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+
     print(f"현재 작업 디렉터리: {os.getcwd()}")
-    
-    for script in SCRIPTS:
-        if not run_script(script):
-            print("\n========================================================")
-            print(f"🚨 파이프라인 중단: {script} 실행 중 오류가 발생하여 다음 스크립트는 실행되지 않습니다.")
-            print("========================================================")
-            break
+    if args.shard is not None:
+        if args.subprocess:
+            parser.error('--shard는 in-process 모드에서만 사용할 수 있습니다.')
+        print(f"샤드: {args.shard.index}/{args.shard.count} -> {sharding.shard_dir(args.shard)}")
+        # 샤드마다 보고서를 따로 저장 (여러 샤드를 동시에 실행해도 겹치지 않도록)
+        if args.report == REPORT_PATH:
+            args.report = os.path.join(sharding.shard_dir(args.shard), 'pipeline_report.json')
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+
+    report_dir = os.path.dirname(os.path.abspath(args.report))
+    report = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'profile': args.profile,
+        'mode': 'subprocess' if args.subprocess else 'in-process',
+        'shard': None if args.shard is None else f"{args.shard.index}/{args.shard.count}",
+        'scripts': [],
+    }
+
+    if args.subprocess:
+        ok, failed_name = run_subprocess_scripts(report, report_dir, args)
+    else:
+        workers = args.workers
+        if args.profile is not None:
+            os.environ[stage_metrics.PROFILE_ENV] = args.profile
+            os.environ[stage_metrics.PROFILE_STAGE_ENV] = args.profile_stage
+            os.environ[stage_metrics.PROFILE_DIR_ENV] = report_dir
+            # 프로파일러는 프로세스 전역 상태를 사용하므로 단계를 하나씩 실행
+            workers = 1
+
+        manifest = build_manifest.BuildManifest(sharding.manifest_path(args.shard))
+        records, ok = run_dag(build_pipeline(manifest, args.shard, args.coco), workers)
+        report['stages'] = records
+        report['metrics'] = stage_metrics.COLLECTED
+        failed_name = next((r['stage'] for r in records if r['status'] == 'failed'), None)
+
+    if not ok:
+        print("\n========================================================")
+        print(f"🚨 파이프라인 중단: {failed_name} 실행 중 오류가 발생하여 다음 단계는 실행되지 않습니다.")
+        print("========================================================")
     else:
         print("\n========================================================")
-        print("🎉 모든 스크립트가 성공적으로 순차 실행 완료되었습니다.")
+        print("🎉 모든 단계가 성공적으로 실행 완료되었습니다.")
         print("========================================================")
 
+    write_report(report, args.report)
+    return ok
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,70 @@
+import os
+import zlib
+from typing import NamedTuple
+
+import class_allowlist
+
+# --- [Configuration Section] ---
+# 여러 머신(또는 프로세스)이 클래스 폴더 단위로 작업을 나누어 처리할 때 사용합니다.
+# 각 샤드는 SHARD_ROOT_DIR/shard_<i>_of_<N>/ 아래에 데이터셋과 같은 구조로 결과를 만들고,
+# merge_shards.py가 이를 하나로 합칩니다.
+
+# 1. 샤드별 결과를 저장할 최상위 폴더
+SHARD_ROOT_DIR = './shards'
+
+class Shard(NamedTuple):
+    """N개 중 index번째 샤드 (index는 0부터 시작)"""
+    index: int
+    count: int
+
+def parse_shard(text):
+    """
+    '--shard i/N' 형식의 문자열을 Shard로 바꿉니다. 비어 있으면 None(샤드 없이 전체 처리)을 반환합니다.
+    """
+    if not text:
+        return None
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"샤드 형식이 올바르지 않습니다: '{text}' (예: 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"샤드 번호는 0 이상 {count - 1} 이하여야 합니다: '{text}'")
+    return Shard(index, count)
+
+def add_shard_argument(parser):
+    parser.add_argument('--shard', type=parse_shard, default=None, metavar='i/N',
+                        help='클래스 폴더를 N개로 나눈 것 중 i번째(0부터)만 처리하고 결과를 샤드 폴더에 저장')
+
+def shard_of(class_folder, count):
+    """
+    'ID_클래스이름' 폴더에서 ID를 뺀 클래스 이름의 CRC32로 샤드 번호를 정합니다. (머신/실행과 관계없이 항상 같은 결과)
+    ID가 달라도 클래스 이름이 같은 폴더(Training/Validation 포함)는 모두 같은 샤드에 들어가므로,
+    샤드마다 계산하는 허용 목록(class_allowlist)에서 클래스가 한쪽 스플릿에만 있는 것으로 빠지지 않습니다.
+    """
+    return zlib.crc32(class_allowlist.class_name_of(class_folder).encode('utf-8')) % count
+
+def contains(shard, class_folder):
+    """shard가 None이면 항상 True, 아니면 class_folder가 이 샤드에 속하는지 반환합니다."""
+    return shard is None or shard_of(class_folder, shard.count) == shard.index
+
+def shard_dir(shard, root_dir=SHARD_ROOT_DIR):
+    return os.path.join(root_dir, f"shard_{shard.index}_of_{shard.count}")
+
+def manifest_path(shard):
+    """샤드마다 따로 쓰는 매니페스트 경로 (동시에 실행되는 샤드가 같은 파일을 덮어쓰지 않도록)"""
+    import build_manifest
+
+    if shard is None:
+        return build_manifest.MANIFEST_PATH
+    return os.path.join(shard_dir(shard), 'build_manifest.json')
+
+def shard_path(shard, path, root_dir=SHARD_ROOT_DIR):
+    """
+    출력 경로를 샤드 폴더 아래의 같은 상대 경로로 바꿉니다. shard가 None이면 그대로 반환합니다.
+    예: './labels/train' -> './shards/shard_0_of_4/labels/train'
+    """
+    if shard is None:
+        return path
+    # 절대 경로도 샤드 폴더 아래에 만들어지도록 드라이브/앞쪽 구분자를 제거
+    relative_path = os.path.splitdrive(os.path.normpath(path))[1].lstrip('\\/')
+    return os.path.join(shard_dir(shard, root_dir), relative_path)
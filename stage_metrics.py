@@ -0,0 +1,221 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+# --- [Configuration Section] ---
+# run_all.py가 아래 환경 변수로 각 스크립트에 측정/프로파일 설정을 전달합니다.
+
+# 1. 단계별 측정 결과(JSON)를 저장할 파일 경로 (설정되지 않으면 저장하지 않음)
+METRICS_FILE_ENV = 'PIPELINE_METRICS_FILE'
+
+# 2. 프로파일러 종류 ('cprofile' 또는 'tracemalloc', 설정되지 않으면 사용 안 함)
+PROFILE_ENV = 'PIPELINE_PROFILE'
+
+# 3. 프로파일할 단계 이름 필터 (이름에 이 문자열이 포함된 단계만, 비어 있으면 전체)
+PROFILE_STAGE_ENV = 'PIPELINE_PROFILE_STAGE'
+
+# 4. 프로파일 결과를 저장할 폴더
+PROFILE_DIR_ENV = 'PIPELINE_PROFILE_DIR'
+
+# 5. 진행 상황 출력 최소 간격 (초)
+PROGRESS_INTERVAL = 1.0
+
+# 이 프로세스에서 끝난 단계들의 측정 결과
+COLLECTED = []
+
+# 진행 상황 출력은 프린터가 여러 개여도 한 줄씩 나가도록 이 잠금으로 직렬화합니다.
+_print_lock = threading.Lock()
+
+# run_all의 DAG 단계처럼 여러 단계가 동시에 실행될 때, 스레드마다 현재 단계 이름을 둡니다.
+_thread_state = threading.local()
+
+def set_stage_label(label):
+    """현재 스레드에서 실행 중인 단계 이름을 설정합니다. (None이면 해제)"""
+    _thread_state.label = label
+
+def stage_label():
+    """현재 스레드의 단계 이름을 반환합니다. (설정되지 않았으면 None)"""
+    return getattr(_thread_state, 'label', None)
+
+def peak_rss_bytes():
+    """
+    현재 프로세스가 시작된 뒤의 최대 메모리 사용량(RSS, 바이트)을 반환합니다. 확인할 수 없으면 None을 반환합니다.
+    (ru_maxrss는 프로세스 전체의 최고치이므로 단계별 값이 아닙니다. 단계별로는 StageMetrics의 증가량을 사용)
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux는 KB, macOS는 바이트 단위
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss)
+    except ImportError:
+        return None
+
+def _safe_name(name):
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+
+class ProgressPrinter:
+    """
+    '\\r N ing~~' 형식의 진행 상황을 PROGRESS_INTERVAL초에 한 번만 출력합니다.
+    (파일마다 출력하면 로그 파일로 리다이렉트할 때 그 자체로 느려지기 때문)
+    여러 스레드에서 update를 호출해도 됩니다.
+    만든 스레드에 단계 이름(set_stage_label)이 있으면, 동시에 진행되는 다른 단계의 출력과 섞이지 않도록
+    '\\r'로 덮어쓰지 않고 '[단계 이름] N ing~~' 형식의 한 줄씩 출력합니다.
+    """
+
+    def __init__(self, label='ing', total=None, interval=PROGRESS_INTERVAL):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self._last = 0.0
+        self._lock = threading.Lock()
+        self.stage = stage_label()
+
+    def update(self, n=1):
+        with self._lock:
+            self.count += n
+            now = time.perf_counter()
+            if now - self._last >= self.interval:
+                self._last = now
+                self._print()
+
+    def _print(self):
+        count = f'{self.count}' if self.total is None else f'{self.count}/{self.total}'
+        with _print_lock:
+            if self.stage is None:
+                print(f'\r {count} {self.label}', end='', flush=True)
+            else:
+                print(f'[{self.stage}] {count} {self.label}', flush=True)
+
+    def close(self):
+        """마지막 상태를 한 번 출력합니다."""
+        with self._lock:
+            self._print()
+            if self.stage is None:
+                print()
+
+class StageMetrics:
+    """
+    단계 하나의 실행 시간, 처리량(files/s), 읽기/쓰기 바이트, 최대 RSS, 오류/건너뜀 수를 측정합니다.
+    with 문으로 사용하며, 끝나면 COLLECTED에 결과를 추가합니다. add는 여러 스레드에서 호출해도 됩니다.
+    최대 RSS는 프로세스 전체의 최고치(process_peak_rss_bytes)와, 이 단계 동안 그 최고치가 늘어난 양
+    (peak_rss_growth_bytes)을 함께 기록합니다. 같은 프로세스에서 앞 단계가 이미 더 많이 썼다면 증가량은 0입니다.
+    PIPELINE_PROFILE 환경 변수가 설정되어 있으면 단계를 cProfile 또는 tracemalloc으로 감쌉니다.
+
+    예:
+        with StageMetrics('convert:./Training/label') as metrics:
+            ...
+            metrics.add(files=1, bytes_read=size)
+    """
+
+    def __init__(self, name, profile=None, profile_dir=None):
+        self.name = name
+        self.files = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self.skipped = 0
+        self.extra = {}
+        self.profile = profile if profile is not None else os.environ.get(PROFILE_ENV)
+        self.profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV) or '.'
+        stage_filter = os.environ.get(PROFILE_STAGE_ENV, '')
+        if stage_filter and stage_filter not in name:
+            self.profile = None
+        self._profiler = None
+        self._start = None
+        self._start_peak_rss = None
+        self._lock = threading.Lock()
+        self.result = None
+
+    def add(self, files=0, bytes_read=0, bytes_written=0, errors=0, skipped=0):
+        with self._lock:
+            self.files += files
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+            self.errors += errors
+            self.skipped += skipped
+
+    def __enter__(self):
+        if self.profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == 'tracemalloc':
+            import tracemalloc
+            tracemalloc.start(25)
+        self._start_peak_rss = peak_rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_time = time.perf_counter() - self._start
+        profile_path = self._stop_profiler()
+        peak_rss = peak_rss_bytes()
+
+        self.result = {
+            'stage': self.name,
+            'status': 'ok' if exc_type is None else 'failed',
+            'wall_time': round(wall_time, 4),
+            'files': self.files,
+            'files_per_sec': round(self.files / wall_time, 1) if wall_time > 0 else None,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'process_peak_rss_bytes': peak_rss,
+            'peak_rss_growth_bytes': (peak_rss - self._start_peak_rss
+                                      if peak_rss is not None and self._start_peak_rss is not None else None),
+            'errors': self.errors,
+            'skipped': self.skipped,
+        }
+        if profile_path is not None:
+            self.result['profile'] = profile_path
+        self.result.update(self.extra)
+        COLLECTED.append(self.result)
+        return False
+
+    def _stop_profiler(self):
+        if self.profile not in ('cprofile', 'tracemalloc'):
+            return None
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, _safe_name(self.name))
+
+        if self.profile == 'cprofile':
+            self._profiler.disable()
+            path = base_path + '.prof'
+            self._profiler.dump_stats(path)
+            return path
+
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = base_path + '.tracemalloc.txt'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"current={current} peak={peak}\n")
+            for stat in snapshot.statistics('lineno')[:30]:
+                f.write(f"{stat}\n")
+        self.extra['traced_peak_bytes'] = peak
+        return path
+
+def write_collected(path=None):
+    """
+    COLLECTED를 JSON 파일로 저장합니다. path가 없으면 PIPELINE_METRICS_FILE 환경 변수 경로를 사용합니다.
+    """
+    path = path or os.environ.get(METRICS_FILE_ENV)
+    if not path:
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(COLLECTED, f, ensure_ascii=False, indent=2)
+
+# run_all.py가 측정 파일 경로를 넘긴 경우, 스크립트가 (오류로라도) 끝날 때 자동 저장
+if os.environ.get(METRICS_FILE_ENV):
+    atexit.register(write_collected)
@@ -0,0 +1,164 @@
+import argparse
+import io
+import os
+import shutil
+import tarfile
+
+# --- [Configuration Section] ---
+# 이미지와 YOLO 라벨을 개별 파일 대신 크기 제한이 있는 tar 샤드(WebDataset 형식)로 저장합니다.
+# 한 샘플은 같은 stem의 멤버들('<stem>.jpg', '<stem>.txt')이며 샤드 안에서 연속으로 저장됩니다.
+#
+# <TAR_OUTPUT_DIR>/<split>/
+#   shard-000000.tar, shard-000001.tar, ...
+#   index.tsv : stem <TAB> 샤드 파일 <TAB> 멤버 이름 <TAB> 데이터 위치(바이트) <TAB> 크기
+#               (tar를 처음부터 읽지 않고 seek 한 번으로 멤버를 읽을 수 있음)
+
+# 1. tar 샤드를 저장할 폴더 (스플릿별 하위 폴더)
+TAR_OUTPUT_DIR = './tar_shards'
+
+# 2. 샤드 하나의 최대 크기 (바이트). 샘플 하나가 이보다 크면 그 샘플만 들어간 샤드가 됩니다.
+TAR_SHARD_MAX_BYTES = 1 << 30
+
+# 3. 샤드 하나의 최대 샘플 수 (0이면 크기로만 나눔)
+TAR_SHARD_MAX_SAMPLES = 10000
+
+TAR_INDEX_FILENAME = 'index.tsv'
+TAR_SHARD_PATTERN = 'shard-{:06d}.tar'
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+
+def _padded(size):
+    return (size + BLOCK_SIZE - 1) // BLOCK_SIZE * BLOCK_SIZE
+
+def split_dir_for(split_name, root_dir=TAR_OUTPUT_DIR):
+    return os.path.join(root_dir, split_name)
+
+class TarShardWriter:
+    """
+    샘플을 순서대로 tar 샤드에 쓰고, 크기/샘플 수 제한을 넘으면 다음 샤드로 넘어갑니다.
+    임시 폴더에 모두 쓴 뒤 기존 출력 폴더와 교체하므로, 중간에 실패하면 이전 샤드가 그대로 남습니다.
+
+    예:
+        with TarShardWriter('./tar_shards/train') as writer:
+            writer.add_sample('10060_0_m_1', [('jpg', image_bytes), ('txt', label_bytes)])
+    """
+
+    def __init__(self, output_dir, max_bytes=TAR_SHARD_MAX_BYTES, max_samples=TAR_SHARD_MAX_SAMPLES):
+        self.output_dir = output_dir
+        self.max_bytes = max_bytes
+        self.max_samples = max_samples
+        self.shard_names = []
+        self.sample_count = 0
+        self.bytes_written = 0
+        self._tmp_dir = output_dir.rstrip('\\/') + '.tmp'
+        self._tar = None
+        self._shard_samples = 0
+        self._index = None
+
+    def __enter__(self):
+        if os.path.exists(self._tmp_dir):
+            shutil.rmtree(self._tmp_dir)
+        os.makedirs(self._tmp_dir)
+        self._index = open(os.path.join(self._tmp_dir, TAR_INDEX_FILENAME), 'w', encoding='utf-8')
+        return self
+
+    def _next_shard(self):
+        self._close_shard()
+        shard_name = TAR_SHARD_PATTERN.format(len(self.shard_names))
+        self.shard_names.append(shard_name)
+        self._tar = tarfile.open(os.path.join(self._tmp_dir, shard_name), 'w', format=tarfile.USTAR_FORMAT)
+        self._shard_samples = 0
+
+    def _close_shard(self):
+        if self._tar is not None:
+            self._tar.close()
+            self.bytes_written += os.path.getsize(os.path.join(self._tmp_dir, self.shard_names[-1]))
+            self._tar = None
+
+    def add_sample(self, stem, members, mtime=0):
+        """
+        members: [(확장자, 바이트)] 리스트. '<stem>.<확장자>' 이름으로 현재 샤드에 이어서 씁니다.
+        """
+        sample_bytes = sum(BLOCK_SIZE + _padded(len(data)) for _, data in members)
+        if (self._tar is None
+                or (self._shard_samples > 0 and self._tar.offset + sample_bytes > self.max_bytes)
+                or (self.max_samples and self._shard_samples >= self.max_samples)):
+            self._next_shard()
+
+        shard_name = self.shard_names[-1]
+        for ext, data in members:
+            info = tarfile.TarInfo(f"{stem}.{ext}")
+            info.size = len(data)
+            info.mtime = int(mtime)
+            self._tar.addfile(info, io.BytesIO(data))
+            # addfile 후 offset은 패딩된 데이터 끝이므로 데이터 시작 위치를 역산
+            data_offset = self._tar.offset - _padded(len(data))
+            self._index.write(f"{stem}\t{shard_name}\t{info.name}\t{data_offset}\t{len(data)}\n")
+        self._shard_samples += 1
+        self.sample_count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._close_shard()
+        self._index.close()
+        if exc_type is not None:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+            return False
+        if os.path.exists(self.output_dir):
+            shutil.rmtree(self.output_dir)
+        os.replace(self._tmp_dir, self.output_dir)
+        return False
+
+def load_index(output_dir):
+    """
+    index.tsv를 읽어 'stem -> {멤버 이름: (샤드 파일, 데이터 위치, 크기)}' 딕셔너리를 반환합니다.
+    """
+    index = {}
+    with open(os.path.join(output_dir, TAR_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+        for line in f:
+            stem, shard_name, member, offset, size = line.rstrip('\n').split('\t')
+            index.setdefault(stem, {})[member] = (shard_name, int(offset), int(size))
+    return index
+
+def read_member(output_dir, location):
+    """load_index의 (샤드 파일, 데이터 위치, 크기)로 tar를 처음부터 읽지 않고 멤버 내용을 바로 읽습니다."""
+    shard_name, offset, size = location
+    with open(os.path.join(output_dir, shard_name), 'rb') as f:
+        f.seek(offset)
+        return f.read(size)
+
+def shard_paths(output_dir):
+    """출력 폴더의 샤드 파일 경로 목록 (index.tsv에 나오는 순서)"""
+    names = []
+    with open(os.path.join(output_dir, TAR_INDEX_FILENAME), 'r', encoding='utf-8') as f:
+        for line in f:
+            shard_name = line.split('\t', 2)[1]
+            if not names or names[-1] != shard_name:
+                names.append(shard_name)
+    return [os.path.join(output_dir, name) for name in names]
+
+def write_shard_list(output_dir, output_path):
+    """
+    train.txt/valid.txt 대신 샤드 경로 목록을 한 줄에 하나씩 씁니다. (WebDataset 로더에 그대로 넘길 수 있는 형식)
+    """
+    paths = shard_paths(output_dir)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for path in paths:
+            f.write(f"./{os.path.relpath(path).replace(os.sep, '/')}\n")
+    print(f"✅ 샤드 목록 파일 생성 완료: {output_path} (샤드 {len(paths)}개)")
+    return paths
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='tar 샤드 정보 확인 / stem으로 샘플 꺼내기')
+    parser.add_argument('split', choices=('train', 'valid'), help='스플릿 이름')
+    parser.add_argument('--output-dir', default=TAR_OUTPUT_DIR, help='tar 샤드 폴더')
+    parser.add_argument('--get', metavar='STEM', default=None, help='이 stem의 멤버를 현재 폴더에 파일로 꺼냄')
+    args = parser.parse_args()
+
+    split_dir = split_dir_for(args.split, args.output_dir)
+    tar_index = load_index(split_dir)
+    print(f"📦 {split_dir}: 샤드 {len(shard_paths(split_dir))}개, 샘플 {len(tar_index)}개")
+    if args.get:
+        for member, location in sorted(tar_index[args.get].items()):
+            with open(member, 'wb') as out_file:
+                out_file.write(read_member(split_dir, location))
+            print(f"✅ {member} ({location[0]}, {location[2]} bytes)")
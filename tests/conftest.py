@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# 스크립트들이 저장소 최상위에 있으므로 테스트에서 바로 import할 수 있도록 경로에 추가합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import annotation_db
+import dataset_inventory
+
+@pytest.fixture(autouse=True)
+def isolated_inventory_cache(tmp_path, monkeypatch):
+    """
+    저장소의 inventory_cache.json, annotation_db.sqlite3를 건드리지 않도록 테스트마다 임시 캐시/DB를 사용합니다.
+    """
+    monkeypatch.setattr(dataset_inventory, 'INVENTORY_CACHE_PATH', str(tmp_path / 'inventory_cache.json'))
+    monkeypatch.setattr(dataset_inventory, '_cache', None)
+    monkeypatch.setattr(annotation_db, 'ANNOTATION_DB_PATH', str(tmp_path / 'annotation_db.sqlite3'))
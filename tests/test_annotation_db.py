@@ -0,0 +1,104 @@
+import os
+import random
+import threading
+
+import annotation_db
+import make_dummy_dataset
+import voc_parser
+
+def make_label_dir(tmp_path, num_files=24):
+    make_dummy_dataset.generate_dataset(str(tmp_path / 'data'), num_files=num_files, num_classes=3, objects_per_file=3,
+                                        missing_pair_ratio=0.0, wrapped_ratio=0.5, write_images=False)
+    return str(tmp_path / 'data' / 'Training' / 'label')
+
+def xml_files(label_dir):
+    return sorted(os.path.join(dir_path, name) for dir_path, _, names in os.walk(label_dir)
+                  for name in names if name.endswith('.xml'))
+
+def parsed(path):
+    """DB 레코드와 비교할 수 있도록 절대 경로로 파싱한 레코드"""
+    return voc_parser.load_annotation(os.path.abspath(path), 'etree')
+
+def rewrite(path, num_objects, seed):
+    xml = make_dummy_dataset.make_xml(os.path.basename(path)[:-4] + '.jpg', '상품0000', (1024, 768), num_objects,
+                                      random.Random(seed), wrapped=False)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(xml)
+
+def test_update_is_incremental_and_matches_xml(tmp_path):
+    label_dir = make_label_dir(tmp_path)
+    paths = xml_files(label_dir)
+    with annotation_db.AnnotationDB(str(tmp_path / 'a.sqlite3')) as db:
+        # 여러 묶음을 워커 프로세스에서 파싱
+        assert db.update(label_dir, workers=2, chunk_size=5) == (len(paths), 0, 0)
+        assert list(db.iter_annotations(label_dir)) == [parsed(path) for path in paths]
+        assert db.update(label_dir, workers=1) == (0, 0, 0)
+
+        # 바뀐 파일만 다시 파싱하고, 이전 객체 기록은 교체 (중복으로 쌓이지 않음)
+        rewrite(paths[0], 7, seed=1)
+        assert db.stale_paths(label_dir, paths) == [paths[0]]
+        assert db.update(label_dir, workers=1) == (1, 0, 0)
+        assert list(db.iter_annotations(label_dir))[0] == parsed(paths[0])
+        assert len(parsed(paths[0]).objects) == 7
+        assert sum(count for _, _, count in db.class_counts(label_dir)) == \
+            sum(len(parsed(path).objects) for path in paths)
+
+        # 사라진 XML의 기록은 지움
+        os.remove(paths[1])
+        assert db.update(label_dir, workers=1) == (0, 0, 1)
+        assert [annotation.xml_path for annotation in db.iter_annotations(label_dir)] == \
+            [os.path.abspath(path) for path in paths if path != paths[1]]
+
+def test_upsert_stale_and_prune(tmp_path):
+    label_dir = make_label_dir(tmp_path, num_files=6)
+    paths = xml_files(label_dir)
+    with annotation_db.AnnotationDB(str(tmp_path / 'a.sqlite3')) as db:
+        assert db.stale_paths(label_dir, paths) == paths
+        db.upsert(label_dir, [parsed(path) for path in paths[:4]])
+        assert db.stale_paths(label_dir, paths) == paths[4:]
+        db.upsert(label_dir, [parsed(paths[0])])
+        assert len(list(db.iter_annotations(label_dir))) == 4
+
+        # 루트 기준 클래스 폴더, 클래스별 파일 목록
+        assert db.class_folders(label_dir) == sorted({os.path.basename(os.path.dirname(path)) for path in paths[:4]})
+        class_name = parsed(paths[0]).objects[0].name
+        assert os.path.abspath(paths[0]) in db.files_for_class(class_name, label_dir)
+
+        assert db.prune(label_dir, paths[1:]) == 1
+        assert db.stale_paths(label_dir, paths) == [paths[0]] + paths[4:]
+        # 다른 root_dir의 기록은 건드리지 않음
+        assert db.prune(str(tmp_path / 'other'), []) == 0
+
+def test_update_with_allowlist_skips_and_keeps_excluded(tmp_path):
+    label_dir = make_label_dir(tmp_path, num_files=9)
+    with annotation_db.AnnotationDB(str(tmp_path / 'a.sqlite3')) as db:
+        folders = sorted(os.listdir(label_dir))
+        allowed = {folder.split('_', 1)[1] for folder in folders[:2]}
+        parsed_count, _, _ = db.update(label_dir, workers=1, allowed=allowed)
+        assert parsed_count == 6
+        assert db.class_folders(label_dir) == folders[:2]
+
+        # 허용 목록 없이 갱신하면 나머지만 파싱하고, 허용 목록으로 갱신해도 제외된 기록을 지우지 않음
+        assert db.update(label_dir, workers=1)[0] == 3
+        assert db.update(label_dir, workers=1, allowed=allowed) == (0, 0, 0)
+        assert db.class_folders(label_dir) == folders
+
+def test_concurrent_first_open(tmp_path):
+    # run_all의 label:train / label:valid처럼 여러 스레드가 새 DB를 동시에 처음 열어도 실패하지 않아야 함
+    path = str(tmp_path / 'race.sqlite3')
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def open_db():
+        barrier.wait()
+        try:
+            annotation_db.AnnotationDB(path).close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_db) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
@@ -0,0 +1,52 @@
+import os
+
+import class_allowlist
+
+def make_split(base_dir, class_folders, files_per_folder=3):
+    for subdir in ('image', 'label'):
+        for folder in class_folders:
+            os.makedirs(os.path.join(base_dir, subdir, folder))
+            for i in range(files_per_folder):
+                with open(os.path.join(base_dir, subdir, folder, f"{i}.bin"), 'wb') as f:
+                    f.write(b'x' * 100)
+
+def test_reconcile_writes_allowlist(tmp_path):
+    path = str(tmp_path / 'allow' / 'class_allowlist.json')
+    allowed = class_allowlist.reconcile(['과자A', '음료B ', '라면C'], ['음료B', '과자A', '우유D'], path)
+    assert allowed == ['과자A', '음료B']
+    assert class_allowlist.load_allowlist(path) == {
+        'classes': ['과자A', '음료B'], 'excluded': {'train_only': ['라면C'], 'valid_only': ['우유D']}}
+    assert class_allowlist.load_allowed(path) == {'과자A', '음료B'}
+    # 파일이 없으면 모든 클래스 허용
+    assert class_allowlist.load_allowed(str(tmp_path / 'missing.json')) is None
+
+def test_is_allowed():
+    allowed = {'과자A'}
+    assert class_allowlist.is_allowed(allowed, '10000_과자A')
+    assert class_allowlist.is_allowed(allowed, '20000_과자A')
+    assert not class_allowlist.is_allowed(allowed, '10001_음료B')
+    # 루트에 바로 있는 파일, 허용 목록이 없는 경우는 항상 허용
+    assert class_allowlist.is_allowed(allowed, '')
+    assert class_allowlist.is_allowed(None, '10001_음료B')
+
+def test_cleanup_dry_run_then_delete(tmp_path, capsys):
+    train, valid = str(tmp_path / 'Training'), str(tmp_path / 'Validation')
+    make_split(train, ['10000_과자A', '10001_음료B', '10002_라면C'])
+    make_split(valid, ['10000_과자A', '10001_음료B'])
+    allowed = class_allowlist.reconcile(['과자A', '음료B', '라면C'], ['과자A', '음료B'])
+    excluded = {'라면C'}
+    assert allowed == ['과자A', '음료B']
+
+    expected = [os.path.join(train, 'image', '10002_라면C'), os.path.join(train, 'label', '10002_라면C')]
+    assert class_allowlist.find_excluded_folders([train, valid], excluded) == expected
+
+    # dry-run: 크기만 보여 주고 아무것도 지우지 않음
+    assert class_allowlist.cleanup([train, valid], excluded, delete=False, workers=2) == 2
+    output = capsys.readouterr().out
+    assert '파일 3개' in output and 'dry-run' in output
+    assert all(os.path.isdir(path) for path in expected)
+
+    assert class_allowlist.cleanup([train, valid], excluded, delete=True, workers=2) == 2
+    assert not any(os.path.exists(path) for path in expected)
+    assert sorted(os.listdir(os.path.join(train, 'label'))) == ['10000_과자A', '10001_음료B']
+    assert class_allowlist.cleanup([train, valid], excluded) == 0
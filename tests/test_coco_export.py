@@ -0,0 +1,74 @@
+import json
+import os
+import random
+
+import class_allowlist
+import coco_export
+import make_dummy_dataset
+import trans_coco as tc
+import voc_parser
+
+def make_label_dir(tmp_path):
+    make_dummy_dataset.generate_dataset(str(tmp_path / 'data'), num_files=40, num_classes=4, objects_per_file=3,
+                                        missing_pair_ratio=0.0, wrapped_ratio=0.5, write_images=False)
+    label_dir = str(tmp_path / 'data' / 'Training' / 'label')
+    # 클래스 폴더 없이 루트에 바로 있는 XML도 내보내야 함
+    xml = make_dummy_dataset.make_xml('root.jpg', '상품0001', (800, 600), 2, random.Random(1), wrapped=False)
+    with open(os.path.join(label_dir, 'root.xml'), 'w', encoding='utf-8') as f:
+        f.write(xml)
+    return label_dir
+
+def expected_coco(label_dir, classes, allowed=None):
+    """XML을 직접 파싱하여 (file_name, width, height, [(category_id, bbox), ...]) 목록을 만듭니다."""
+    xml_paths = sorted(os.path.join(dir_path, name) for dir_path, _, names in os.walk(label_dir)
+                       for name in names if name.endswith('.xml'))
+    records = []
+    for path in xml_paths:
+        folder = os.path.relpath(os.path.dirname(path), label_dir)
+        if allowed is not None and folder != '.' and class_allowlist.class_name_of(folder) not in allowed:
+            continue
+        annotation = voc_parser.load_annotation(path, 'etree')
+        # 더미 박스는 이미지 안에 있으므로 잘라낼 필요 없이 1-based -> 0-based
+        boxes = [(classes.index(obj.name) + coco_export.CATEGORY_ID_START,
+                  [round(obj.bbox[0] - 1, 2), round(obj.bbox[2] - 1, 2),
+                   round(obj.bbox[1] - obj.bbox[0], 2), round(obj.bbox[3] - obj.bbox[2], 2)])
+                 for obj in annotation.objects if not obj.difficult]
+        records.append((annotation.filename, annotation.width, annotation.height, boxes))
+    return records
+
+def exported_coco(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    boxes = {}
+    for ann in data['annotations']:
+        boxes.setdefault(ann['image_id'], []).append((ann['category_id'], ann['bbox']))
+    return sorted((image['file_name'], image['width'], image['height'], boxes.get(image['id'], []))
+                  for image in data['images']), data['categories']
+
+def test_export_matches_xml_boxes(tmp_path, capsys):
+    label_dir = make_label_dir(tmp_path)
+    classes = tc.find_classes_from_folder_name(label_dir)
+    # 변환이 어노테이션 DB를 채우므로 내보내기는 XML을 다시 파싱하지 않아야 함
+    tc.run(label_dir, str(tmp_path / 'label_coco'), str(tmp_path / 'base'), workers=1)
+    capsys.readouterr()
+
+    output_path = str(tmp_path / 'instances_train.json')
+    counts = coco_export.export_split(label_dir, classes, output_path)
+    assert '다시 읽을 파일 0개' in capsys.readouterr().out
+
+    images, categories = exported_coco(output_path)
+    assert [category['name'] for category in categories] == classes
+    assert images == sorted(expected_coco(label_dir, classes))
+    assert counts['images'] == 41 and counts['failed'] == 0
+    assert counts['annotations'] == sum(len(boxes) for _, _, _, boxes in images) > 100
+
+def test_export_applies_allowlist(tmp_path):
+    label_dir = make_label_dir(tmp_path)
+    classes = tc.find_classes_from_folder_name(label_dir)
+    allowed = set(classes[:2])
+
+    output_path = str(tmp_path / 'instances_train.json')
+    coco_export.export_split(label_dir, classes, output_path, allowed=allowed)
+    images, _ = exported_coco(output_path)
+    assert images == sorted(expected_coco(label_dir, classes, allowed))
+    assert 'root.jpg' in [image[0] for image in images]
@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+
+import trans_coco as tc
+import voc_parser
+
+CLASSES = ['과자A', '과자B', '음료C']
+
+def random_boxes(rng, count):
+    """범위를 벗어나거나 음수인 좌표(클리핑 대상)를 포함한 임의의 (이미지 크기, VOC 박스) 목록"""
+    sizes = [(rng.randint(1, 5000), rng.randint(1, 5000)) for _ in range(count)]
+    boxes = [tuple(rng.uniform(-500, 6000) for _ in range(4)) for _ in range(count)]
+    return sizes, boxes
+
+def reference_lines(class_ids, sizes, boxes):
+    """write_yolo_label과 같은 방식(박스마다 convert_box + f-string)으로 만든 YOLO 줄"""
+    lines = []
+    for cls_id, size, box in zip(class_ids, sizes, boxes):
+        bb = tc.convert_box(size, box)
+        lines.append(f"{cls_id} {bb[0]:.6f} {bb[1]:.6f} {bb[2]:.6f} {bb[3]:.6f}\n")
+    return ''.join(lines)
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_convert_boxes_matches_convert_box(seed):
+    rng = random.Random(seed)
+    sizes, boxes = random_boxes(rng, 20000)
+    class_ids = [rng.randint(0, 500) for _ in sizes]
+
+    vectorized = tc.convert_boxes(sizes, boxes)
+
+    assert np.array_equal(vectorized, np.array([tc.convert_box(size, box) for size, box in zip(sizes, boxes)]))
+    assert tc.format_yolo_lines(class_ids, vectorized) == reference_lines(class_ids, sizes, boxes)
+
+def test_clipping_is_exercised():
+    sizes = [(100, 100)] * 4
+    boxes = [(-50, 20, -50, 20), (90, 300, 90, 300), (-10, -5, 10, 20), (10, 20, 30, 40)]
+    coords = tc.convert_boxes(sizes, boxes)
+    raw = tc.convert_boxes(sizes, boxes, clip=False)
+
+    assert ((raw < 0) | (raw > 1)).any(axis=1).tolist() == [True, True, True, False]
+    assert coords.min() >= 0.0 and coords.max() <= 1.0
+    assert tc.format_yolo_lines([0] * 4, coords) == reference_lines([0] * 4, sizes, boxes)
+
+def test_format_yolo_lines_empty():
+    assert tc.format_yolo_lines([], np.zeros((0, 4))) == ''
+
+def test_write_yolo_labels_matches_write_yolo_label(tmp_path):
+    rng = random.Random(3)
+    annotations = []
+    for i in range(200):
+        width, height = rng.randint(1, 4000), rng.randint(1, 4000)
+        objects = [voc_parser.VocObject(name=rng.choice(CLASSES + ['unknown']),
+                                        bbox=tuple(rng.uniform(-500, 5000) for _ in range(4)),
+                                        difficult=rng.random() < 0.1)
+                   for _ in range(rng.randint(0, 8))]
+        annotations.append(voc_parser.VocAnnotation(xml_path=f'{i}.xml', filename=f'{i}.jpg', folder=None, path=None,
+                                                    width=width, height=height, objects=objects))
+    reference_dir = tmp_path / 'reference'
+    vectorized_dir = tmp_path / 'vectorized'
+    reference_dir.mkdir()
+    vectorized_dir.mkdir()
+
+    for annotation in annotations:
+        tc.write_yolo_label(annotation, str(reference_dir), CLASSES, warnings=[])
+    paths = tc.write_yolo_labels(annotations, [str(vectorized_dir)] * len(annotations), CLASSES, warnings=[])
+
+    assert len(paths) == len(annotations)
+    for annotation in annotations:
+        name = f'{annotation.filename[:-4]}.txt'
+        assert (vectorized_dir / name).read_bytes() == (reference_dir / name).read_bytes()
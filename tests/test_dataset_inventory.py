@@ -0,0 +1,47 @@
+import os
+
+import dataset_inventory
+
+def make_tree(root):
+    for folder, names in {'10000_과자A': ['a.xml', 'a_meta.xml', 'b.XML'], '10001_음료B/sub': ['c.xml', 'd.txt'],
+                          '': ['root.xml']}.items():
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        for name in names:
+            with open(os.path.join(root, folder, name), 'w', encoding='utf-8') as f:
+                f.write(name)
+
+def os_walk_files(root):
+    return sorted(os.path.join(dir_path, name) for dir_path, _, names in os.walk(root) for name in names)
+
+def test_inventory_matches_os_walk(tmp_path):
+    root = str(tmp_path / 'label')
+    make_tree(root)
+    inventory = dataset_inventory.get_inventory(root)
+
+    assert sorted(entry.path for entry in inventory.files) == os_walk_files(root)
+    assert sorted(inventory.class_folders()) == ['10000_과자A', '10001_음료B']
+    assert sorted(os.path.basename(entry.path) for entry in inventory.select(('.xml',), exclude='meta')) == \
+        ['a.xml', 'b.XML', 'c.xml', 'root.xml']
+    assert {entry.stem: entry.class_folder for entry in inventory.files}['c'] == '10001_음료B'
+    assert {entry.stem: entry.class_folder for entry in inventory.files}['root'] == ''
+    assert sorted(path for dir_path, _, names in dataset_inventory.walk(root) for path in
+                  (os.path.join(dir_path, name) for name in names)) == os_walk_files(root)
+
+def test_cached_inventory_sees_added_and_removed_files(tmp_path, monkeypatch, capsys):
+    # 방금 만든 폴더도 캐시를 쓰도록 경합 구간을 없앰
+    monkeypatch.setattr(dataset_inventory, 'RACY_WINDOW_SEC', 0)
+    root = str(tmp_path / 'label')
+    make_tree(root)
+    dataset_inventory.get_inventory(root)
+    assert os.path.exists(dataset_inventory.INVENTORY_CACHE_PATH)
+
+    os.remove(os.path.join(root, '10000_과자A', 'a.xml'))
+    with open(os.path.join(root, '10001_음료B', 'sub', 'e.xml'), 'w', encoding='utf-8') as f:
+        f.write('e')
+    # 메모리 캐시를 비워 디스크의 캐시 파일에서 다시 읽도록 함
+    monkeypatch.setattr(dataset_inventory, '_cache', None)
+    capsys.readouterr()
+    inventory = dataset_inventory.get_inventory(root)
+    assert sorted(entry.path for entry in inventory.files) == os_walk_files(root)
+    # 바뀐 폴더(10000_과자A, 10001_음료B/sub)만 다시 읽음
+    assert '폴더 4개 중 2개 다시 읽음' in capsys.readouterr().out
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+
+import dataset_stats
+import make_dummy_dataset
+import trans_coco as tc
+import voc_parser
+
+# 이미지 밖으로 나가는 박스(클리핑 대상)와 difficult 박스를 가진 루트 XML
+ROOT_XML = ('<annotation><folder>image</folder><filename>root.jpg</filename><path>root.jpg</path>'
+            '<size><width>100</width><height>50</height><depth>3</depth></size>'
+            '<object><name>상품0001</name><difficult>0</difficult>'
+            '<bndbox><xmin>90</xmin><ymin>10</ymin><xmax>130</xmax><ymax>40</ymax></bndbox></object>'
+            '<object><name>상품0001</name><difficult>1</difficult>'
+            '<bndbox><xmin>1</xmin><ymin>1</ymin><xmax>10</xmax><ymax>10</ymax></bndbox></object>'
+            '</annotation>')
+
+def test_stats_match_converted_labels(tmp_path):
+    make_dummy_dataset.generate_dataset(str(tmp_path / 'data'), num_files=60, num_classes=4, objects_per_file=3,
+                                        missing_pair_ratio=0.0, write_images=False)
+    label_dir = str(tmp_path / 'data' / 'Training' / 'label')
+    with open(os.path.join(label_dir, 'root.xml'), 'w', encoding='utf-8') as f:
+        f.write(ROOT_XML)
+    output_dir = str(tmp_path / 'label_coco')
+    # 변환이 어노테이션 DB를 채움 (통계는 XML을 다시 읽지 않음)
+    tc.run(label_dir, output_dir, str(tmp_path / 'base'), workers=1)
+    classes = tc.find_classes_from_folder_name(label_dir)
+
+    report = dataset_stats.run({'train': label_dir}, classes, anchor_count=3,
+                               json_path=str(tmp_path / 'stats.json'), csv_path=str(tmp_path / 'stats.csv'))
+    stats = report['splits']['train']
+
+    # 기대값: YOLO TXT(루트 XML 포함)의 클래스 열과, 기준 구현 convert_box로 본 클리핑 여부
+    class_ids = []
+    label_count = 0
+    for dir_path, _, names in os.walk(output_dir):
+        for name in names:
+            with open(os.path.join(dir_path, name), 'r', encoding='utf-8') as f:
+                class_ids.extend(int(line.split()[0]) for line in f)
+            label_count += 1
+    clipped = 0
+    difficult = 0
+    for dir_path, _, names in os.walk(label_dir):
+        for name in names:
+            annotation = voc_parser.load_annotation(os.path.join(dir_path, name))
+            for obj in annotation.objects:
+                if obj.difficult:
+                    difficult += 1
+                    continue
+                size = (annotation.width, annotation.height)
+                raw = tc.convert_boxes(np.array([size], dtype=float), np.array([obj.bbox], dtype=float), clip=False)[0]
+                clipped += tuple(raw) != tuple(tc.convert_box(size, obj.bbox))
+
+    assert stats['images'] == label_count == 61
+    assert stats['boxes'] == len(class_ids)
+    assert [row['boxes'] for row in stats['classes']] == np.bincount(class_ids, minlength=len(classes)).tolist()
+    assert stats['skipped_difficult'] == difficult
+    assert stats['clipped'] == clipped >= 1
+    assert stats['boxes_per_image']['max'] <= 3
+
+    anchors = np.array(report['anchors']['wh'])
+    assert anchors.shape == (3, 2)
+    assert (np.diff(anchors[:, 0] * anchors[:, 1]) >= 0).all()
+    assert os.path.exists(tmp_path / 'stats.json') and os.path.exists(tmp_path / 'stats.csv')
+
+def test_kmeans_recovers_separated_clusters():
+    rng = np.random.default_rng(0)
+    centers = np.array([[10.0, 20.0], [60.0, 40.0], [200.0, 150.0]])
+    wh = np.concatenate([center * rng.uniform(0.95, 1.05, size=(300, 2)) for center in centers])
+    anchors, quality = dataset_stats.kmeans_anchors(wh, k=3)
+    np.testing.assert_allclose(anchors, centers, rtol=0.05)
+    assert quality['recall_iou50'] == 1.0
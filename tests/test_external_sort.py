@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+import external_sort
+
+def test_sorted_lines_removes_runs_when_input_fails(tmp_path):
+    def lines():
+        for i in range(5):
+            yield f"{i}\tx\n"
+        raise RuntimeError('입력 실패')
+
+    with pytest.raises(RuntimeError):
+        with external_sort.SortedLines(lines(), run_lines=2, tmp_dir=str(tmp_path)):
+            pass
+    # run 파일 2개를 쓴 뒤 실패했어도 작업 폴더가 남지 않아야 함
+    assert os.listdir(tmp_path) == []
+
+def random_records(rng, count, prefix):
+    # 'a'와 'a_1'처럼 다른 key의 접두사인 key도 섞음 (탭 구분 정렬이 key 순서와 같아야 함)
+    stems = [f"{rng.randint(0, count)}" + rng.choice(['', '_1', '_m', ' x', '한']) for _ in range(count)]
+    return [(stem, f"{prefix}/{stem}/{i:05d}") for i, stem in enumerate(stems)]
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_merge_join_matches_dict_join(tmp_path, seed):
+    rng = random.Random(seed)
+    images = random_records(rng, 3000, 'image')
+    labels = random_records(rng, 3000, 'label')
+
+    # 같은 key가 여러 번 나오면 값 순서상 마지막 값이 남음
+    expected_images = {}
+    for stem, path in sorted(images):
+        expected_images[stem] = path
+    expected_labels = {}
+    for stem, path in sorted(labels):
+        expected_labels[stem] = path
+    expected = [(stem, expected_images[stem], expected_labels[stem])
+                for stem in sorted(expected_images.keys() & expected_labels.keys())]
+
+    counts = {}
+    with external_sort.SortedLines((f"{k}\t{v}\n" for k, v in images), run_lines=100, tmp_dir=str(tmp_path)) as left, \
+            external_sort.SortedLines((f"{k}\t{v}\n" for k, v in labels), run_lines=77, tmp_dir=str(tmp_path)) as right:
+        assert len(left.run_paths) == 30
+        joined = list(external_sort.merge_join(external_sort.last_per_key(left, counts),
+                                               external_sort.last_per_key(right, counts), counts))
+
+    assert joined == expected
+    assert counts['matched'] == len(expected)
+    assert counts['left_only'] == len(expected_images.keys() - expected_labels.keys())
+    assert counts['right_only'] == len(expected_labels.keys() - expected_images.keys())
+    assert counts['duplicates'] == len(images) - len(expected_images) + len(labels) - len(expected_labels)
+    assert os.listdir(tmp_path) == []
+
+def test_merge_join_empty_sides():
+    counts = {}
+    assert list(external_sort.merge_join([], [('a', '1'), ('b', '2')], counts)) == []
+    assert counts == {'left_only': 0, 'right_only': 2, 'matched': 0}
+
+def test_sorted_difference():
+    a = ['a', 'b', 'c', 'e', 'g']
+    b = ['b', 'd', 'e', 'f', 'z']
+    assert list(external_sort.sorted_difference(a, b)) == ['a', 'c', 'g']
+    assert list(external_sort.sorted_difference(a, [])) == a
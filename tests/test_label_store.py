@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+import annotation_db
+import label_store
+import make_dummy_dataset
+import trans_coco as tc
+
+def convert_labels(tmp_path, monkeypatch):
+    """더미 XML을 YOLO TXT로 변환하고 (이미지 이름 목록, TXT 경로 목록)을 반환합니다."""
+    monkeypatch.setattr(annotation_db, 'USE_ANNOTATION_DB', False)
+    make_dummy_dataset.generate_dataset(str(tmp_path / 'data'), num_files=30, num_classes=3, objects_per_file=4,
+                                        missing_pair_ratio=0.0, write_images=False)
+    output_dir = str(tmp_path / 'label_coco')
+    tc.run(str(tmp_path / 'data' / 'Training' / 'label'), output_dir, str(tmp_path / 'base'), workers=1)
+    label_paths = sorted(os.path.join(dir_path, name) for dir_path, _, names in os.walk(output_dir)
+                         for name in names if name.endswith('.txt'))
+    image_names = [os.path.splitext(os.path.basename(path))[0] + '.jpg' for path in label_paths]
+    return image_names, label_paths
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def test_store_round_trips_label_text(tmp_path, monkeypatch):
+    image_names, label_paths = convert_labels(tmp_path, monkeypatch)
+    store_dir = str(tmp_path / 'store')
+    box_count = label_store.build_store(image_names, label_paths, [None] * len(image_names), store_dir, (640, 640))
+
+    store = label_store.LabelStore(store_dir)
+    assert len(store) == len(image_names) and box_count > 0
+    for i, label_path in enumerate(label_paths):
+        text = read(label_path)
+        assert store.label_text(i) == text
+        assert store.size(i) == (640, 640)
+        values = np.array(text.split(), dtype=np.float64).reshape(-1, 5)
+        assert store.classes(i).tolist() == values[:, 0].astype(int).tolist()
+        np.testing.assert_allclose(store.boxes(i), values[:, 1:], atol=1e-6)
+    assert store.index_of(os.path.splitext(image_names[3])[0]) == 3
+
+    # 저장소에서 다시 만든 TXT도 원본과 같아야 함
+    output_dir = str(tmp_path / 'from_store')
+    label_store.write_txt_files(store, output_dir)
+    for image_name, label_path in zip(image_names, label_paths):
+        assert read(os.path.join(output_dir, os.path.splitext(image_name)[0] + '.txt')) == read(label_path)
+
+def test_store_handles_malformed_and_unresized_images(tmp_path):
+    from PIL import Image
+
+    (tmp_path / 'good.txt').write_text('1 0.500000 0.250000 0.100000 0.200000\n', encoding='utf-8')
+    (tmp_path / 'bad.txt').write_text('1 0.5 0.5\n', encoding='utf-8')
+    Image.new('RGB', (37, 21)).save(tmp_path / 'b.png')
+
+    store_dir = str(tmp_path / 'store')
+    label_store.build_store(['a.jpg', 'b.png'], [str(tmp_path / 'good.txt'), str(tmp_path / 'bad.txt')],
+                            [None, str(tmp_path / 'b.png')], store_dir, (640, 640))
+    store = label_store.LabelStore(store_dir, mmap=False)
+    assert store.label_text(0) == '1 0.500000 0.250000 0.100000 0.200000\n'
+    # 형식이 맞지 않는 라벨은 박스 없이, 리사이징 대상이 아닌 이미지는 헤더의 크기로 기록
+    assert store.label_text(1) == ''
+    assert store.size(1) == (37, 21)
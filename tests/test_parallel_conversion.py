@@ -0,0 +1,31 @@
+import os
+
+import annotation_db
+import make_dummy_dataset
+import trans_coco as tc
+
+def read_tree(root_dir):
+    """root_dir 아래 모든 파일의 {상대 경로: 바이트}"""
+    contents = {}
+    for dir_path, _, file_names in os.walk(root_dir):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            with open(path, 'rb') as f:
+                contents[os.path.relpath(path, root_dir)] = f.read()
+    return contents
+
+def test_parallel_conversion_matches_serial(tmp_path, monkeypatch):
+    # 작은 트리에서도 여러 묶음이 여러 워커로 나뉘도록 묶음 크기를 줄임
+    monkeypatch.setattr(tc, 'CHUNK_SIZE', 7)
+    monkeypatch.setattr(annotation_db, 'USE_ANNOTATION_DB', False)
+    make_dummy_dataset.generate_dataset(str(tmp_path / 'data'), num_files=60, num_classes=4, objects_per_file=3,
+                                        missing_pair_ratio=0.1, wrapped_ratio=0.5, write_images=False)
+    label_dir = str(tmp_path / 'data' / 'Training' / 'label')
+
+    tc.run(label_dir, str(tmp_path / 'serial' / 'label_coco'), str(tmp_path / 'serial'), workers=1)
+    tc.run(label_dir, str(tmp_path / 'parallel' / 'label_coco'), str(tmp_path / 'parallel'), workers=3)
+
+    serial = read_tree(tmp_path / 'serial')
+    parallel = read_tree(tmp_path / 'parallel')
+    assert len([path for path in serial if path.endswith('.txt')]) > 50
+    assert serial == parallel
@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+import queue_pipeline as qp
+
+def stages(fail_on=None):
+    def double(x):
+        if x == fail_on:
+            raise ValueError(f"실패 {x}")
+        return x * 2
+
+    return [qp.PipelineStage('read', lambda x: x + 1, 2),
+            qp.PipelineStage('double', double, 3),
+            qp.PipelineStage('write', lambda x: -x, 1)]
+
+def test_results_and_stats():
+    results = []
+    stats = qp.run_pipeline(range(200), stages(), results.append, queue_size=4)
+    assert sorted(results) == sorted(-(x + 1) * 2 for x in range(200))
+    assert [stage['items'] for stage in stats.as_dict()['stages'].values()] == [200, 200, 200]
+
+def test_stage_error_is_delivered_and_skips_later_stages():
+    results = []
+    stats = qp.run_pipeline(range(50), stages(fail_on=11), results.append, queue_size=4)
+    errors = [result for result in results if isinstance(result, qp.StageError)]
+    assert len(results) == 50 and len(errors) == 1
+    # 예외가 난 단계의 입력 항목(앞 단계 결과)과 예외가 그대로 전달되고, 뒤 단계(write)는 건너뜀
+    assert (errors[0].stage, errors[0].item, str(errors[0].error)) == ('double', 11, '실패 11')
+    stage_stats = stats.as_dict()['stages']
+    assert stage_stats['double']['errors'] == 1 and stage_stats['write']['items'] == 49
+
+def test_on_result_error_stops_pipeline():
+    consumed = []
+
+    def items():
+        for i in range(100000):
+            consumed.append(i)
+            yield i
+
+    def on_result(result):
+        raise KeyError('on_result 실패')
+
+    with pytest.raises(KeyError):
+        qp.run_pipeline(items(), stages(), on_result, queue_size=2)
+    # 큐 크기 제한 때문에 입력을 끝까지 읽지 않고 멈춰야 하고, 파이프라인 스레드도 남지 않아야 함
+    assert len(consumed) < 100
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+def test_items_error_is_raised():
+    def items():
+        yield 1
+        yield 2
+        raise OSError('입력 실패')
+
+    results = []
+    with pytest.raises(OSError, match='입력 실패'):
+        qp.run_pipeline(items(), stages(), results.append, queue_size=2)
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
@@ -0,0 +1,92 @@
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import merge_shards
+import sharding
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_parse_shard():
+    assert sharding.parse_shard('') is None
+    assert sharding.parse_shard(None) is None
+    assert sharding.parse_shard('1/4') == sharding.Shard(1, 4)
+    assert sharding.parse_shard('0/1') == sharding.Shard(0, 1)
+
+@pytest.mark.parametrize('text', ['a/b', '1', '1/2/3', '4/4', '-1/4', '0/0', '2/-3'])
+def test_parse_shard_rejects(text):
+    with pytest.raises(ValueError):
+        sharding.parse_shard(text)
+
+def test_shard_of_is_stable():
+    # CRC32 기반이므로 실행/머신과 관계없이 같은 값 (hash()처럼 PYTHONHASHSEED에 따라 바뀌면 안 됨)
+    assert [sharding.shard_of(folder, 4) for folder in ('10000_과자A', '10001_음료B', '10002_상품0003')] == [3, 0, 3]
+    assert [sharding.shard_of(folder, 7) for folder in ('10000_과자A', '10001_음료B', '10002_상품0003')] == [3, 1, 1]
+    # ID가 달라도 클래스 이름이 같으면 같은 샤드
+    assert sharding.shard_of('10000_과자A', 5) == sharding.shard_of('20000_과자A', 5)
+
+    code = "import sharding; print(sharding.shard_of('10001_음료B', 4))"
+    for seed in ('0', '1', '12345'):
+        output = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True, check=True,
+                                env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+        assert output.strip() == '0'
+
+def test_shard_path():
+    shard = sharding.Shard(0, 4)
+    assert sharding.shard_path(None, './labels/train') == './labels/train'
+    assert sharding.shard_path(shard, './labels/train', 'root') == os.path.join('root', 'shard_0_of_4', 'labels', 'train')
+    assert sharding.shard_path(shard, '/abs/labels', 'root') == os.path.join('root', 'shard_0_of_4', 'abs', 'labels')
+
+def test_remap_label_lines(capsys):
+    text = '0 0.5 0.5 0.1 0.1\n\n1 0.2 0.2 0.3 0.3\n7 0.1 0.1 0.1 0.1\nx 0 0 0 0\n2'
+    remapped = merge_shards.remap_label_lines(text, {0: 5, 1: 3, 2: 0}, 'a.txt')
+    assert remapped == '5 0.5 0.5 0.1 0.1\n3 0.2 0.2 0.3 0.3\n0\n'
+    # 알 수 없는 ID(7, x)의 줄은 경고 후 제외
+    assert capsys.readouterr().out.count('알 수 없는 클래스 ID') == 2
+    assert merge_shards.remap_label_lines('', {0: 0}, 'empty.txt') == ''
+
+def make_copy(root):
+    """스크립트를 root에 복사하고 같은 시드의 더미 데이터셋을 만듭니다. (출력이 저장소 폴더에 생기지 않도록)"""
+    os.makedirs(root)
+    for name in os.listdir(REPO_DIR):
+        if name.endswith('.py'):
+            shutil.copy2(os.path.join(REPO_DIR, name), root)
+    # 클래스 하나는 Validation에 없어 불일치 정리 단계까지 거치도록 함
+    subprocess.run([sys.executable, 'make_dummy_dataset.py', '--output', '.', '--files', '80', '--classes', '7',
+                    '--image-size', '32', '24', '--mismatch-classes', '1'],
+                   cwd=root, check=True, capture_output=True)
+
+def assert_same_tree(left, right):
+    comparison = filecmp.dircmp(left, right)
+    assert not comparison.left_only and not comparison.right_only and not comparison.funny_files
+    _, mismatch, errors = filecmp.cmpfiles(left, right, comparison.common_files, shallow=False)
+    assert not mismatch and not errors, mismatch
+    for sub_dir in comparison.common_dirs:
+        assert_same_tree(os.path.join(left, sub_dir), os.path.join(right, sub_dir))
+
+def test_sharded_run_and_merge_matches_single_run(tmp_path):
+    single, sharded = str(tmp_path / 'single'), str(tmp_path / 'sharded')
+    make_copy(single)
+    make_copy(sharded)
+
+    subprocess.run([sys.executable, 'run_all.py'], cwd=single, check=True, capture_output=True)
+    subprocess.run([sys.executable, 'merge_shards.py', '--count', '3', '--run-local'], cwd=sharded, check=True,
+                   capture_output=True)
+
+    for relative_path in ('labels', os.path.join('Training', 'classes.txt'), os.path.join('Validation', 'classes.txt'),
+                          'train.txt', 'valid.txt'):
+        left, right = os.path.join(single, relative_path), os.path.join(sharded, relative_path)
+        if os.path.isdir(left):
+            assert_same_tree(left, right)
+        else:
+            assert filecmp.cmp(left, right, shallow=False), relative_path
+    # 샤드 로컬 클래스 목록이 전체 목록과 달라 실제로 ID 재매핑을 거쳤는지 확인
+    global_classes = merge_shards.read_classes(os.path.join(sharded, 'Training', 'classes.txt'))
+    shard_classes = [merge_shards.read_classes(os.path.join(sharded, 'shards', f'shard_{i}_of_3', 'Training', 'classes.txt'))
+                     for i in range(3)]
+    assert merge_shards.merge_class_lists(shard_classes) == global_classes
+    assert all(classes != global_classes for classes in shard_classes)
@@ -0,0 +1,67 @@
+import os
+import random
+import tarfile
+
+import pytest
+
+import tar_shards
+
+def make_samples(count, seed=0):
+    rng = random.Random(seed)
+    return [(f"{10000 + i}_{i}_m_T", [('jpg', rng.randbytes(rng.randint(0, 3000))),
+                                      ('txt', f"{i % 3} 0.5 0.5 0.1 0.1\n".encode('utf-8'))])
+            for i in range(count)]
+
+def write_samples(output_dir, samples, **kwargs):
+    with tar_shards.TarShardWriter(output_dir, **kwargs) as writer:
+        for stem, members in samples:
+            writer.add_sample(stem, members, mtime=1700000000)
+    return writer
+
+def test_index_and_read_member_match_tar_contents(tmp_path):
+    output_dir = str(tmp_path / 'train')
+    samples = make_samples(25)
+    writer = write_samples(output_dir, samples, max_bytes=16 * 1024, max_samples=10)
+    assert writer.sample_count == 25
+    assert len(writer.shard_names) >= 3
+    assert [os.path.basename(path) for path in tar_shards.shard_paths(output_dir)] == writer.shard_names
+    assert not os.path.exists(output_dir + '.tmp')
+
+    index = tar_shards.load_index(output_dir)
+    assert list(index) == [stem for stem, _ in samples]
+    for stem, members in samples:
+        for ext, data in members:
+            location = index[stem][f"{stem}.{ext}"]
+            assert tar_shards.read_member(output_dir, location) == data
+
+    # 표준 tarfile로 읽어도 같은 멤버/내용이어야 함 (WebDataset 로더 호환)
+    expected = {f"{stem}.{ext}": data for stem, members in samples for ext, data in members}
+    found = {}
+    for path in tar_shards.shard_paths(output_dir):
+        with tarfile.open(path) as tar:
+            for member in tar.getmembers():
+                found[member.name] = tar.extractfile(member).read()
+    assert found == expected
+
+def test_shard_limits(tmp_path):
+    output_dir = str(tmp_path / 'train')
+    writer = write_samples(output_dir, make_samples(25), max_bytes=1 << 30, max_samples=10)
+    assert writer.shard_names == ['shard-000000.tar', 'shard-000001.tar', 'shard-000002.tar']
+
+    # 샘플 하나가 max_bytes보다 커도 빈 샤드를 만들지 않고 그 샤드에 씀
+    big = [('big', [('jpg', b'x' * 5000)]), ('small', [('jpg', b'y')])]
+    writer = write_samples(output_dir, big, max_bytes=1024)
+    assert writer.shard_names == ['shard-000000.tar', 'shard-000001.tar']
+    assert set(tar_shards.load_index(output_dir)) == {'big', 'small'}
+
+def test_failed_write_keeps_previous_shards(tmp_path):
+    output_dir = str(tmp_path / 'train')
+    samples = make_samples(5)
+    write_samples(output_dir, samples)
+
+    with pytest.raises(RuntimeError):
+        with tar_shards.TarShardWriter(output_dir) as writer:
+            writer.add_sample('new', [('jpg', b'z')])
+            raise RuntimeError('중단')
+    assert list(tar_shards.load_index(output_dir)) == [stem for stem, _ in samples]
+    assert not os.path.exists(output_dir + '.tmp')
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import make_dummy_dataset
+import voc_parser
+
+BACKENDS = voc_parser.available_backends()
+
+EMPTY_XML = ('<?xml version="1.0" encoding="utf-8"?>\n'
+             '<annotation><folder>image</folder><filename>empty.jpg</filename><path>empty.jpg</path>'
+             '<size><width>640</width><height>480</height><depth>3</depth></size></annotation>')
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+@pytest.fixture
+def sample_xmls(tmp_path):
+    """일반 XML, <comp_cd>로 감싼 XML, 객체가 없는 XML"""
+    rng = random.Random(0)
+    paths = []
+    for i, wrapped in enumerate([False, True, False, True]):
+        xml = make_dummy_dataset.make_xml(f'{i}.jpg', '과자A', (1024, 768), 4, rng, wrapped)
+        paths.append(write(tmp_path, f'{i}.xml', xml))
+    paths.append(write(tmp_path, 'empty.xml', EMPTY_XML))
+    return paths
+
+def test_backends_agree(sample_xmls):
+    assert {'etree', 'iterparse'} <= set(BACKENDS)
+    for path in sample_xmls:
+        expected = voc_parser.load_annotation(path, 'etree')
+        for backend in BACKENDS:
+            assert voc_parser.load_annotation(path, backend) == expected, (path, backend)
+
+def test_empty_objects(sample_xmls):
+    for backend in BACKENDS:
+        annotation = voc_parser.load_annotation(sample_xmls[-1], backend)
+        assert annotation.objects == []
+        assert (annotation.filename, annotation.width, annotation.height) == ('empty.jpg', 640, 480)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('text', [
+    # <size> 없음
+    '<annotation><filename>a.jpg</filename></annotation>',
+    # <annotation> 없음
+    '<comp_cd><meta_info><item>x</item></meta_info></comp_cd>',
+], ids=['no_size', 'no_annotation'])
+def test_missing_tags_raise_value_error(tmp_path, backend, text):
+    with pytest.raises(ValueError):
+        voc_parser.load_annotation(write(tmp_path, 'bad.xml', text), backend)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_malformed_xml_raises(tmp_path, backend):
+    # 잘린 파일: 백엔드마다 예외 종류(ParseError, XMLSyntaxError)는 다르지만 모두 실패해야 함
+    path = write(tmp_path, 'broken.xml', EMPTY_XML[:-20])
+    with pytest.raises(Exception):
+        voc_parser.load_annotation(path, backend)
@@ -0,0 +1,36 @@
+import os
+import random
+
+import build_manifest
+import make_dummy_dataset
+import xml_path_set as xps
+
+def make_label_dir(tmp_path, count):
+    rng = random.Random(0)
+    label_dir = tmp_path / 'label'
+    class_dir = label_dir / '10000_과자A'
+    class_dir.mkdir(parents=True)
+    for i in range(count):
+        xml = make_dummy_dataset.make_xml(f'{i}.jpg', '과자A', (640, 480), 2, rng, wrapped=i % 2 == 1)
+        (class_dir / f'{i}.xml').write_text(xml, encoding='utf-8')
+    return str(label_dir), class_dir
+
+def test_sidecar_index_prunes_removed_xmls(tmp_path):
+    label_dir, class_dir = make_label_dir(tmp_path, 4)
+    manifest = build_manifest.BuildManifest(str(tmp_path / 'manifest.json'))
+
+    xps.run(label_dir, xps.RELATIVE_PATH_PREFIX, manifest, mode='sidecar')
+    keys = set(xps.load_path_index(label_dir))
+    assert keys == {f'10000_과자A/{i}.xml' for i in range(4)}
+
+    # 다음 실행은 매니페스트로 모두 건너뛰지만, 사라진 XML의 항목만 지워지고 나머지는 남아야 함
+    os.remove(class_dir / '1.xml')
+    xps.run(label_dir, xps.RELATIVE_PATH_PREFIX, manifest, mode='sidecar')
+    assert set(xps.load_path_index(label_dir)) == keys - {'10000_과자A/1.xml'}
+
+def test_update_path_index_drops_unseen_keys(tmp_path):
+    label_dir = str(tmp_path)
+    entry = {'folder': 'image', 'path': 'a.jpg'}
+    xps.update_path_index(label_dir, {'a.xml': entry, 'b.xml': entry}, ['a.xml', 'b.xml'])
+    xps.update_path_index(label_dir, {}, ['b.xml'])
+    assert xps.load_path_index(label_dir) == {'b.xml': entry}
@@ -1,9 +1,17 @@
-import xml.etree.ElementTree as ET
+import argparse
+import multiprocessing
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import create_data_yaml as cdy
-import coco_setting_train as cst
+import annotation_db
+import build_manifest
+import class_allowlist
+import dataset_inventory
+import sharding
+import stage_metrics
+import voc_parser
+import xml_path_set as xps
 
 # --- [Configuration Section] ---
 # 1. 'label' 폴더와 'image' 폴더가 들어있는 최상위 폴더 경로
@@ -19,42 +27,50 @@ V_LABEL_ROOT_DIR = os.path.join(V_BASE_DIR, 'label')
 # 3. YOLO TXT 파일 출력 폴더
 V_OUTPUT_ROOT_DIR = os.path.join(V_BASE_DIR, 'label_coco') 
 
+# 4. 병렬 변환에 사용할 워커 프로세스 수 (1 이하이면 기존처럼 단일 프로세스로 변환)
+NUM_WORKERS = os.cpu_count() or 1
+# 5. 워커 하나에 한 번에 넘길 XML 파일 묶음 크기
+CHUNK_SIZE = 500
+# 6. 병렬 변환 후 화면에 출력할 최대 경고 개수
+MAX_PRINTED_WARNINGS = 20
+
 # --- [Utility Functions] ---
-def find_classes_from_folder_name(root_dir):
+def find_classes_from_folder_name(root_dir, shard=None, db=None):
     """
     지정된 루트 폴더(LABEL_ROOT_DIR)의 하위 폴더 이름을 스캔하여
     'ID_클래스이름' 형식에서 ID와 첫 번째 '_'를 제외한 전체 문자열을 클래스 이름으로 추출합니다.
     (속도를 최우선으로 하며, 폴더 이름과 XML <name> 태그가 일치한다고 가정합니다.)
+    shard(sharding.Shard)가 주어지면 그 샤드에 속한 폴더만 사용합니다. (샤드 로컬 클래스 목록)
+    db(annotation_db.AnnotationDB)가 주어지면 폴더를 스캔하지 않고 DB에 기록된 클래스 폴더를 사용합니다.
     """
     unique_classes = set()
     folder_count = 0
     skipped_folder_count = 0 
     print(f"\n--- 폴더 이름 기반 클래스 이름 추출 시작: {root_dir} ---")
     
-    # root_dir의 바로 아래에 있는 서브 폴더들만 확인
-    for item in os.listdir(root_dir):
-        sub_folder_path = os.path.join(root_dir, item)
+    # root_dir의 바로 아래에 있는 서브 폴더들만 확인 (인벤토리 또는 DB에서 조회, 폴더를 다시 읽지 않음)
+    folders = db.class_folders(root_dir) if db is not None else dataset_inventory.get_inventory(root_dir).class_folders()
+    for item in folders:
+        if not sharding.contains(shard, item):
+            continue
+        folder_count += 1
+        folder_name = item
+        class_name_extracted = False
         
-        # item이 디렉토리인지 확인
-        if os.path.isdir(sub_folder_path):
-            folder_count += 1
-            folder_name = item
-            class_name_extracted = False
-            
-            # 폴더 이름에 '_'가 있는지 확인
-            if '_' in folder_name:
-                # split('_', 1): 첫 번째 '_'에서만 분할하며, [-1]은 그 뒤의 모든 문자열을 가져옵니다.
-                class_name = folder_name.split('_', 1)[-1].strip()
-                unique_classes.add(class_name)
-                class_name_extracted = True
-            else:
-                # '_'가 없는 경우, 폴더 이름을 그대로 클래스 이름으로 사용
-                unique_classes.add(folder_name.strip())
-                class_name_extracted = True
+        # 폴더 이름에 '_'가 있는지 확인
+        if '_' in folder_name:
+            # split('_', 1): 첫 번째 '_'에서만 분할하며, [-1]은 그 뒤의 모든 문자열을 가져옵니다.
+            class_name = folder_name.split('_', 1)[-1].strip()
+            unique_classes.add(class_name)
+            class_name_extracted = True
+        else:
+            # '_'가 없는 경우, 폴더 이름을 그대로 클래스 이름으로 사용
+            unique_classes.add(folder_name.strip())
+            class_name_extracted = True
+        
+        if not class_name_extracted:
+             skipped_folder_count += 1
             
-            if not class_name_extracted:
-                 skipped_folder_count += 1
-                
     # 추출된 클래스 리스트를 알파벳/가나다 순으로 정렬하여 반환 (인덱스 고정 위함)
     class_list = sorted(list(unique_classes)) 
     print(f"--- 총 {folder_count}개 폴더 중 클래스 이름 추출 완료.")
@@ -88,62 +104,308 @@ def convert_box(size, box):
     
     return x_center, y_center, width, height
 
-def process_conversion(xml_file_path, output_dir, classes_list):
+def convert_boxes(sizes, boxes, clip=True):
     """
-    단일 XML 파일을 YOLO TXT 파일로 변환하여 지정된 출력 폴더에 저장합니다.
+    convert_box의 배열 버전입니다. 여러 박스를 NumPy 배열 연산으로 한 번에 변환합니다.
+    (연산 순서를 convert_box와 똑같이 맞춰 결과가 비트 단위로 같습니다.)
+
+    Args:
+        sizes: (N, 2) 이미지 크기 (width, height)
+        boxes: (N, 4) Pascal VOC 좌표 (xmin, xmax, ymin, ymax)
+        clip: False이면 클리핑하지 않은 값을 반환 (dataset_stats에서 클리핑되는 박스 수 계산용)
+
+    Returns:
+        np.ndarray: (N, 4) YOLO 정규화 좌표 (x_center, y_center, w, h)
     """
-    try:
-        # 1. XML 파일 파싱 및 기본 정보 추출
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
-        
-        # 출력 파일 경로 설정 (예: 10060_0_m_1.txt)
-        img_filename = root.find('filename').text
-        out_filename = os.path.splitext(img_filename)[0] + '.txt'
+    # numpy는 실제로 변환하는 프로세스(워커)에서만 불러옵니다.
+    import numpy as np
+
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+    dw = 1. / sizes[:, 0]
+    dh = 1. / sizes[:, 1]
+
+    # AI Hub 데이터는 보통 1-based이므로, -1을 적용합니다.
+    x = (boxes[:, 0] + boxes[:, 1]) / 2.0 - 1
+    y = (boxes[:, 2] + boxes[:, 3]) / 2.0 - 1
+    w = boxes[:, 1] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 2]
+
+    result = np.stack((x * dw, y * dh, w * dw, h * dh), axis=1)
+
+    # 결과가 0.0 ~ 1.0 범위를 벗어나지 않도록 클리핑
+    if clip:
+        np.clip(result, 0.0, 1.0, out=result)
+    return result
+
+# YOLO TXT 한 줄 형식 (인덱스 x_center y_center w h)
+YOLO_LINE_FORMAT = '%d %.6f %.6f %.6f %.6f\n'
+
+def format_yolo_lines(class_ids, coords):
+    """
+    클래스 인덱스 배열과 (N, 4) 좌표 배열을 YOLO TXT 내용 문자열로 한 번에 만듭니다.
+    (줄마다 f-string을 만드는 대신 전체를 하나의 % 포맷 연산으로 처리)
+    """
+    count = len(class_ids)
+    if count == 0:
+        return ''
+    import numpy as np
+    values = np.column_stack((np.asarray(class_ids, dtype=np.float64), coords)).ravel().tolist()
+    return (YOLO_LINE_FORMAT * count) % tuple(values)
+
+def _report(warnings, message):
+    """warnings 리스트가 주어지면 메시지를 모으고, 없으면 바로 출력합니다."""
+    if warnings is None:
+        print(message)
+    else:
+        warnings.append(message)
+
+def write_yolo_label(annotation, output_dir, classes_list, warnings=None):
+    """
+    파싱된 VocAnnotation 레코드를 YOLO TXT 파일로 저장하고, 저장한 파일 경로를 반환합니다.
+    (XML을 다시 읽지 않습니다.)
+    박스를 하나씩 convert_box로 변환하는 기준(reference) 구현입니다. 실제 변환은 write_yolo_labels를 사용합니다.
+    """
+    # 출력 파일 경로 설정 (예: 10060_0_m_1.txt)
+    out_filename = os.path.splitext(annotation.filename)[0] + '.txt'
+    out_file_path = os.path.join(output_dir, out_filename)
+    
+    # 이미지 크기
+    w, h = annotation.width, annotation.height
+
+    with open(out_file_path, 'w') as out_file:
+        for obj in annotation.objects:
+            # 'difficult'가 1인 경우 건너뛰기
+            if obj.difficult:
+                continue
+
+            try:
+                # 동적으로 생성된 CLASSES 리스트에서 인덱스 찾기
+                cls_id = classes_list.index(obj.name) 
+            except ValueError:
+                _report(warnings, f"  [경고] 알 수 없는 클래스 '{obj.name}'가 발견되어 건너뜁니다. 파일: {annotation.xml_path}")
+                continue
+
+            # 바운딩 박스 변환
+            bb = convert_box((w, h), obj.bbox)
+            
+            # TXT 파일에 저장 (인덱 x_center y_center w h)
+            out_file.write(f"{cls_id} {bb[0]:.6f} {bb[1]:.6f} {bb[2]:.6f} {bb[3]:.6f}\n")
+
+    return out_file_path
+
+def write_yolo_labels(annotations, output_dirs, classes_list, warnings=None):
+    """
+    여러 VocAnnotation 레코드의 박스를 모아 convert_boxes로 한 번에 변환한 뒤, 파일별 YOLO TXT로 저장합니다.
+    write_yolo_label과 같은 내용을 쓰며, 각 레코드에 대해 저장한 파일 경로(실패 시 None) 리스트를 반환합니다.
+    """
+    # list.index와 같은 결과(첫 번째 위치)를 O(1)로 찾기 위한 딕셔너리
+    class_index = {}
+    for i, class_name in enumerate(classes_list):
+        class_index.setdefault(class_name, i)
+
+    # 1. 모든 파일의 박스를 하나의 배열로 모으기
+    class_ids = []
+    sizes = []
+    boxes = []
+    counts = []
+    for annotation in annotations:
+        count = 0
+        for obj in annotation.objects:
+            # 'difficult'가 1인 경우 건너뛰기
+            if obj.difficult:
+                continue
+
+            cls_id = class_index.get(obj.name)
+            if cls_id is None:
+                _report(warnings, f"  [경고] 알 수 없는 클래스 '{obj.name}'가 발견되어 건너뜁니다. 파일: {annotation.xml_path}")
+                continue
+
+            class_ids.append(cls_id)
+            sizes.append((annotation.width, annotation.height))
+            boxes.append(obj.bbox)
+            count += 1
+        counts.append(count)
+
+    # 2. 배열 연산으로 한 번에 변환
+    coords = convert_boxes(sizes, boxes)
+
+    # 3. 파일별로 잘라서 저장
+    out_file_paths = []
+    start = 0
+    for annotation, output_dir, count in zip(annotations, output_dirs, counts):
+        end = start + count
+        out_filename = os.path.splitext(annotation.filename)[0] + '.txt'
         out_file_path = os.path.join(output_dir, out_filename)
-        
-        # 2. 이미지 크기 추출
-        size = root.find('size')
-        w = int(size.find('width').text)
-        h = int(size.find('height').text)
-
-        # 3. TXT 파일 작성
-        with open(out_file_path, 'w') as out_file:
-            for obj in root.iter('object'):
-                cls_name = obj.find('name').text.strip()
-                
-                # 'difficult' 태그가 있으면 1인 경우 건너뛰기
-                difficult_tag = obj.find('difficult')
-                if difficult_tag is not None and int(difficult_tag.text) == 1:
-                    continue
-
-                try:
-                    # 동적으로 생성된 CLASSES 리스트에서 인덱스 찾기
-                    cls_id = classes_list.index(cls_name) 
-                except ValueError:
-                    print(f"  [경고] 알 수 없는 클래스 '{cls_name}'가 발견되어 건너뜁니다. 파일: {xml_file_path}")
-                    continue
-
-                # 4. 바운딩 박스 추출 및 변환
-                xmlbox = obj.find('bndbox')
-                box = [float(xmlbox.find(x).text) for x in ('xmin', 'xmax', 'ymin', 'ymax')]
-                bb = convert_box((w, h), box)
-                
-                # TXT 파일에 저장 (인덱 x_center y_center w h)
-                out_file.write(f"{cls_id} {bb[0]:.6f} {bb[1]:.6f} {bb[2]:.6f} {bb[3]:.6f}\n")
-        
+        try:
+            with open(out_file_path, 'w') as out_file:
+                out_file.write(format_yolo_lines(class_ids[start:end], coords[start:end]))
+            out_file_paths.append(out_file_path)
+        except Exception as e:
+            _report(warnings, f"[오류] 파일 처리 실패 ({annotation.xml_path}): {e}")
+            out_file_paths.append(None)
+        start = end
+
+    return out_file_paths
+
+def load_for_conversion(xml_file_path, warnings=None, path_prefix=None, rewrite_mode=None):
+    """
+    변환할 XML을 파싱하여 (경로 수정 결과, VocAnnotation 레코드)를 반환합니다. 실패하면 레코드는 None입니다.
+    path_prefix를 넘기면 같은 파싱 결과로 <folder>/<path> 수정(xml_path_set)까지 함께 처리하고,
+    넘기지 않으면 경로 수정 결과는 None입니다.
+    """
+    try:
+        if path_prefix is not None:
+            return xps.modify_xml_paths(xml_file_path, os.path.dirname(xml_file_path), path_prefix, warnings,
+                                        rewrite_mode)
+        return None, voc_parser.load_annotation(xml_file_path)
     except Exception as e:
-        print(f"[오류] 파일 처리 실패 ({xml_file_path}): {e}")
+        _report(warnings, f"[오류] 파일 처리 실패 ({xml_file_path}): {e}")
+        return xps.FAILED if path_prefix is not None else None, None
+
+def process_conversion(xml_file_path, output_dir, classes_list, warnings=None, path_prefix=None, rewrite_mode=None):
+    """
+    단일 XML 파일을 YOLO TXT 파일로 변환하여 지정된 출력 폴더에 저장합니다.
+    warnings 리스트를 넘기면 경고/오류 메시지를 출력하지 않고 리스트에 모읍니다. (병렬 워커용)
+    path_prefix를 넘기면 같은 파싱 결과로 <folder>/<path> 수정(xml_path_set)까지 함께 처리하여
+    XML을 한 번만 읽습니다.
+    성공하면 생성한 TXT 파일 경로를, 실패하면 None을 반환합니다.
+    """
+    # 1. XML 파일 파싱 (경로 수정이 필요하면 수정과 파싱을 한 번에 처리)
+    _, annotation = load_for_conversion(xml_file_path, warnings, path_prefix, rewrite_mode)
+    if annotation is None:
+        return None
+
+    # 2. TXT 파일 작성
+    return write_yolo_labels([annotation], [output_dir], classes_list, warnings)[0]
+
+def convert_chunk(tasks, classes_list, path_prefix=None, rewrite_mode=None, return_annotations=False):
+    """
+    워커 프로세스에서 (XML 경로, 출력 폴더) 묶음을 변환합니다.
+    파일마다 출력하지 않고 집계 결과 딕셔너리만 부모 프로세스로 돌려줍니다.
+    (converted, failed, warnings, done=[(XML 경로, TXT 경로)], bytes_read, bytes_written,
+     rewrite={경로 수정 결과: 개수}, index_entries={XML 경로: sidecar 인덱스 항목})
+    묶음 전체의 박스를 모아 write_yolo_labels로 한 번에 변환합니다.
+    return_annotations가 True이면 파싱한 VocAnnotation 레코드도 'annotations'로 돌려줍니다. (어노테이션 DB 기록용)
+    """
+    warnings = []
+    failed = 0
+    bytes_read = 0
+    rewrite = {}
+    index_entries = {}
+
+    # 1. 묶음의 XML을 모두 파싱
+    annotations = []
+    output_dirs = []
+    for xml_file_path, output_dir in tasks:
+        status, annotation = load_for_conversion(xml_file_path, warnings, path_prefix, rewrite_mode)
+        if status is not None:
+            rewrite[status] = rewrite.get(status, 0) + 1
+        if status == xps.INDEXED:
+            index_entries[xml_file_path] = xps.index_entry(annotation)
+        if annotation is None:
+            failed += 1
+            continue
+        bytes_read += os.path.getsize(xml_file_path)
+        annotations.append(annotation)
+        output_dirs.append(output_dir)
+
+    # 2. 묶음 전체 박스를 한 번에 변환하여 저장
+    done = []
+    bytes_written = 0
+    out_file_paths = write_yolo_labels(annotations, output_dirs, classes_list, warnings)
+    for annotation, out_file_path in zip(annotations, out_file_paths):
+        if out_file_path is not None:
+            done.append((annotation.xml_path, out_file_path))
+            bytes_written += os.path.getsize(out_file_path)
+        else:
+            failed += 1
+
+    return {
+        'converted': len(done),
+        'failed': failed,
+        'warnings': warnings,
+        'done': done,
+        'bytes_read': bytes_read,
+        'bytes_written': bytes_written,
+        'rewrite': rewrite,
+        'index_entries': index_entries,
+        'annotations': annotations if return_annotations else [],
+    }
+
+def merge_chunk_result(result, metrics, progress, manifest=None, stage=None, rewrite=None, index_entries=None,
+                       on_annotations=None):
+    """
+    convert_chunk 결과를 단계 측정값/진행 상황/매니페스트에 반영합니다.
+    rewrite, index_entries 딕셔너리를 넘기면 경로 수정 결과 개수와 sidecar 인덱스 항목도 합칩니다.
+    on_annotations를 넘기면 파싱한 레코드 리스트로 호출합니다. (어노테이션 DB 갱신, 부모 프로세스에서만 DB에 씀)
+    """
+    if on_annotations is not None and result['annotations']:
+        on_annotations(result['annotations'])
+    if rewrite is not None:
+        for status, count in result['rewrite'].items():
+            rewrite[status] = rewrite.get(status, 0) + count
+    if index_entries is not None:
+        index_entries.update(result['index_entries'])
+    if manifest is not None:
+        for xml_file_path, out_file_path in result['done']:
+            manifest.record(stage, xml_file_path, [out_file_path])
+    metrics.add(files=result['converted'], bytes_read=result['bytes_read'],
+                bytes_written=result['bytes_written'], errors=result['failed'])
+    progress.update(result['converted'] + result['failed'])
+
+def collect_conversion_tasks(label_dir, ouput_dir, shard=None, allowed=None):
+    """
+    label_dir의 인벤토리로 (XML 경로, 출력 폴더) 작업 목록을 만들고, 출력 폴더 구조를 미리 생성합니다.
+    shard가 주어지면 그 샤드에 속한 클래스 폴더만 포함합니다.
+    allowed(허용 클래스 집합)가 주어지면 제외된 클래스의 XML은 읽지 않습니다. (class_allowlist)
+    """
+    inventory = dataset_inventory.get_inventory(label_dir).for_shard(shard).for_classes(allowed)
+
+    # 출력 폴더 구조 유지
+    output_dirs = {}
+    for root_dir in inventory.dirs:
+        current_output_dir = os.path.join(ouput_dir, os.path.relpath(root_dir, label_dir))
+        os.makedirs(current_output_dir, exist_ok=True)
+        output_dirs[root_dir] = current_output_dir
+
+    return [(entry.path, output_dirs[os.path.dirname(entry.path)])
+            for entry in inventory.select(('.xml',), exclude='meta')]
+
+def run_parallel(tasks, classes_list, workers, metrics, progress, path_prefix=None, manifest=None, stage=None,
+                 rewrite_mode=None, rewrite=None, index_entries=None, on_annotations=None):
+    """
+    작업 목록을 CHUNK_SIZE 단위로 나누어 프로세스 풀에서 변환하고 경고 리스트를 모아 반환합니다.
+    manifest가 주어지면 묶음이 끝날 때마다 변환된 파일을 기록합니다. (매니페스트는 부모 프로세스만 사용)
+    """
+    chunks = [tasks[i:i + CHUNK_SIZE] for i in range(0, len(tasks), CHUNK_SIZE)]
+    all_warnings = []
+
+    # run_all의 DAG 단계 스레드에서 호출되므로 fork 대신 spawn으로 워커를 시작 (멀티스레드 프로세스의 fork는 잠금 상태까지 복제됨)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(convert_chunk, chunk, classes_list, path_prefix, rewrite_mode, on_annotations is not None)
+                   for chunk in chunks]
+        for future in as_completed(futures):
+            result = future.result()
+            merge_chunk_result(result, metrics, progress, manifest, stage, rewrite, index_entries, on_annotations)
+            all_warnings.extend(result['warnings'])
 
-def create_classes_file(label_dir, base_dir) :
+    return all_warnings
+
+def create_classes_file(label_dir, base_dir, shard=None, allowed=None, db=None) :
     # 1. XML 스캔 및 CLASSES 리스트 동적 생성
     #CLASSES = find_all_unique_classes(LABEL_ROOT_DIR)
-    classes = find_classes_from_folder_name(label_dir)
+    classes = find_classes_from_folder_name(label_dir, shard, db)
+    # 스플릿 간 불일치로 제외된 클래스는 목록에서 뺍니다. (폴더는 삭제하지 않음)
+    if allowed is not None:
+        classes = [class_name for class_name in classes if class_name in allowed]
     # 주의: 이 목록을 그대로 YOLOv5의 data.yaml 파일의 'names' 섹션에 사용해야 합니다!
 
     # BASE_DIR 경로에 classes.txt 파일로 CLASSES 리스트 저장
     try:
         classes_output_path = os.path.join(base_dir, 'classes.txt')
+        os.makedirs(base_dir, exist_ok=True)
             
         with open(classes_output_path, 'w', encoding='utf-8') as f:
             for class_name in classes:
@@ -155,8 +417,22 @@ def create_classes_file(label_dir, base_dir) :
 
     return classes
 
-def run(label_dir, ouput_dir, base_dir) :  
-    classe_label = create_classes_file(label_dir, base_dir)
+def run(label_dir, ouput_dir, base_dir, workers=NUM_WORKERS, path_prefix=None, manifest=None, rewrite_mode=None,
+        shard=None, allowed=None) :  
+    """
+    label_dir의 XML을 YOLO TXT로 변환합니다.
+    path_prefix를 넘기면 xml_path_set의 <folder>/<path> 수정도 같은 파싱에서 처리합니다.
+    (rewrite_mode는 xml_path_set.REWRITE_MODE와 같은 'inplace' 또는 'sidecar', 기본값은 그 설정값)
+    shard(sharding.Shard)를 넘기면 그 샤드의 클래스 폴더만 샤드 로컬 클래스 목록으로 변환합니다.
+    (ouput_dir, base_dir은 호출하는 쪽에서 sharding.shard_path로 샤드 폴더 아래 경로를 넘깁니다.)
+    manifest(BuildManifest)를 넘기면 지난 실행 이후 새로 생기거나 바뀐 XML만 변환하고,
+    원본 XML이 사라진 TXT는 삭제합니다.
+    allowed(class_allowlist.reconcile의 허용 클래스)를 넘기면 그 클래스만 classes.txt에 넣고 변환합니다.
+    (제외된 클래스의 XML은 읽지 않고, 지난 실행에서 만든 TXT는 매니페스트가 정리합니다.)
+    annotation_db.USE_ANNOTATION_DB이면 변환하며 파싱한 레코드를 어노테이션 DB에도 기록합니다. (추가 파싱 없음)
+    매니페스트로는 최신이어도 DB에 없거나 DB 기록과 다른 XML은 다시 변환하여 DB를 채웁니다.
+    """
+    classe_label = create_classes_file(label_dir, base_dir, shard, allowed)
 
     print(f"\n--- XML to YOLO TXT 변환 시작 ---")
     print(f"입력 경로: {label_dir}")
@@ -165,42 +441,133 @@ def run(label_dir, ouput_dir, base_dir) :
     # 2. 출력 폴더 생성
     os.makedirs(ouput_dir, exist_ok=True)
     
-    total_files = 0
-    
-    # 3. 변환 프로세스 시작
-    for root_dir, dirs, files in os.walk(label_dir):
-        relative_path = os.path.relpath(root_dir, label_dir)
-        current_output_dir = os.path.join(ouput_dir, relative_path)
-        
-        # 출력 폴더 구조 유지
-        if not os.path.exists(current_output_dir):
-            os.makedirs(current_output_dir, exist_ok=True)
+    # 3. 변환할 XML 목록 수집 (출력 폴더 구조도 함께 생성)
+    tasks = collect_conversion_tasks(label_dir, ouput_dir, shard, allowed)
+
+    # 3-1. 증분 실행: 바뀌지 않은 XML은 건너뛰고, 사라진 XML의 출력은 삭제
+    stage = f"convert:{os.path.normpath(label_dir)}"
+    all_count = len(tasks)
+    if path_prefix is not None:
+        rewrite_mode = rewrite_mode or xps.REWRITE_MODE
+    live_xml_paths = [xml_file_path for xml_file_path, _ in tasks]
+    db = annotation_db.AnnotationDB() if annotation_db.USE_ANNOTATION_DB else None
+    on_annotations = None
+    db_stale = set()
+    if db is not None:
+        # 사라진 XML의 기록 정리는 샤드/허용 목록과 관계없이 label_dir 전체 기준 (다른 샤드의 기록을 지우지 않도록)
+        db.prune(label_dir, [entry.path for entry in
+                             dataset_inventory.get_inventory(label_dir).select(('.xml',), exclude='meta')])
+        db_stale = set(db.stale_paths(label_dir, live_xml_paths))
+        on_annotations = lambda annotations: db.upsert(label_dir, annotations)
+    if manifest is not None:
+        manifest.begin_stage(stage, {'classes': classe_label, 'path_prefix': path_prefix, 'rewrite_mode': rewrite_mode,
+                                     'shard': shard})
+        manifest.prune(stage, live_xml_paths)
+        tasks = [task for task in tasks if task[0] in db_stale or not manifest.is_up_to_date(stage, task[0])]
+        print(f"--- 증분 실행: 전체 {all_count}개 중 변경된 {len(tasks)}개만 변환합니다. ---")
 
-        for filename in files:
-            if filename.endswith('.xml'):
-                if 'meta' in filename.lower():
-                    continue
+    # 4. 변환 프로세스 시작 (중단되더라도 지금까지 변환한 기록은 저장하여 다음 실행이 이어서 처리)
+    progress = stage_metrics.ProgressPrinter('ing ~~~', total=len(tasks))
+    rewrite = {}
+    index_entries = {}
+    with stage_metrics.StageMetrics(stage) as metrics:
+        metrics.add(skipped=all_count - len(tasks))
+        try:
+            if workers is not None and workers > 1 and len(tasks) > CHUNK_SIZE:
+                print(f"--- 병렬 변환: 워커 {workers}개, 묶음 크기 {CHUNK_SIZE} ---")
+                warnings = run_parallel(tasks, classe_label, workers, metrics, progress, path_prefix, manifest, stage,
+                                        rewrite_mode, rewrite, index_entries, on_annotations)
+                progress.close()
+
+                print(f"--- 경고/오류 {len(warnings)}건 (실패 파일 {metrics.errors}개) ---")
+                for message in warnings[:MAX_PRINTED_WARNINGS]:
+                    print(message)
+                if len(warnings) > MAX_PRINTED_WARNINGS:
+                    print(f"  ... 외 {len(warnings) - MAX_PRINTED_WARNINGS}건 생략")
+            else:
+                # 단일 프로세스에서도 CHUNK_SIZE 묶음 단위로 박스를 모아 한 번에 변환
+                for i in range(0, len(tasks), CHUNK_SIZE):
+                    result = convert_chunk(tasks[i:i + CHUNK_SIZE], classe_label, path_prefix, rewrite_mode,
+                                           on_annotations is not None)
+                    for message in result['warnings']:
+                        print(message)
+                    merge_chunk_result(result, metrics, progress, manifest, stage, rewrite, index_entries, on_annotations)
+                progress.close()
 
-                xml_file_path = os.path.join(root_dir, filename)
-                # 동적 생성된 CLASSES 리스트를 process_conversion 함수에 전달
-                process_conversion(xml_file_path, current_output_dir, classe_label) 
-                total_files += 1
+            if rewrite_mode == 'sidecar':
+                # 샤드 실행이면 인덱스는 샤드 폴더 아래에 기록 (merge_shards.py가 합침)
+                xps.update_path_index(sharding.shard_path(shard, label_dir), {xps.index_key(label_dir, path): entry
+                                                                             for path, entry in index_entries.items()},
+                                      [xps.index_key(label_dir, path) for path in live_xml_paths])
+        finally:
+            if manifest is not None:
+                manifest.save()
+            if db is not None:
+                db.close()
+        metrics.extra.update({'rewritten': rewrite.get(xps.REWRITTEN, 0), 'unchanged': rewrite.get(xps.UNCHANGED, 0),
+                              'indexed': rewrite.get(xps.INDEXED, 0)})
 
-                print(f'\r {total_files} ing ~~~', end='')
+    if path_prefix is not None:
+        xps.print_rewrite_summary(rewrite)
+    print(f"--- 총 {progress.count}개의 XML 파일이 YOLO TXT로 변환 완료되었습니다. ---")
+
+def convert_from_db(db, label_dir, ouput_dir, base_dir, shard=None, allowed=None):
+    """
+    XML을 읽지 않고 어노테이션 DB(annotation_db)의 기록으로 label_dir 전체의 YOLO TXT를 다시 만듭니다.
+    (클래스 목록이 바뀌었을 때 등. DB는 annotation_db.py update 또는 변환 실행으로 최신 상태여야 합니다.)
+    classes.txt도 DB의 클래스 폴더로 만듭니다. 만든 TXT 수를 반환합니다.
+    """
+    classes = create_classes_file(label_dir, base_dir, shard, allowed, db)
+    # 루트에 바로 있는 XML(클래스 폴더 '')도 collect_conversion_tasks와 같은 규칙으로 포함
+    class_folders = {folder for folder in db.class_folders(label_dir) + ['']
+                     if sharding.contains(shard, folder) and class_allowlist.is_allowed(allowed, folder)}
+    root_key = annotation_db.db_root(label_dir)
+
+    print(f"\n--- 어노테이션 DB -> YOLO TXT 변환 시작: {label_dir} -> {ouput_dir} ---")
+    warnings = []
+    written = 0
+    annotations = []
+    output_dirs = []
+
+    def flush():
+        nonlocal written
+        written += sum(path is not None for path in write_yolo_labels(annotations, output_dirs, classes, warnings))
+        annotations.clear()
+        output_dirs.clear()
+
+    for annotation in db.iter_annotations(label_dir, class_folders):
+        output_dir = os.path.join(ouput_dir, os.path.relpath(os.path.dirname(annotation.xml_path), root_key))
+        os.makedirs(output_dir, exist_ok=True)
+        annotations.append(annotation)
+        output_dirs.append(output_dir)
+        if len(annotations) >= CHUNK_SIZE:
+            flush()
+    flush()
+
+    for message in warnings[:MAX_PRINTED_WARNINGS]:
+        print(message)
+    print(f"--- 총 {written}개의 YOLO TXT를 DB에서 생성했습니다. (경고 {len(warnings)}건) ---")
+    return written
 
-    print(f"\n--- 총 {total_files}개의 XML 파일이 YOLO TXT로 변환 완료되었습니다. ---")
 # --- [Main Execution Loop] ---
 if __name__ == '__main__':
-    label_list = create_classes_file(LABEL_ROOT_DIR, BASE_DIR)
-    v_label_list = create_classes_file(V_LABEL_ROOT_DIR, V_BASE_DIR)
-
-    if not(cdy.is_same_list(label_list, v_label_list)) :
-        list_a, list_b = cdy.long_list(label_list, v_label_list)
-        list_c = cdy.difference_data(list_a, list_b)
-        remove_folder = cdy.find_folders_to_delete(BASE_DIR, list_c)
-        cdy.execute_deletion(remove_folder)
-        remove_folder = cdy.find_folders_to_delete(V_BASE_DIR, list_c)
-        cdy.execute_deletion(remove_folder)
-
-    run(LABEL_ROOT_DIR, OUTPUT_ROOT_DIR, BASE_DIR)
-    run(V_LABEL_ROOT_DIR, V_OUTPUT_ROOT_DIR, V_BASE_DIR)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='VOC XML -> YOLO TXT 변환')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+    shard = args.shard
+
+    # 샤드 실행이면 classes.txt/label_coco를 샤드 폴더 아래에 만듭니다.
+    base_dir = sharding.shard_path(shard, BASE_DIR)
+    v_base_dir = sharding.shard_path(shard, V_BASE_DIR)
+
+    # 두 스플릿에 모두 있는 클래스만 허용 목록으로 한 번 계산 (불일치 클래스 폴더는 삭제하지 않고 건너뜀)
+    allowed = set(class_allowlist.reconcile(find_classes_from_folder_name(LABEL_ROOT_DIR, shard),
+                                            find_classes_from_folder_name(V_LABEL_ROOT_DIR, shard),
+                                            class_allowlist.allowlist_path(shard)))
+
+    # XML 경로 수정(xml_path_set)과 YOLO 변환을 한 번의 파싱으로 처리 (바뀐 XML만 증분 처리)
+    manifest = build_manifest.BuildManifest(sharding.manifest_path(shard))
+    run(LABEL_ROOT_DIR, sharding.shard_path(shard, OUTPUT_ROOT_DIR), base_dir,
+        path_prefix=xps.RELATIVE_PATH_PREFIX, manifest=manifest, shard=shard, allowed=allowed)
+    run(V_LABEL_ROOT_DIR, sharding.shard_path(shard, V_OUTPUT_ROOT_DIR), v_base_dir,
+        path_prefix=xps.V_RELATIVE_PATH_PREFIX, manifest=manifest, shard=shard, allowed=allowed)
\ No newline at end of file
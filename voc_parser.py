@@ -0,0 +1,187 @@
+import xml.etree.ElementTree as ET
+from typing import List, NamedTuple, Optional, Tuple
+
+# --- [Configuration Section] ---
+# 1. 읽기 전용 파싱(load_annotation)에 사용할 백엔드
+# 'auto': lxml이 설치되어 있으면 'lxml', 없으면 'etree'
+# 'etree': 표준 라이브러리로 전체 트리를 만든 뒤 검색 (기준 구현, 작은 파일에서는 iterparse보다 빠름)
+# 'iterparse': 표준 라이브러리 iterparse로 읽으며 <annotation> 밖의 요소는 바로 비움 (메타데이터가 큰 파일에서 메모리 절약)
+# 'lxml': lxml(C 구현)로 파싱 (설치되어 있을 때 가장 빠름)
+PARSER_BACKEND = 'auto'
+PARSER_BACKENDS = ('etree', 'iterparse', 'lxml')
+
+# --- [VOC 어노테이션 레코드] ---
+
+class VocObject(NamedTuple):
+    """<object> 하나의 정보. bbox는 convert_box와 같은 (xmin, xmax, ymin, ymax) 순서입니다."""
+    name: str
+    bbox: Tuple[float, float, float, float]
+    difficult: bool
+
+class VocAnnotation(NamedTuple):
+    """XML 파일 하나를 파싱한 결과. 경로 수정/클래스 확인/YOLO 변환 단계가 모두 이 레코드를 사용합니다."""
+    xml_path: str
+    filename: str
+    folder: Optional[str]
+    path: Optional[str]
+    width: int
+    height: int
+    objects: List[VocObject]
+
+# --- [파싱 함수] ---
+
+def find_annotation_element(root):
+    """
+    최상위 태그가 <comp_cd>이더라도 내부의 <annotation>을 찾아 반환합니다. 없으면 None을 반환합니다.
+    """
+    if root.tag == 'annotation':
+        return root
+    return root.find('annotation')
+
+def parse_voc_tree(xml_path):
+    """
+    XML 파일을 파싱하여 (tree, annotation 요소)를 반환합니다.
+    경로 수정처럼 트리를 다시 저장해야 하는 단계에서 사용합니다.
+    """
+    tree = ET.parse(xml_path)
+    annotation_element = find_annotation_element(tree.getroot())
+    if annotation_element is None:
+        raise ValueError("<annotation> 태그를 찾을 수 없습니다.")
+    return tree, annotation_element
+
+def _first_children(element):
+    """
+    직계 자식을 태그별 첫 번째 요소로 모은 딕셔너리를 반환합니다. (element.find(tag)와 같은 결과)
+    자식을 한 번만 훑으므로 find를 여러 번 부르는 것보다 빠르고, lxml 요소에서도 그대로 동작합니다.
+    """
+    children = {}
+    for child in element:
+        children.setdefault(child.tag, child)
+    return children
+
+def _text(children, tag):
+    child = children.get(tag)
+    if child is None:
+        return None
+    return child.text
+
+def annotation_from_element(xml_path, annotation_element):
+    """
+    <annotation> 요소(ElementTree 또는 lxml)에서 VocAnnotation 레코드를 만듭니다.
+    """
+    children = _first_children(annotation_element)
+    filename = _text(children, 'filename')
+    if filename is None:
+        raise ValueError("<filename> 태그를 찾을 수 없습니다.")
+
+    size = children.get('size')
+    if size is None:
+        raise ValueError("<size> 태그를 찾을 수 없습니다.")
+    size_children = _first_children(size)
+    width = int(_text(size_children, 'width'))
+    height = int(_text(size_children, 'height'))
+
+    objects = []
+    for obj in annotation_element.iter('object'):
+        obj_children = _first_children(obj)
+        difficult_text = _text(obj_children, 'difficult')
+        box_children = _first_children(obj_children['bndbox'])
+        box = tuple(float(box_children[x].text) for x in ('xmin', 'xmax', 'ymin', 'ymax'))
+        objects.append(VocObject(
+            name=obj_children['name'].text.strip(),
+            bbox=box,
+            difficult=difficult_text is not None and int(difficult_text) == 1,
+        ))
+
+    return VocAnnotation(
+        xml_path=xml_path,
+        filename=filename,
+        folder=_text(children, 'folder'),
+        path=_text(children, 'path'),
+        width=width,
+        height=height,
+        objects=objects,
+    )
+
+# --- [파서 백엔드] ---
+
+def _parse_etree(xml_path):
+    _, annotation_element = parse_voc_tree(xml_path)
+    return annotation_from_element(xml_path, annotation_element)
+
+def _parse_iterparse(xml_path):
+    """
+    표준 라이브러리 iterparse로 읽으면서 <annotation> 밖의 요소(<comp_cd>의 메타데이터 블록 등)는
+    끝나는 즉시 비우고, </annotation>을 만나면 나머지는 읽지 않습니다.
+    메모리에는 <annotation> 부분만 남으므로 메타데이터가 큰 파일에서 최대 메모리가 작습니다.
+    """
+    depth = 0
+    annotation_depth = None
+    with open(xml_path, 'rb') as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                # 최상위가 <annotation>이거나, 최상위(<comp_cd> 등) 바로 아래의 첫 번째 <annotation>
+                if annotation_depth is None and elem.tag == 'annotation' and depth <= 1:
+                    annotation_depth = depth
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == annotation_depth:
+                return annotation_from_element(xml_path, elem)
+            if annotation_depth is None:
+                elem.clear()
+
+    raise ValueError("<annotation> 태그를 찾을 수 없습니다.")
+
+_LXML_PARSER = None
+
+def _parse_lxml(xml_path):
+    """
+    lxml(C 구현)로 전체를 파싱합니다. 메타데이터가 큰 파일도 표준 라이브러리보다 빠릅니다.
+    """
+    global _LXML_PARSER
+    from lxml import etree
+
+    if _LXML_PARSER is None:
+        # 외부 엔티티를 읽지 않고, 큰 메타데이터 블록도 거부하지 않도록 설정
+        _LXML_PARSER = etree.XMLParser(resolve_entities=False, huge_tree=True, remove_comments=True)
+    root = etree.parse(xml_path, _LXML_PARSER).getroot()
+    annotation_element = find_annotation_element(root)
+    if annotation_element is None:
+        raise ValueError("<annotation> 태그를 찾을 수 없습니다.")
+    return annotation_from_element(xml_path, annotation_element)
+
+_BACKEND_FUNCTIONS = {
+    'etree': _parse_etree,
+    'iterparse': _parse_iterparse,
+    'lxml': _parse_lxml,
+}
+
+def available_backends():
+    """현재 환경에서 사용할 수 있는 백엔드 이름 목록을 반환합니다."""
+    backends = ['etree', 'iterparse']
+    try:
+        import lxml.etree  # noqa: F401
+        backends.append('lxml')
+    except ImportError:
+        pass
+    return backends
+
+def resolve_backend(backend=None):
+    """
+    backend(None이면 PARSER_BACKEND)를 실제 백엔드 이름으로 바꿉니다. 'auto'는 lxml이 있으면 'lxml'입니다.
+    """
+    backend = backend or PARSER_BACKEND
+    if backend == 'auto':
+        return 'lxml' if 'lxml' in available_backends() else 'etree'
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"알 수 없는 파서 백엔드: {backend} (가능한 값: 'auto', {PARSER_BACKENDS})")
+    return backend
+
+def load_annotation(xml_path, backend=None):
+    """
+    XML 파일을 한 번 파싱하여 VocAnnotation 레코드를 반환합니다.
+    backend를 지정하지 않으면 PARSER_BACKEND 설정을 사용합니다. (모든 백엔드의 결과는 같습니다.)
+    """
+    return _BACKEND_FUNCTIONS[resolve_backend(backend)](xml_path)
@@ -1,5 +1,15 @@
+import argparse
+import json
 import os
-import xml.etree.ElementTree as ET
+import shutil
+import tempfile
+
+import build_manifest
+import class_allowlist
+import dataset_inventory
+import sharding
+import stage_metrics
+import voc_parser
 
 # --- [필수 설정 부분] ---
 
@@ -23,76 +33,231 @@ V_IMAGE_ROOT_NAME = 'image'
 # 예: XML이 label/sub에 있고, 이미지가 image/sub에 있다면, '../image/'
 V_RELATIVE_PATH_PREFIX = f'../../{V_IMAGE_ROOT_NAME}/' 
 
+# 4. 경로 수정 방식
+# 'inplace': 값이 바뀐 XML만 임시 파일에 쓴 뒤 교체 (이미 목표 값이면 파일을 건드리지 않음)
+# 'sidecar': 원본 XML은 그대로 두고, 경로 매핑을 label 폴더의 PATH_INDEX_FILENAME에 기록
+REWRITE_MODE = 'inplace'
+REWRITE_MODES = ('inplace', 'sidecar')
+PATH_INDEX_FILENAME = 'path_index.json'
+
+# modify_xml_paths의 처리 결과
+REWRITTEN = 'rewritten'
+UNCHANGED = 'unchanged'
+INDEXED = 'indexed'
+FAILED = 'failed'
+
 # --- [XML 수정 함수] ---
 
-def modify_xml_paths(xml_file_path, current_root_dir, path_prefix):
+def _report(warnings, message):
+    """warnings 리스트가 주어지면 메시지를 모으고, 없으면 바로 출력합니다."""
+    if warnings is None:
+        print(message)
+    else:
+        warnings.append(message)
+
+def target_paths(current_root_dir, path_prefix, filename):
+    """
+    XML이 있는 폴더와 파일 이름으로 목표 <folder>, <path> 값을 만듭니다.
+    (예: '../../image/10060_해태포키블루베리41G', '../../image/10060_해태포키블루베리41G/10060_0_m_1.jpg')
+    """
+    # 현재 XML 파일이 위치한 폴더 이름 추출 (예: '10060_해태포키블루베리41G')
+    parent_folder_name = os.path.basename(current_root_dir)
+    folder = os.path.join(path_prefix, parent_folder_name).replace('\\', '/')
+    path = os.path.join(path_prefix, parent_folder_name, filename).replace('\\', '/')
+    return folder, path
+
+def write_tree_atomic(tree, xml_file_path):
+    """
+    같은 폴더의 임시 파일에 쓴 뒤 os.replace로 교체합니다. 쓰는 도중 중단되어도 원본 XML이 깨지지 않습니다.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(xml_file_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            tree.write(f, encoding='utf-8', xml_declaration=True)
+        shutil.copymode(xml_file_path, tmp_path)
+        os.replace(tmp_path, xml_file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def modify_xml_paths(xml_file_path, current_root_dir, path_prefix, warnings=None, mode=None):
     """
-    단일 XML 파일의 <folder>와 <path> 태그를 수정합니다.
+    단일 XML 파일의 <folder>와 <path> 태그를 목표 값으로 맞춥니다.
     최상위 태그가 <comp_cd>이더라도 내부의 <annotation>을 찾아 처리합니다.
+    이미 목표 값이면 파일을 쓰지 않고(수정 시간도 그대로), 바뀐 경우에만 임시 파일 + 교체로 저장합니다.
+    mode가 'sidecar'이면 파일은 건드리지 않고 목표 값이 반영된 레코드만 반환합니다. (매핑은 run이 인덱스에 기록)
+
+    (처리 결과, VocAnnotation 레코드) 튜플을 반환합니다. 처리 결과는 REWRITTEN/UNCHANGED/INDEXED/FAILED 중 하나이고,
+    실패하면 레코드는 None입니다. 레코드는 다음 단계(YOLO 변환)가 XML을 다시 읽지 않도록 사용합니다.
     """
+    mode = mode or REWRITE_MODE
+    if mode not in REWRITE_MODES:
+        raise ValueError(f"알 수 없는 경로 수정 방식: {mode} (가능한 값: {REWRITE_MODES})")
+
     try:
-        # XML 파일 파싱
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
-        
-        # 1. <annotation> 태그를 찾습니다.
-        # 최상위 태그가 <annotation>이 아니면 자식 중에서 <annotation>을 찾습니다.
-        annotation_element = root
-        if root.tag != 'annotation':
-            annotation_element = root.find('annotation')
-        
-        if annotation_element is None:
+        # XML 파일 파싱 및 <annotation> 태그 찾기
+        try:
+            tree, annotation_element = voc_parser.parse_voc_tree(xml_file_path)
+        except ValueError:
             # <annotation> 태그를 찾지 못하면 건너뜁니다.
-            print(f"  [오류 발생] 파일: {xml_file_path}, <annotation> 태그를 찾을 수 없습니다. 건너뜀.")
-            return
-
-        # 현재 XML 파일이 위치한 폴더 이름 추출 (예: '10060_해태포키블루베리41G')
-        parent_folder_name = os.path.basename(current_root_dir)
+            _report(warnings, f"  [오류 발생] 파일: {xml_file_path}, <annotation> 태그를 찾을 수 없습니다. 건너뜀.")
+            return FAILED, None
 
         # 2. <filename> 태그를 찾습니다. (path 생성을 위해 필요)
         filename_tag = annotation_element.find('filename')
         if filename_tag is None or filename_tag.text is None:
-            print(f"  [오류 발생] 파일: {xml_file_path}, <filename> 태그를 찾을 수 없습니다. 건너뜐.")
-            return
-        filename = filename_tag.text
-            
-        # 3. <folder> 태그 수정
-        folder_tag = annotation_element.find('folder')
-        if folder_tag is not None:
-            # 새로운 상대 경로: ../../image/부모폴더/
-            folder_tag.text = os.path.join(path_prefix, parent_folder_name).replace('\\', '/')
-
-        # 4. <path> 태그 수정
-        path_tag = annotation_element.find('path')
-        if path_tag is not None:
-            # 새로운 상대 경로 생성: ../../image/부모폴더/파일이름.jpg
-            new_path = os.path.join(path_prefix, parent_folder_name, filename).replace('\\', '/')
-            path_tag.text = new_path
-
-        # 수정된 내용을 파일에 저장 (덮어쓰기)
-        tree.write(xml_file_path, encoding='utf-8', xml_declaration=True)
+            _report(warnings, f"  [오류 발생] 파일: {xml_file_path}, <filename> 태그를 찾을 수 없습니다. 건너뜀.")
+            return FAILED, None
+        new_folder, new_path = target_paths(current_root_dir, path_prefix, filename_tag.text)
+
+        # 3. <folder>, <path> 태그 중 목표 값과 다른 것만 수정 (태그가 없으면 추가하지 않음)
+        changed = False
+        for tag, value in (('folder', new_folder), ('path', new_path)):
+            element = annotation_element.find(tag)
+            if element is not None and element.text != value:
+                element.text = value
+                changed = True
+
+        # 4. 이미 메모리에 있는 트리에서 레코드 생성 (다시 파싱하지 않음)
+        annotation = voc_parser.annotation_from_element(xml_file_path, annotation_element)
+
+        if not changed:
+            return UNCHANGED, annotation
+        if mode == 'sidecar':
+            return INDEXED, annotation
+
+        # 5. 바뀐 경우에만 저장 (임시 파일에 쓴 뒤 교체)
+        write_tree_atomic(tree, xml_file_path)
+        return REWRITTEN, annotation
 
     except Exception as e:
-        print(f"  [오류 발생] 파일: {xml_file_path}, 오류: {e}")
+        _report(warnings, f"  [오류 발생] 파일: {xml_file_path}, 오류: {e}")
+        return FAILED, None
+
+# --- [Sidecar 경로 인덱스] ---
+
+def path_index_path(label_dir):
+    return os.path.join(label_dir, PATH_INDEX_FILENAME)
+
+def index_key(label_dir, xml_file_path):
+    """인덱스 키: label_dir 기준 상대 경로 ('/' 구분)"""
+    return os.path.relpath(xml_file_path, label_dir).replace('\\', '/')
+
+def load_path_index(label_dir):
+    """
+    sidecar 인덱스 {XML 상대 경로: {"folder", "path"}}를 읽습니다. 없거나 읽을 수 없으면 빈 딕셔너리를 반환합니다.
+    """
+    index_path = path_index_path(label_dir)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ 경로 인덱스를 읽을 수 없어 새로 만듭니다. ({index_path}): {e}")
+        return {}
+
+def update_path_index(label_dir, entries, live_keys):
+    """
+    sidecar 인덱스에 entries를 반영하고, 이번 스캔에서 본 XML의 키(live_keys)에 없는 항목은
+    BuildManifest.prune처럼 지운 뒤 저장합니다. (매니페스트로 건너뛴 XML도 live_keys에 넣어야 합니다.)
+    값이 바뀌지 않으면 파일을 다시 쓰지 않습니다.
+    """
+    index = load_path_index(label_dir)
+    live_keys = set(live_keys)
+    updated = {key: value for key, value in index.items() if key in live_keys}
+    updated.update(entries)
+    if updated == index:
+        return
+
+    index_path = path_index_path(label_dir)
+    os.makedirs(label_dir, exist_ok=True)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(updated, f, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(tmp_path, index_path)
+    print(f"🗂️ 경로 인덱스 저장: {index_path} ({len(updated)}개 항목)")
+
+def index_entry(annotation):
+    return {'folder': annotation.folder, 'path': annotation.path}
+
+def print_rewrite_summary(counts):
+    print(f"--- 경로 수정 결과: 재작성 {counts.get(REWRITTEN, 0)}개, 변경 없음 {counts.get(UNCHANGED, 0)}개, "
+          f"인덱스 기록 {counts.get(INDEXED, 0)}개, 실패 {counts.get(FAILED, 0)}개 ---")
+
+def run(label_dir, path_prefix, manifest=None, mode=None, shard=None, allowed=None) :
+    """
+    label_dir 아래 모든 XML의 경로 태그를 목표 값으로 맞춥니다. (값이 바뀐 XML만 다시 씁니다.)
+    mode가 'sidecar'이면 XML은 그대로 두고 label_dir의 경로 인덱스에 매핑을 기록합니다.
+    manifest(BuildManifest)가 주어지면 지난 실행 이후 바뀌지 않은 XML은 다시 읽지도 않습니다.
+    shard(sharding.Shard)가 주어지면 그 샤드의 클래스 폴더만 처리하고, 경로 인덱스는 샤드 폴더 아래에 기록합니다.
+    (여러 샤드가 같은 label_dir의 인덱스 파일을 동시에 덮어쓰지 않도록)
+    allowed(허용 클래스 집합)가 주어지면 제외된 클래스의 XML은 건드리지 않습니다. (class_allowlist)
+    """
+    mode = mode or REWRITE_MODE
+    index_dir = sharding.shard_path(shard, label_dir)
 
-def run(label_dir, path_prefix) :
     # --- [메인 실행 루프] ---
-    print(f"--- XML 파일 경로 재귀적 수정 시작: {label_dir} ---")
-
-    # os.walk를 사용하여 label_dir 아래 모든 폴더를 탐색
-    xml_count = 0
-    for root_dir, dirs, files in os.walk(label_dir):
-        for filename in files:
-            if filename.endswith('.xml'):
-                file_path = os.path.join(root_dir, filename)
-                
-                # 현재 XML 파일의 위치(root_dir)와 파일 경로를 수정 함수에 전달
-                modify_xml_paths(file_path, root_dir, path_prefix)
-                xml_count += 1
-                print(f'\r {xml_count} ing~~', end='')
-
-    print(f"\n--- 총 {xml_count}개의 XML 파일 경로 수정 완료되었습니다. ---")
+    print(f"--- XML 파일 경로 재귀적 수정 시작: {label_dir} ({mode}) ---")
+    stage = f"path_rewrite:{os.path.normpath(label_dir)}"
+    if manifest is not None:
+        manifest.begin_stage(stage, {'path_prefix': path_prefix, 'mode': mode, 'shard': shard})
+
+    counts = {}
+    index_entries = {}
+    live_keys = []
+
+    # label_dir 아래 모든 XML을 인벤토리에서 조회 (폴더를 다시 탐색하지 않음)
+    progress = stage_metrics.ProgressPrinter('ing~~')
+    with stage_metrics.StageMetrics(stage) as metrics:
+        try:
+            for entry in dataset_inventory.get_inventory(label_dir).for_shard(shard).for_classes(allowed).select(('.xml',)):
+                file_path = entry.path
+                live_keys.append(index_key(label_dir, file_path))
+
+                if manifest is not None and manifest.is_up_to_date(stage, file_path):
+                    metrics.add(skipped=1)
+                    continue
+
+                # 현재 XML 파일의 위치(폴더)와 파일 경로를 수정 함수에 전달
+                size = os.path.getsize(file_path)
+                status, annotation = modify_xml_paths(file_path, os.path.dirname(file_path), path_prefix, mode=mode)
+                counts[status] = counts.get(status, 0) + 1
+
+                if status == FAILED:
+                    metrics.add(files=1, bytes_read=size, errors=1)
+                else:
+                    written = os.path.getsize(file_path) if status == REWRITTEN else 0
+                    metrics.add(files=1, bytes_read=size, bytes_written=written)
+                    if status == INDEXED:
+                        index_entries[index_key(label_dir, file_path)] = index_entry(annotation)
+                    if manifest is not None:
+                        manifest.record(stage, file_path)
+                progress.update()
+
+            if mode == 'sidecar':
+                update_path_index(index_dir, index_entries, live_keys)
+        finally:
+            if manifest is not None:
+                manifest.save()
+        metrics.extra.update({'rewritten': counts.get(REWRITTEN, 0), 'unchanged': counts.get(UNCHANGED, 0),
+                              'indexed': counts.get(INDEXED, 0)})
+    progress.close()
+
+    if manifest is not None:
+        print(f"--- 변경되지 않아 건너뛴 XML: {metrics.skipped}개 ---")
+    print_rewrite_summary(counts)
+    print(f"--- 총 {progress.count}개의 XML 파일 경로 확인 완료되었습니다. ---")
+    return counts
 
 if __name__ == '__main__':
-    run(LABEL_ROOT_DIR, RELATIVE_PATH_PREFIX)
-    run(V_LABEL_ROOT_DIR, V_RELATIVE_PATH_PREFIX)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='VOC XML의 folder/path 태그 수정')
+    sharding.add_shard_argument(parser)
+    args = parser.parse_args()
+
+    manifest = build_manifest.BuildManifest(sharding.manifest_path(args.shard))
+    # trans_coco.py가 계산한 허용 목록이 있으면 제외된 클래스는 건너뜀 (없으면 전체 처리)
+    allowed = class_allowlist.load_allowed(class_allowlist.allowlist_path(args.shard))
+    run(LABEL_ROOT_DIR, RELATIVE_PATH_PREFIX, manifest, shard=args.shard, allowed=allowed)
+    run(V_LABEL_ROOT_DIR, V_RELATIVE_PATH_PREFIX, manifest, shard=args.shard, allowed=allowed)
\ No newline at end of file